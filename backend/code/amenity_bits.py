@@ -0,0 +1,79 @@
+import numpy as np
+
+from constants import CATEGORY_STRING, load_grouped_columns_from_json_string
+from hotel_store import HotelTable
+from models import AMENITY_GROUPS
+
+# Spalten, die als Amenity-Flag (0/1) in Frage kommen; Spalten mit anderen
+# Werten (z.B. 0/1/2 bei Heizung oder WLAN) zählen trotzdem nicht als Flag
+AMENITY_COLUMNS = frozenset(
+    column.strip()
+    for columns in load_grouped_columns_from_json_string(CATEGORY_STRING).values()
+    for column in columns
+) | frozenset(column for columns in AMENITY_GROUPS.values() for column in columns)
+
+
+
+def is_flag(values: np.ndarray) -> bool:
+    """True if a numeric column only holds 0 and 1 (NaN counts as missing)."""
+    present = values[values == values]
+    return bool(np.isin(present, (0, 1)).all())
+
+
+class AmenityBits:
+    """
+    All numeric amenity columns of a city packed into one bit row per hotel
+    (np.packbits, 8 amenities per byte). "Has any/all of these amenities"
+    becomes a bitwise AND against a query mask. An amenity is present only
+    where its value is 1 (the same rule as GroupConstraint.is_satisfied);
+    NaN, other values and amenities a city does not have are absent bits,
+    so every city behaves the same.
+    """
+
+    def __init__(self, table: HotelTable):
+        self.columns = [
+            column
+            for column, values in table.columns.items()
+            if column in AMENITY_COLUMNS and values.dtype.kind in "biuf"
+        ]
+        self.bit = {column: i for i, column in enumerate(self.columns)}
+        matrix = np.zeros((len(table), len(self.columns)), dtype=bool)
+        for i, column in enumerate(self.columns):
+            # NaN == 1 und 2 == 1 sind False: beides zählt als fehlende Amenity
+            matrix[:, i] = table.columns[column] == 1
+        self.bits = np.packbits(matrix, axis=1)
+
+    def _query(self, columns: list[str]) -> tuple[np.ndarray, int]:
+        """Packed mask of the known columns plus the number of unknown ones."""
+        wanted = np.zeros(len(self.columns), dtype=bool)
+        missing = 0
+        for column in columns:
+            if column in self.bit:
+                wanted[self.bit[column]] = True
+            else:
+                missing += 1
+        return np.packbits(wanted), missing
+
+    def any_of(self, columns: list[str]) -> np.ndarray:
+        """Rows that have at least one of the amenities."""
+        query, _ = self._query(columns)
+        return (self.bits & query).any(axis=1)
+
+    def all_of(self, columns: list[str]) -> np.ndarray:
+        """Rows that have every one of the amenities."""
+        query, missing = self._query(columns)
+        if missing:
+            return np.zeros(len(self.bits), dtype=bool)
+        return ((self.bits & query) == query).all(axis=1)
+
+
+def amenity_bits(table: HotelTable) -> AmenityBits:
+    """Bitset of a city, built once per HotelTable."""
+    return table.derive("amenity_bits", lambda: AmenityBits(table))
+
+
+def group_mask(table: HotelTable, group: str) -> np.ndarray:
+    """Rows that have at least one amenity of an AMENITY_GROUPS entry."""
+    return table.derive(
+        ("group", group), lambda: amenity_bits(table).any_of(AMENITY_GROUPS[group])
+    )
@@ -0,0 +1,325 @@
+import os
+import re
+from typing import Container, Optional
+
+from constants import CATEGORY_STRING, STOPWORDS, load_grouped_columns_from_json_string
+
+# Unterhalb dieser Konfidenz wählt weiterhin das LLM die Spalten aus
+LOCAL_COLUMN_MIN_CONFIDENCE = float(os.getenv("LOCAL_COLUMN_MIN_CONFIDENCE", "0.85"))
+
+# English/German phrases -> candidate columns, in order of preference. The first
+# candidate that exists in the city's data is used.
+SYNONYMS: dict[str, list[str]] = {
+    # Pool & Wellness
+    "pool": ["Pool", "Schwimmbad"],
+    "swimming pool": ["Pool", "Schwimmbad"],
+    "swimming": ["Pool", "Schwimmbad"],
+    "schwimmbad": ["Pool", "Schwimmbad"],
+    "indoor pool": ["Innenpool", "Pool"],
+    "hallenbad": ["Innenpool", "Pool"],
+    "outdoor pool": ["Außenpool", "Pool"],
+    "heated pool": ["Beheizter Pool", "Pool"],
+    "infinity pool": ["Infinity-Pool", "Pool"],
+    "jacuzzi": ["Whirlpool/Jacuzzi", "Whirlpool"],
+    "hot tub": ["Whirlpool/Jacuzzi", "Whirlpool"],
+    "whirlpool": ["Whirlpool", "Whirlpool/Jacuzzi"],
+    "massage": ["Massage"],
+    "massagen": ["Massage"],
+    "spa": ["Spa & Wellnesscenter", "Wellness"],
+    "wellness center": ["Spa & Wellnesscenter", "Wellness"],
+    "wellness centre": ["Spa & Wellnesscenter", "Wellness"],
+    "steam room": ["Dampfbad"],
+    "steam bath": ["Dampfbad"],
+    "gym": ["Fitnesseinrichtung", "Fitness"],
+    "fitness center": ["Fitnesseinrichtung", "Fitness"],
+    "fitness centre": ["Fitnesseinrichtung", "Fitness"],
+    "fitness studio": ["Fitnesseinrichtung", "Fitness"],
+    "fitnessstudio": ["Fitnesseinrichtung", "Fitness"],
+    "workout": ["Fitnesseinrichtung", "Fitness"],
+    # Parken & Transport
+    "parking": ["Parken vor Ort"],
+    "parking space": ["Parken vor Ort"],
+    "parking spot": ["Parken vor Ort"],
+    "parking lot": ["Parken vor Ort"],
+    "car park": ["Parken vor Ort"],
+    "parkplatz": ["Parken vor Ort"],
+    "parken": ["Parken vor Ort"],
+    "free parking": ["Kostenlos parken vor Ort", "Parken vor Ort"],
+    "garage": ["Parkhaus/Tiefgarage"],
+    "underground parking": ["Parkhaus/Tiefgarage"],
+    "tiefgarage": ["Parkhaus/Tiefgarage"],
+    "valet": ["Parkservice"],
+    "valet parking": ["Parkservice"],
+    "charging station": ["Ladestation für Elektro-Autos"],
+    "ev charging": ["Ladestation für Elektro-Autos"],
+    "electric car": ["Ladestation für Elektro-Autos"],
+    "airport shuttle": ["Flughafenshuttle"],
+    "airport transfer": ["Flughafenshuttle"],
+    "shuttle": ["Shuttleservice"],
+    "car rental": ["Autovermietung"],
+    "rental car": ["Autovermietung"],
+    "bike rental": ["Fahrradvermietung"],
+    "bicycle rental": ["Fahrradvermietung"],
+    # Haustiere
+    "dog": ["Haustiere erlaubt"],
+    "cat": ["Haustiere erlaubt"],
+    "pet": ["Haustiere erlaubt"],
+    "pet friendly": ["Haustiere erlaubt"],
+    "pet-friendly": ["Haustiere erlaubt"],
+    "hund": ["Haustiere erlaubt"],
+    "hunde": ["Haustiere erlaubt"],
+    "haustier": ["Haustiere erlaubt"],
+    "haustiere": ["Haustiere erlaubt"],
+    # Essen & Trinken
+    "breakfast": ["Frühstück"],
+    "frühstück": ["Frühstück"],
+    "breakfast buffet": ["Frühstücksbuffet", "Frühstück"],
+    "continental breakfast": ["Kontinentales Frühstück", "Frühstück"],
+    "breakfast included": ["mealtype"],
+    "including breakfast": ["mealtype"],
+    "all inclusive": ["mealtype"],
+    "all-inclusive": ["mealtype"],
+    "half board": ["mealtype"],
+    "halbpension": ["mealtype"],
+    "vollpension": ["mealtype"],
+    "dinner": ["Abendessen"],
+    "room service": ["Zimmerservice"],
+    "kitchen": ["Küche", "Kitchenette"],
+    "vegetarian": ["Vegetarisch"],
+    "beach bar": ["Strandbar"],
+    "pool bar": ["Poolbar"],
+    "cafe": ["Café"],
+    "coffee machine": ["Espressomaschine"],
+    # Zimmer
+    "wifi": ["WLAN"],
+    "wi-fi": ["WLAN"],
+    "internet": ["WLAN"],
+    "air conditioning": ["Klimaanlage im Zimmer"],
+    "air-conditioning": ["Klimaanlage im Zimmer"],
+    "air conditioned": ["Klimaanlage im Zimmer"],
+    "air-conditioned": ["Klimaanlage im Zimmer"],
+    "aircon": ["Klimaanlage im Zimmer"],
+    "klimaanlage": ["Klimaanlage im Zimmer"],
+    "balcony": ["Balkon"],
+    "terrace": ["Terrasse"],
+    "rooftop terrace": ["Dachterrasse"],
+    "rooftop": ["Dachterrasse"],
+    "garden": ["Garten"],
+    "elevator": ["Aufzug"],
+    "lift": ["Aufzug"],
+    "fahrstuhl": ["Aufzug"],
+    "safe": ["Safe im Zimmer"],
+    "bathtub": ["Badewanne oder Dusche"],
+    "non-smoking": ["Nichtraucherzimmer"],
+    "non smoking": ["Nichtraucherzimmer"],
+    "extra bed": ["Zustellbett auf Anfrage", "Zustellbetten"],
+    "crib": ["Kinder-/Babybetten auf Anfrage"],
+    "cot": ["Kinder-/Babybetten auf Anfrage"],
+    "baby cot": ["Kinder-/Babybetten auf Anfrage"],
+    "laundry": ["Waschsalon/Wäscheservice"],
+    # Familie & Barrierefreiheit
+    "family": ["Familie"],
+    "family friendly": ["Familie"],
+    "family-friendly": ["Familie"],
+    "familienfreundlich": ["Familie"],
+    "kid": ["Familie"],
+    "children": ["Familie"],
+    "kinder": ["Familie"],
+    "kids club": ["Kinderclub"],
+    "playground": ["Kinderspielplatz"],
+    "babysitting": ["Baby-/ Kinderbetreuung"],
+    "childcare": ["Baby-/ Kinderbetreuung"],
+    "adults only": ["Nur für Erwachsene"],
+    "adults-only": ["Nur für Erwachsene"],
+    "wheelchair": ["Rollstuhlgerecht"],
+    "wheelchair accessible": ["Rollstuhlgerecht"],
+    "accessible": ["Barrierefrei"],
+    "barrier-free": ["Barrierefrei"],
+    "disabled": ["Behindertenfreundlich"],
+    # Stil
+    "luxury": ["Luxushotel"],
+    "luxurious": ["Luxushotel"],
+    "boutique": ["Boutique-/Designhotel"],
+    "design hotel": ["Boutique-/Designhotel"],
+    "beach hotel": ["Strandhotel"],
+    "romantic": ["Romantik/Flitterwochen"],
+    "honeymoon": ["Romantik/Flitterwochen"],
+    "business": ["Businesshotel"],
+    "conference": ["Konferenz- und Veranstaltungsräume"],
+    "meeting room": ["Konferenz- und Veranstaltungsräume"],
+    "private beach": ["Privater Strand"],
+    "beachfront": ["direkter Strandzugang (privater Strand)"],
+    "direct beach access": ["direkter Strandzugang (privater Strand)"],
+    # Sport
+    "tennis": ["Tennisplatz"],
+    "golf": ["Golfplatz (max. 3 km entfernt)"],
+    "hiking": ["Wandern"],
+    "cycling": ["Radfahren"],
+    "biking": ["Radfahren"],
+    "water sports": ["Wassersportmöglichkeiten vor Ort"],
+    "water slide": ["Wasserrutsche"],
+    "billiards": ["Billard"],
+    "pool table": ["Billard"],
+    "24-hour reception": ["24-Stunden-Rezeption"],
+    "24h reception": ["24-Stunden-Rezeption"],
+    "concierge": ["Concierge Service"],
+    # Preis, Bewertung, Sterne
+    "price": ["pricepernight"],
+    "cheap": ["pricepernight"],
+    "cheaper": ["pricepernight"],
+    "cheapest": ["pricepernight"],
+    "affordable": ["pricepernight"],
+    "inexpensive": ["pricepernight"],
+    "expensive": ["pricepernight"],
+    "budget": ["pricepernight"],
+    "eur": ["pricepernight"],
+    "euro": ["pricepernight"],
+    "dollar": ["pricepernight"],
+    "usd": ["pricepernight"],
+    "preis": ["pricepernight"],
+    "günstig": ["pricepernight"],
+    "billig": ["pricepernight"],
+    "rating": ["rating"],
+    "rated": ["rating"],
+    "review": ["rating"],
+    "score": ["rating"],
+    "bewertung": ["rating"],
+    "star": ["starcategory"],
+    "sterne": ["starcategory"],
+    # Entfernungen
+    "beach": ["distancetobeach"],
+    "strand": ["distancetobeach"],
+    "city center": ["distancetocity"],
+    "city centre": ["distancetocity"],
+    "downtown": ["distancetocity"],
+    "center": ["distancetocity"],
+    "centre": ["distancetocity"],
+    "zentrum": ["distancetocity"],
+    "innenstadt": ["distancetocity"],
+    "metro": ["distancetounderground"],
+    "subway": ["distancetounderground"],
+    "underground": ["distancetounderground"],
+    "u-bahn": ["distancetounderground"],
+    "tube": ["distancetounderground"],
+    "train station": ["distancetotrainstation"],
+    "station": ["distancetotrainstation"],
+    "bahnhof": ["distancetotrainstation"],
+    "airport": ["distancetoairport"],
+    "flughafen": ["distancetoairport"],
+    "lake": ["distancetobathing"],
+    # Sonstiges
+    "free cancellation": ["cancelable"],
+    "cancellation": ["cancelable"],
+    "cancelable": ["cancelable"],
+    "cancellable": ["cancelable"],
+    "refundable": ["cancelable"],
+    "stornierbar": ["cancelable"],
+    "suite": ["roomcategory"],
+    "double room": ["roomcategory"],
+    "single room": ["roomcategory"],
+}
+
+# Wörter, die zu einer Spalte gehören oder keine eigene Anforderung sind
+NEUTRAL = frozenset(
+    """
+    travel travelling traveling trip vacation holiday urlaub reise
+    night nights nacht nächte per pro than als least most max maximum min minimum
+    under below above over less more around about within near close nearby
+    walking walk distance km kilometer kilometre m meter metre mile minute
+    good great nice decent excellent only both either available included
+    space spot free guests guest people person persons adults adult two
+    unter über mindestens maximal höchstens nähe nah
+    """.split()
+)
+
+_TOKEN = re.compile(r"[^\W_]+(?:['\-/][^\W_]+)*")
+
+
+def _stem(token: str) -> str:
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    return [_stem(token) for token in _TOKEN.findall(text.lower())]
+
+
+_IGNORED = frozenset(_stem(word) for word in STOPWORDS | NEUTRAL)
+
+
+def _load_known_columns() -> list[str]:
+    """Columns the LLM may choose from (CATEGORY_STRING)."""
+    categories = load_grouped_columns_from_json_string(CATEGORY_STRING)
+    return [column for category in categories.values() for column in category]
+
+
+class ColumnMatch:
+    def __init__(self, columns: list[str], confidence: float, unmatched: list[str]):
+        self.columns = columns
+        self.confidence = confidence
+        self.unmatched = unmatched
+
+    def __repr__(self):
+        return (
+            f"ColumnMatch(columns={self.columns}, confidence={self.confidence:.2f}, "
+            f"unmatched={self.unmatched})"
+        )
+
+
+class ColumnMatcher:
+    """
+    Keyword/synonym index (English <-> German) from query phrases to hotel
+    columns. Column names themselves are phrases too, so "sauna" or
+    "restaurant" resolve without a synonym entry.
+    """
+
+    def __init__(self, columns: Optional[list[str]] = None):
+        self.columns = columns if columns is not None else _load_known_columns()
+        self.phrases: dict[tuple[str, ...], list[str]] = {}
+        for column in self.columns:
+            phrase = tuple(tokenize(column))
+            if phrase and phrase != ("hotel",):
+                self.phrases.setdefault(phrase, [column])
+        for phrase, candidates in SYNONYMS.items():
+            self.phrases[tuple(tokenize(phrase))] = candidates
+        self.max_phrase_length = max(len(phrase) for phrase in self.phrases)
+
+    def match(self, query: str, available: Optional[Container[str]] = None) -> ColumnMatch:
+        """
+        Resolves the columns mentioned in the query. `available` restricts the
+        result to columns of one city. Confidence is the share of meaningful
+        query words that were explained by a phrase.
+        """
+        tokens = tokenize(query)
+        columns: list[str] = []
+        unmatched: list[str] = []
+        content = explained = 0
+        i = 0
+        while i < len(tokens):
+            for length in range(min(self.max_phrase_length, len(tokens) - i), 0, -1):
+                candidates = self.phrases.get(tuple(tokens[i : i + length]))
+                if candidates is None:
+                    continue
+                column = next(
+                    (c for c in candidates if available is None or c in available),
+                    None,
+                )
+                if column is not None and column not in columns:
+                    columns.append(column)
+                content += 1
+                explained += 1
+                i += length
+                break
+            else:
+                token = tokens[i]
+                if token not in _IGNORED and not token[0].isdigit():
+                    content += 1
+                    unmatched.append(token)
+                i += 1
+
+        confidence = explained / content if content and columns else 0.0
+        return ColumnMatch(columns, confidence, unmatched)
+
+
+column_matcher = ColumnMatcher()
@@ -0,0 +1,119 @@
+from typing import Optional
+
+import numpy as np
+
+from amenity_bits import AMENITY_COLUMNS, group_mask, is_flag
+from hotel_store import HotelTable, normalize_column_name
+from models import AMENITY_GROUPS
+
+# "boolean": 0/1-Spalten (Amenities), "numeric": Preise, Ratings, Distanzen, ...
+# "categorical": Strings mit festem Wertebereich (mealtype, ...)
+KINDS = ("boolean", "numeric", "categorical")
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+class ColumnInfo:
+    """Type and value statistics of one column of a city dataset."""
+
+    __slots__ = ("name", "kind", "null_ratio", "min", "max", "quantiles", "distinct")
+
+    def __init__(
+        self,
+        name: str,
+        kind: Optional[str],
+        null_ratio: float,
+        distinct: frozenset,
+        min: Optional[float] = None,
+        max: Optional[float] = None,
+        quantiles: Optional[dict[float, float]] = None,
+    ):
+        self.name = name
+        self.kind = kind  # None: nicht filterbar (leer oder gemischte Typen)
+        self.null_ratio = null_ratio
+        self.distinct = distinct
+        self.min = min
+        self.max = max
+        self.quantiles = quantiles or {}
+
+    @property
+    def possible_values(self) -> Optional[frozenset]:
+        """Allowed values for categorical columns, None otherwise."""
+        return self.distinct if self.kind == "categorical" else None
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "kind": self.kind,
+            "null_ratio": self.null_ratio,
+            "min": self.min,
+            "max": self.max,
+            "quantiles": {str(q): v for q, v in self.quantiles.items()},
+            "distinct_count": len(self.distinct),
+        }
+
+    def __repr__(self):
+        return f"ColumnInfo({self.name!r}, kind={self.kind!r})"
+
+
+def _numeric_info(name: str, kind: str, values: np.ndarray) -> ColumnInfo:
+    numbers = values.astype(float)
+    present = numbers[~np.isnan(numbers)]
+    null_ratio = 1 - len(present) / len(values) if len(values) else 0.0
+    if not len(present):
+        return ColumnInfo(name, None, null_ratio, frozenset())
+    return ColumnInfo(
+        name,
+        kind,
+        round(null_ratio, 4),
+        frozenset(np.unique(present).tolist()),
+        min=float(present.min()),
+        max=float(present.max()),
+        quantiles=dict(zip(QUANTILES, np.quantile(present, QUANTILES).tolist())),
+    )
+
+
+def _column_info(name: str, values: np.ndarray) -> ColumnInfo:
+    if values.dtype.kind == "b":
+        return _numeric_info(name, "boolean", values)
+    if values.dtype.kind in "iuf":
+        # Flag nur bei Werten aus {0, 1}; außerhalb der Amenities müssen auch
+        # beide vorkommen (nights = 1 in allen Hotels ist eine Anzahl)
+        kind = "numeric"
+        if is_flag(values) and (
+            name in AMENITY_COLUMNS or set(np.unique(values[values == values])) == {0, 1}
+        ):
+            kind = "boolean"
+        return _numeric_info(name, kind, values)
+
+    present = [value for value in values.tolist() if value is not None]
+    null_ratio = round(1 - len(present) / len(values), 4) if len(values) else 0.0
+    if present and all(isinstance(value, str) for value in present):
+        return ColumnInfo(name, "categorical", null_ratio, frozenset(present))
+    if present and all(isinstance(value, bool) for value in present):
+        return ColumnInfo(name, "boolean", null_ratio, frozenset(present))
+    return ColumnInfo(name, None, null_ratio, frozenset())
+
+
+def build_schema(table: HotelTable) -> dict[str, ColumnInfo]:
+    schema = {
+        name: _column_info(name, values) for name, values in table.columns.items()
+    }
+    # Synthetische Gruppenspalten (Massage, Pool) sind immer boolesch
+    for group in AMENITY_GROUPS:
+        schema[group] = _numeric_info(group, "boolean", group_mask(table, group))
+    return schema
+
+
+def get_schema(table: HotelTable) -> dict[str, ColumnInfo]:
+    """Schema of a city dataset, computed once per HotelTable."""
+    return table.derive("schema", lambda: build_schema(table))
+
+
+def column_info(table: HotelTable, field: str) -> Optional[ColumnInfo]:
+    """
+    Looks up a field (raw or "amenity_"-prefixed name) in the schema.
+    Returns None if the column does not exist or cannot be filtered on.
+    """
+    info = get_schema(table).get(normalize_column_name(field))
+    if info is None or info.kind is None:
+        return None
+    return info
@@ -433,6 +433,22 @@ CATEGORY_STRING = """
 }
 """
 
+# Füllwörter (Englisch/Deutsch) ohne Einfluss auf Spaltenwahl und Constraints,
+# gemeinsam für column_matcher und semantic_cache. Verneinungen ("no",
+# "without", "kein", "ohne", ...) sind bewusst NICHT enthalten.
+STOPWORDS = frozenset(
+    """
+    a an and the i im i'm me my we our us you your please pls can could would
+    like love want wants need needs needed looking look find search show give get
+    for with in on at of to from by is are be am it its this that some any also
+    hotel hotels room rooms place stay accommodation one which has have having
+    offers offering provides providing there where just really very or but
+    ich wir mich mir uns bitte suche suchen möchte möchten brauche brauchen
+    ein eine einen einem einer der die das den dem des und mit im am an auf
+    für von zu zum zur ist sind hat haben gibt zimmer unterkunft oder
+    """.split()
+)
+
 def load_grouped_columns_from_json_string(json_string: str) -> dict[str, list[str]]:
     data = json.loads(json_string)
 
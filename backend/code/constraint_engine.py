@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from amenity_bits import group_mask
+from hotel_store import HotelTable
+from models import AMENITY_GROUPS, Constraint
+
+
+def _codes(table: HotelTable, column: str) -> tuple[np.ndarray, list]:
+    """Categorical encoding of a column: one int code per row, -1 for None/NaN."""
+
+    def build() -> tuple[np.ndarray, list]:
+        codes, uniques = pd.factorize(table.columns[column], use_na_sentinel=True)
+        return codes, list(uniques)
+
+    return table.derive(("codes", column), build)
+
+
+def _truthy(values: np.ndarray) -> np.ndarray:
+    if values.dtype.kind in "biuf":
+        # NaN != 0 -> True, wie bool(float("nan"))
+        return values != 0
+    return np.fromiter(
+        (value is not None and bool(value) for value in values),
+        dtype=bool,
+        count=len(values),
+    )
+
+
+def _numeric(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the column as float array plus a mask of rows that hold a number."""
+    if values.dtype.kind in "biuf":
+        return values, np.ones(len(values), dtype=bool)
+    is_number = np.fromiter(
+        (isinstance(value, (int, float)) for value in values),
+        dtype=bool,
+        count=len(values),
+    )
+    numbers = np.where(is_number, values, np.nan).astype(float)
+    return numbers, is_number
+
+
+def constraint_mask(constraint: Constraint, table: HotelTable) -> np.ndarray:
+    """
+    Vectorized equivalent of `constraint.is_satisfied` for every row of the table.
+    """
+    column = constraint.column
+    if column in AMENITY_GROUPS:
+        mask = group_mask(table, column)
+        return mask if constraint.value else ~mask
+    if column not in table.columns:
+        return np.zeros(len(table), dtype=bool)
+
+    values = table.columns[column]
+
+    if constraint.datatype == int:
+        mask = _truthy(values) == bool(constraint.value)
+        if values.dtype.kind == "O":
+            mask &= values != None  # noqa: E711 – elementweiser Vergleich
+        return mask
+
+    elif constraint.datatype == float:
+        numbers, is_number = _numeric(values)
+        with np.errstate(invalid="ignore"):
+            return constraint.compare(numbers, constraint.value) & is_number
+
+    elif constraint.datatype == list[str]:
+        codes, uniques = _codes(table, column)
+        # Lookup je Code; der letzte Eintrag fängt den Code -1 (None/NaN) ab
+        wanted = np.array([value in constraint.value for value in uniques] + [False])
+        return wanted[codes]
+
+    else:
+        raise TypeError(f"Unsupported datatype: {constraint.datatype}")
+
+
+def score_table(constraints: list[Constraint], table: HotelTable) -> np.ndarray:
+    """Number of satisfied constraints per row."""
+    scores = np.zeros(len(table), dtype=np.int64)
+    for constraint in constraints:
+        scores += constraint_mask(constraint, table)
+    return scores
+
+
+def scores_to_dict(scores: np.ndarray, table: HotelTable) -> dict[str, int]:
+    """dict view as returned by get_score: only hotels with a positive score."""
+    rows = np.flatnonzero(scores > 0)
+    return dict(zip(table.names[rows].tolist(), scores[rows].tolist()))
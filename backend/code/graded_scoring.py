@@ -0,0 +1,101 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+from column_schema import get_schema
+from constraint_engine import _numeric, constraint_mask
+from hotel_store import HotelTable
+from models import Constraint
+from ranking import _ltr_scores
+
+# "binary": +1 pro erfüllter Constraint (wie bisher), "graded": gewichtete,
+# teilweise Erfüllung plus ltr_score-Anteil
+RANKING_MODES = ("binary", "graded")
+RANKING_MODE = os.getenv("RANKING_MODE", "binary")
+# Abklingbreite jenseits der Schwelle, relativ zur Spannweite (q90 - q10) der Spalte
+GRADED_DECAY = float(os.getenv("GRADED_DECAY", "0.25"))
+# Anteil des normalisierten ltr_score am Endscore
+GRADED_LTR_WEIGHT = float(os.getenv("GRADED_LTR_WEIGHT", "0.1"))
+
+
+def _decay_scale(table: HotelTable, column: str) -> float:
+    info = get_schema(table).get(column)
+    spread = 0.0
+    if info is not None and info.quantiles:
+        spread = info.quantiles[0.9] - info.quantiles[0.1]
+        if spread <= 0 and info.max is not None:
+            spread = info.max - info.min
+    return max(spread * GRADED_DECAY, 1e-9)
+
+
+def satisfaction(constraint: Constraint, table: HotelTable) -> np.ndarray:
+    """
+    Degree in [0, 1] to which each row satisfies the constraint. Boolean and
+    categorical constraints are 0 or 1. A float constraint is 1 inside its
+    range and decays exponentially with the distance beyond the threshold, so
+    41 EUR still scores well for "< 40 EUR" and 400 EUR does not.
+    """
+    if constraint.datatype != float or constraint.column not in table.columns:
+        return constraint_mask(constraint, table).astype(float)
+
+    numbers, is_number = _numeric(table.columns[constraint.column])
+    value = constraint.value
+    comparison = constraint.comparison
+    # Überschreitung der Schwelle, in-place um Zwischen-Arrays zu sparen;
+    # dtype=float, sonst bleibt eine int-Spalte mit int-Wert ganzzahlig
+    if comparison in ("<", "<="):
+        degree = np.subtract(numbers, value, dtype=float)
+    elif comparison in (">", ">="):
+        degree = np.subtract(value, numbers, dtype=float)
+    else:
+        degree = np.abs(np.subtract(numbers, value, dtype=float))
+    # Innerhalb des Bereichs ist die Überschreitung <= 0 -> exp(0) = 1; NaN -> 0
+    np.maximum(degree, 0, out=degree)
+    degree *= -1 / _decay_scale(table, constraint.column)
+    np.exp(degree, out=degree)
+    degree[~(is_number & (degree == degree))] = 0.0
+    return degree
+
+
+def _normalized_ltr(table: HotelTable) -> np.ndarray:
+    def build() -> np.ndarray:
+        scores = _ltr_scores(table)
+        finite = np.isfinite(scores)
+        if not finite.any():
+            return np.zeros(len(table))
+        low, high = scores[finite].min(), scores[finite].max()
+        normalized = np.zeros(len(table))
+        if high > low:
+            normalized[finite] = (scores[finite] - low) / (high - low)
+        return normalized
+
+    return table.derive("ltr_normalized", build)
+
+
+def graded_scores(
+    constraints: list[Constraint],
+    table: HotelTable,
+    ltr_weight: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Weighted mean satisfaction over all constraints (weights from extraction,
+    default 1.0), blended with the min-max normalized ltr_score:
+    (1 - ltr_weight) * match + ltr_weight * ltr. Rows that match no constraint
+    at all get 0 and are not ranked.
+    """
+    ltr_weight = GRADED_LTR_WEIGHT if ltr_weight is None else ltr_weight
+    match = np.zeros(len(table))
+    total_weight = 0.0
+    for constraint in constraints:
+        degree = satisfaction(constraint, table)
+        if constraint.weight != 1.0:
+            degree *= constraint.weight
+        match += degree
+        total_weight += constraint.weight
+    if total_weight <= 0:
+        return match
+    match /= total_weight
+    scores = (1 - ltr_weight) * match + ltr_weight * _normalized_ltr(table)
+    scores[match <= 0] = 0.0
+    return scores
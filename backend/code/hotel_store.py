@@ -0,0 +1,210 @@
+import os
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from tracing import tracer
+
+HOTELS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "hotels"
+)
+FILE_PREFIX = "resultlist_"
+FILE_SUFFIX = ".parquet"
+# Manche Städte liefern die Amenity-Spalten als "amenity_<Name>"
+AMENITY_PREFIX = "amenity_"
+
+
+def normalize_column_name(column: str) -> str:
+    return column.strip().removeprefix(AMENITY_PREFIX).strip()
+
+
+class HotelDict(dict):
+    """
+    The classic `dict[str, dict[str, object]]` view of a city, as expected by
+    find_matching_hotels. Keeps a reference to the columnar table it was built
+    from, so the pipeline can work on the arrays instead of the dicts.
+    """
+
+    __slots__ = ("table",)
+
+
+class HotelTable:
+    """
+    Columnar representation of one city: one NumPy array per column plus a
+    hotel_name -> row index. Column names are normalized (no "amenity_" prefix,
+    no surrounding whitespace), so the same amenity has the same name in every
+    city.
+    """
+
+    def __init__(self, names: np.ndarray, columns: dict[str, np.ndarray]):
+        self.names = names
+        self.columns = columns
+        self.index = {name: row for row, name in enumerate(names.tolist())}
+        self._hotels: Optional[HotelDict] = None
+        self._derived: dict[object, object] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.columns
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "HotelTable":
+        if "hotel_name" not in df.columns:
+            raise ValueError("Parquet file must contain a 'hotel_name' column.")
+
+        # Wie beim dict-Aufbau: Position des ersten, Werte des letzten Vorkommens
+        rows = list({name: row for row, name in enumerate(df["hotel_name"])}.values())
+        df = df.iloc[rows]
+
+        columns = {}
+        for column in df.columns:
+            if column == "hotel_name":
+                continue
+            series = df[column]
+            if series.dtype.kind in "biuf":
+                values = series.to_numpy()
+            else:
+                # Strings/Objekte: fehlende Werte einheitlich als None
+                values = series.astype(object)
+                values = values.where(series.notna(), None).to_numpy()
+            columns[normalize_column_name(column)] = values
+
+        names = df["hotel_name"].astype(object).to_numpy()
+        return cls(names, columns)
+
+    @classmethod
+    def from_parquet(cls, parquet_path: str) -> "HotelTable":
+        return cls.from_dataframe(pd.read_parquet(parquet_path))
+
+    @classmethod
+    def from_hotels(cls, hotels: dict[str, dict[str, object]]) -> "HotelTable":
+        """Builds a table from the dict view (e.g. hotels passed in by a caller)."""
+        if isinstance(hotels, HotelDict):
+            return hotels.table
+        names = list(hotels.keys())
+        column_names: dict[str, None] = {}
+        for hotel_data in hotels.values():
+            column_names.update(dict.fromkeys(hotel_data))
+
+        columns = {}
+        for column in column_names:
+            values = [hotel_data.get(column) for hotel_data in hotels.values()]
+            columns[normalize_column_name(column)] = _to_array(values)
+
+        table = cls(np.asarray(names, dtype=object), columns)
+        table._hotels = HotelDict(hotels)
+        table._hotels.table = table
+        return table
+
+    def derive(self, key: object, build: Callable[[], object]) -> object:
+        """
+        Caches data derived from this table (masks, indexes, ...). The table is
+        immutable, so anything derived from it stays valid for its lifetime.
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            value = self._derived[key] = build()
+            return value
+
+    def to_hotels(self) -> HotelDict:
+        """Returns the (cached) dict-of-dicts view of this table."""
+        if self._hotels is None:
+            column_names = list(self.columns.keys())
+            column_values = [values.tolist() for values in self.columns.values()]
+            hotels = HotelDict(
+                (name, dict(zip(column_names, row)))
+                for name, row in zip(self.names.tolist(), zip(*column_values))
+            )
+            hotels.table = self
+            self._hotels = hotels
+        return self._hotels
+
+
+def _to_array(values: list) -> np.ndarray:
+    array = np.asarray(values) if values else np.empty(0)
+    if array.dtype.kind in "biuf":
+        return array
+    present = [value for value in values if value is not None]
+    if present and all(
+        isinstance(value, (int, float)) and not isinstance(value, bool)
+        for value in present
+    ):
+        # Zahlen mit Lücken: None -> NaN, damit die Spalte numerisch bleibt
+        return np.asarray(
+            [np.nan if value is None else value for value in values], dtype=float
+        )
+    return np.asarray(values, dtype=object)
+
+
+def as_table(hotels: dict[str, dict[str, object]]) -> HotelTable:
+    """
+    Returns the columnar table behind a hotels dict. Dicts handed out by the
+    HotelStore (or by HotelTable.to_hotels) carry their table; any other dict
+    is converted on every call, so callers convert it once with
+    `as_table(hotels).to_hotels()` and pass that on.
+    """
+    table = getattr(hotels, "table", None)
+    if table is not None:
+        return table
+    return HotelTable.from_hotels(hotels)
+
+
+class HotelStore:
+    """
+    In-memory hotel data keyed by city. Each parquet file in `data_dir` is read
+    once into a HotelTable and only re-read when its mtime changes.
+    """
+
+    def __init__(self, data_dir: str = HOTELS_DIR):
+        self.data_dir = data_dir
+        self._entries: dict[str, tuple[float, HotelTable]] = {}
+        self._lock = threading.Lock()
+
+    def city_files(self) -> dict[str, str]:
+        files = {}
+        for file_name in sorted(os.listdir(self.data_dir)):
+            if file_name.startswith(FILE_PREFIX) and file_name.endswith(FILE_SUFFIX):
+                city = file_name[len(FILE_PREFIX) : -len(FILE_SUFFIX)]
+                files[city] = os.path.join(self.data_dir, file_name)
+        return files
+
+    def cities(self) -> list[str]:
+        return list(self.city_files().keys())
+
+    def load_all(self) -> None:
+        for city in self.city_files():
+            self.get_table(city)
+
+    def get_table(self, city: str) -> HotelTable:
+        """Raises KeyError if there is no parquet file for the city."""
+        if os.path.basename(city) != city:
+            raise KeyError(city)
+        path = os.path.join(self.data_dir, f"{FILE_PREFIX}{city}{FILE_SUFFIX}")
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self._entries.pop(city, None)
+            raise KeyError(city)
+
+        entry = self._entries.get(city)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+
+        with self._lock:
+            entry = self._entries.get(city)
+            if entry is None or entry[0] != mtime:
+                with tracer.span("parquet", city=city):
+                    entry = (mtime, HotelTable.from_parquet(path))
+                self._entries[city] = entry
+        return entry[1]
+
+    def get_hotels(self, city: str) -> HotelDict:
+        return self.get_table(city).to_hotels()
+
+
+hotel_store = HotelStore()
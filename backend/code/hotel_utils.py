@@ -1,10 +1,38 @@
+import asyncio
 import json
-import pandas as pd
-from typing import Dict, List, Optional
+import os
+from typing import Optional
+
+import numpy as np
+
 from models import Constraint
-from llm_utils import get_openai_client, get_boolean_constraint, get_comparison_constraint, get_value_constraint
+from hotel_store import HotelTable, as_table
+from column_schema import ColumnInfo, column_info
+from constraint_engine import scores_to_dict
+from inverted_index import score
+from ranking import TOP_K, top_k_by_ltr, top_k_by_score, top_k_by_value
+from graded_scoring import RANKING_MODE, RANKING_MODES, graded_scores
+from numeric_parser import LOCAL_NUMERIC_PARSER_ENABLED, parse_numeric_constraints
+from llm_utils import (
+    get_boolean_constraint,
+    get_comparison_constraint,
+    get_value_constraint,
+    get_batched_constraints,
+    LLM_CALL_BUDGET,
+)
 from constants import CATEGORY_STRING, load_grouped_columns_from_json_string
 
+# Parallele LLM-Aufrufe in create_constraints
+CONSTRAINT_MAX_CONCURRENCY = int(os.getenv("CONSTRAINT_MAX_CONCURRENCY", "8"))
+# Frist pro Aufruf; Standard: genug für alle Wiederholungen in llm_utils._complete
+CONSTRAINT_CALL_TIMEOUT = float(os.getenv("CONSTRAINT_CALL_TIMEOUT", LLM_CALL_BUDGET))
+# Gesamtfrist für alle Aufrufe; was danach noch läuft, wird abgebrochen. Die
+# Aufrufe laufen parallel, der Standard lässt also jedem seine Wiederholungen
+CONSTRAINT_DEADLINE = float(os.getenv("CONSTRAINT_DEADLINE", LLM_CALL_BUDGET))
+# "per_column": ein LLM-Aufruf pro Spalte, "batched": ein Aufruf für alle Spalten
+EXTRACTION_MODES = ("per_column", "batched")
+CONSTRAINT_EXTRACTION_MODE = os.getenv("CONSTRAINT_EXTRACTION_MODE", "per_column")
+
 def load_grouped_columns_from_json_string(json_string: str) -> dict[str, list[str]]:
     data = json.loads(json_string)
 
@@ -23,36 +51,14 @@ def load_grouped_columns_from_json_string(json_string: str) -> dict[str, list[st
     return data
 
 def parse_hotels_from_parquet(parquet_path: str) -> dict:
-    df = pd.read_parquet(parquet_path)
-
-    if "hotel_name" not in df.columns:
-        raise ValueError("Parquet file must contain a 'hotel_name' column.")
-
-    hotels = {}
-
-    for _, row in df.iterrows():
-        hotel_name = row["hotel_name"]
-        hotel_data = row.drop(labels=["hotel_name"]).to_dict()
-        hotel_data = {
-            k: (v.item() if hasattr(v, "item") else v) for k, v in hotel_data.items()
-        }
-        hotels[hotel_name] = hotel_data
-
-    return hotels
+    return HotelTable.from_parquet(parquet_path).to_hotels()
 
 def get_score(
     constraints: list[Constraint], hotels: dict[str, dict[str, object]]
 ) -> dict[str, int]:
-    scores = {}
-
-    for hotel_name, hotel_data in hotels.items():
-        score = 0
-        for constraint in constraints:
-            score += constraint.is_satisfied(hotel_data)
-        if score > 0:
-            scores[hotel_name] = score
-
-    return scores
+    # Boolesche Constraints über den invertierten Index, der Rest als NumPy-Masken
+    table = as_table(hotels)
+    return scores_to_dict(score(constraints, table), table)
 
 def sort_hotels_by_score(
     scores: dict[str, int], hotels: dict[str, dict[str, object]]
@@ -67,47 +73,162 @@ def sort_hotels_by_score(
     return [hotel_name for hotel_name, _ in sorted_hotels]
 
 def sort_hotels_by_ltr_score(hotels: dict[str, dict[str, object]]) -> list[str]:
-    sorted_hotels = sorted(
-        hotels.items(), key=lambda item: item[1].get("ltr_score", 0), reverse=True
-    )
-    return [hotel_name for hotel_name, _ in sorted_hotels]
+    # Vorberechnete ltr-Ordnung der Stadt
+    return top_k_by_ltr(as_table(hotels), None)
+
+def _ranking_mode(mode: Optional[str]) -> str:
+    mode = mode or RANKING_MODE
+    if mode not in RANKING_MODES:
+        raise ValueError(f"Unknown ranking mode: {mode}")
+    return mode
+
+def score_hotels(
+    constraints: list[Constraint],
+    hotels: dict[str, dict[str, object]],
+    mode: Optional[str] = None,
+) -> np.ndarray:
+    """
+    Score per table row: number of satisfied constraints (mode="binary") or
+    the weighted partial match blended with ltr_score (mode="graded", see
+    graded_scoring). Defaults to RANKING_MODE.
+    """
+    table = as_table(hotels)
+    if _ranking_mode(mode) == "graded":
+        return graded_scores(constraints, table)
+    return score(constraints, table)
+
+def rank_hotels(
+    scores: np.ndarray,
+    hotels: dict[str, dict[str, object]],
+    k: int = TOP_K,
+    mode: Optional[str] = None,
+) -> list[str]:
+    """The k best hotel names for scores from score_hotels."""
+    table = as_table(hotels)
+    if _ranking_mode(mode) == "graded":
+        return top_k_by_value(scores, table, k)
+    return top_k_by_score(scores, table, k)
 
-def create_constraints(
+def top_hotels_by_score(
+    constraints: list[Constraint],
+    hotels: dict[str, dict[str, object]],
+    k: int = TOP_K,
+    mode: Optional[str] = None,
+) -> list[str]:
+    """
+    mode="binary": same result as sort_hotels_by_score(get_score(...))[:k],
+    without building the score dict or sorting all candidates.
+    mode="graded": weighted partial matches blended with ltr_score.
+    """
+    hotels = as_table(hotels).to_hotels()
+    return rank_hotels(score_hotels(constraints, hotels, mode), hotels, k, mode)
+
+def top_hotels_by_ltr_score(
+    hotels: dict[str, dict[str, object]], k: int = TOP_K
+) -> list[str]:
+    return top_k_by_ltr(as_table(hotels), k)
+
+def _constraint_call(info: ColumnInfo, query: str, client) -> tuple:
+    """
+    Picks the LLM extractor for a column, returns (function, args).
+    """
+    if info.kind == "boolean":
+        return get_boolean_constraint, (info.name, query, client)
+    if info.kind == "numeric":
+        return get_comparison_constraint, (info.name, query, client)
+    return get_value_constraint, (info.name, query, client, info.possible_values)
+
+async def create_constraints(
     hotels: dict[str, dict[str, object]],
     query: str,
     important_fields: list[str],
     client,
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    mode: Optional[str] = None,
+    deadline: Optional[float] = None,
+    report: Optional[dict[str, object]] = None,
 ) -> list[Constraint]:
-    constraints = []
+    """
+    Extracts the constraints for the given fields.
+
+    mode="per_column": one LLM call per field. The calls run concurrently, at
+    most `max_concurrency` at a time; a call that fails, times out or returns
+    REMOVE_CONSTRAINT simply yields no constraint. Calls still running after
+    `deadline` seconds are cancelled and the constraints found so far are
+    returned.
+    mode="batched": a single structured-output call for all fields.
+    In both modes, float fields with an explicit number in the query
+    ("cheaper than 40 EUR") are parsed locally and never reach the LLM.
+    The constraints come back in the order of `important_fields`.
+    report["constraints_complete"] is False if an LLM call failed, timed out
+    or was cut off by the deadline, i.e. the result may be missing constraints.
+    """
+    mode = mode or CONSTRAINT_EXTRACTION_MODE
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode: {mode}")
+    max_concurrency = max_concurrency or CONSTRAINT_MAX_CONCURRENCY
+    timeout = timeout or CONSTRAINT_CALL_TIMEOUT
+    deadline = deadline or CONSTRAINT_DEADLINE
+
+    # Spaltentypen kommen aus dem einmal pro Stadt berechneten Schema
+    table = as_table(hotels)
+    parsed = parse_numeric_constraints(query) if LOCAL_NUMERIC_PARSER_ENABLED else {}
+    local, remaining, position = [], {}, {}
     for field in important_fields:
-        # Beispiel: Automatisch Typen erkennen anhand der ersten Hotel-Objekte
-        if field == "Massage" or field == "Pool":
-            constraint = get_boolean_constraint(field, query, client)
-            if constraint:
-                constraints.append(constraint)
+        info = column_info(table, field)
+        if info is None:
             continue
-        if field == "starcategory":
-            constraint = get_comparison_constraint(field, query, client)
-            if constraint:
-                constraints.append(constraint)
-            continue
-        for hotel in hotels.values():
-            if field in hotel:
-                value = hotel[field]
-                if isinstance(value, int):
-                    constraint = get_boolean_constraint(field, query, client)
-                elif isinstance(value, float):
-                    constraint = get_comparison_constraint(field, query, client)
-                elif isinstance(value, str):
-                    possible_values = set()
-                    for hotel_data in hotels.values():
-                        possible_values.add(hotel_data[field])
-                    constraint = get_value_constraint(
-                        field, query, client, possible_values
-                    )
-                else:
-                    constraint = None
-                if constraint:
-                    constraints.append(constraint)
-                break  # Field gefunden und behandelt
-    return constraints 
\ No newline at end of file
+        position.setdefault(info.name, len(position))
+        if info.kind == "numeric" and info.name in parsed:
+            local.append(parsed[info.name])
+        else:
+            remaining[info.name] = info
+
+    def finish(constraints: list[Constraint], complete: bool) -> list[Constraint]:
+        if report is not None:
+            report["constraints_complete"] = complete
+        # Lokal geparste und per LLM gefundene Constraints in Feldreihenfolge
+        return sorted(constraints, key=lambda c: position[c.column])
+
+    if mode == "batched":
+        if not remaining:
+            return finish(local, True)
+        try:
+            return finish(
+                local
+                + await asyncio.wait_for(
+                    get_batched_constraints(query, remaining, client), timeout
+                ),
+                True,
+            )
+        except Exception:
+            return finish(local, False)
+
+    calls = [_constraint_call(info, query, client) for info in remaining.values()]
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(function, args) -> Optional[Constraint]:
+        async with semaphore:
+            return await asyncio.wait_for(function(*args), timeout)
+
+    tasks = [asyncio.create_task(run(function, args)) for function, args in calls]
+    if not tasks:
+        return finish(local, True)
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+    finally:
+        # Auch wenn create_constraints selbst abgebrochen wird: keine Aufrufe zurücklassen
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    succeeded = [
+        task
+        for task in tasks
+        if task in done and not task.cancelled() and task.exception() is None
+    ]
+    found = [task.result() for task in succeeded]
+    return finish(
+        local + [c for c in found if isinstance(c, Constraint)],
+        len(succeeded) == len(tasks),
+    )
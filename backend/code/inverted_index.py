@@ -0,0 +1,93 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+from column_schema import get_schema
+from constraint_engine import constraint_mask, score_table
+from hotel_store import HotelTable
+from models import Constraint
+from range_index import range_index
+
+# "dense": jede Constraint als Maske über alle Hotels,
+# "inverted": boolesche Constraints über die Postings-Listen, Vergleiche über
+# den sortierten Range-Index
+SCORING_MODES = ("dense", "inverted")
+SCORING_MODE = os.getenv("SCORING_MODE", "inverted")
+
+
+class InvertedIndex:
+    """
+    Boolean column -> sorted row ids of the hotels that satisfy "column = 1"
+    (amenity groups included). Most amenities are sparse, so the postings are
+    much shorter than the table. Postings for "column = 0" are built on demand.
+    """
+
+    def __init__(self, table: HotelTable):
+        self.table = table
+        self.size = len(table)
+        self._postings: dict[tuple[str, bool], np.ndarray] = {}
+        for name, info in get_schema(table).items():
+            if info.kind == "boolean":
+                self._postings[(name, True)] = self._build(name, True)
+
+    def _build(self, column: str, value: bool) -> np.ndarray:
+        mask = constraint_mask(Constraint(column=column, datatype=int, value=value), self.table)
+        return np.flatnonzero(mask).astype(np.int32)
+
+    def postings(self, column: str, value: bool = True) -> Optional[np.ndarray]:
+        """Row ids with `column == value`, None if the column is not indexed."""
+        if (column, True) not in self._postings:
+            return None
+        key = (column, bool(value))
+        if key not in self._postings:
+            self._postings[key] = self._build(column, key[1])
+        return self._postings[key]
+
+    def density(self, column: str) -> Optional[float]:
+        rows = self.postings(column)
+        return len(rows) / self.size if rows is not None and self.size else None
+
+
+def inverted_index(table: HotelTable) -> InvertedIndex:
+    """Index of a city, built once per HotelTable."""
+    return table.derive("inverted_index", lambda: InvertedIndex(table))
+
+
+def score_table_inverted(constraints: list[Constraint], table: HotelTable) -> np.ndarray:
+    """
+    Same result as constraint_engine.score_table. Boolean constraints take
+    their postings from the inverted index, float constraints their row set
+    from the range index; everything is counted with one bincount. Only
+    categorical constraints fall back to the dense masks.
+    """
+    index, ranges = inverted_index(table), range_index(table)
+    postings, dense = [], []
+    for constraint in constraints:
+        rows = None
+        if constraint.datatype == int:
+            rows = index.postings(constraint.column, bool(constraint.value))
+        elif constraint.datatype == float:
+            rows = ranges.rows(constraint)
+        if rows is None:
+            dense.append(constraint)
+        else:
+            postings.append(rows)
+
+    if postings:
+        scores = np.bincount(np.concatenate(postings), minlength=len(table))
+    else:
+        scores = np.zeros(len(table), dtype=np.int64)
+    if dense:
+        scores += score_table(dense, table)
+    return scores
+
+
+def score(constraints: list[Constraint], table: HotelTable, mode: Optional[str] = None) -> np.ndarray:
+    """Scores with the configured SCORING_MODE."""
+    mode = mode or SCORING_MODE
+    if mode not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode: {mode}")
+    if mode == "inverted":
+        return score_table_inverted(constraints, table)
+    return score_table(constraints, table)
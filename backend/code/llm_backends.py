@@ -0,0 +1,231 @@
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from typing import Optional
+
+import httpx
+from openai import APITimeoutError
+
+from llm_cache import LLMResponseCache
+from llm_pool import client_pool
+from llm_stub import StubLLM
+
+# "openai" (Standard), "stub", "record" oder "replay"
+LLM_BACKENDS = ("openai", "stub", "record", "replay")
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+# Stub: mittlere Latenz in Sekunden, Streuung (sigma der Lognormalverteilung)
+# und Anteil der Aufrufe, die mit einem Timeout fehlschlagen
+LLM_STUB_LATENCY = float(os.getenv("LLM_STUB_LATENCY", "0"))
+LLM_STUB_JITTER = float(os.getenv("LLM_STUB_JITTER", "0"))
+LLM_STUB_FAILURE_RATE = float(os.getenv("LLM_STUB_FAILURE_RATE", "0"))
+LLM_STUB_SEED = os.getenv("LLM_STUB_SEED")
+LLM_STUB_SCRIPT = os.getenv("LLM_STUB_SCRIPT")  # JSON: [{"match": regex, "response": str}]
+# Record/Replay: JSONL-Datei mit einer aufgezeichneten Antwort pro Zeile
+LLM_RECORDING_PATH = os.getenv(
+    "LLM_RECORDING_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "llm_recording.jsonl"),
+)
+# Replay: aufgezeichnete Latenz nachspielen; fehlende Antworten -> "error" oder "stub"
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "0") == "1"
+LLM_REPLAY_MISSING = os.getenv("LLM_REPLAY_MISSING", "error")
+
+
+def _response(content: str, prompt_tokens: int, completion_tokens: int):
+    """A response object with the fields llm_utils reads from ChatCompletion."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+        ),
+    )
+
+
+class LLMBackend(ABC):
+    """
+    Interface behind llm_utils._complete: anything with an async
+    `chat.completions.create(model, messages, **kwargs)` like AsyncOpenAI.
+    Backends are installed process-wide with `client_pool.use(backend)`.
+    """
+
+    name = "backend"
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=self)
+        self.calls = 0
+
+    @abstractmethod
+    async def create(self, model: str, messages: list[dict[str, str]], **kwargs):
+        """Returns a ChatCompletion-like object (choices[0].message.content, usage)."""
+
+
+class StubBackend(LLMBackend):
+    """
+    Offline backend for load tests and CI. Answers come from a script of
+    (regex -> response) rules matched against the last message, otherwise
+    from the rule-derived StubLLM. Latency is lognormal around `latency`
+    seconds (jitter = sigma, so tails can be reproduced), and `failure_rate`
+    of the calls raise APITimeoutError like a real timeout would.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        latency: float = LLM_STUB_LATENCY,
+        jitter: float = LLM_STUB_JITTER,
+        failure_rate: float = LLM_STUB_FAILURE_RATE,
+        script: Optional[list[dict[str, str]]] = None,
+        seed: Optional[int] = None,
+    ):
+        super().__init__()
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.script = [
+            (re.compile(rule["match"], re.IGNORECASE | re.S), rule["response"])
+            for rule in script or []
+        ]
+        self.failures = 0
+        self.rules = StubLLM()
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_env(cls) -> "StubBackend":
+        script = None
+        if LLM_STUB_SCRIPT:
+            with open(LLM_STUB_SCRIPT, encoding="utf-8") as f:
+                script = json.load(f)
+        seed = int(LLM_STUB_SEED) if LLM_STUB_SEED is not None else None
+        return cls(script=script, seed=seed)
+
+    def answer(self, messages: list[dict[str, str]], **kwargs) -> str:
+        for pattern, response in self.script:
+            if pattern.search(messages[-1]["content"]):
+                return response
+        return self.rules.answer(messages, **kwargs)
+
+    def _delay(self) -> float:
+        if self.latency <= 0:
+            return 0.0
+        if self.jitter <= 0:
+            return self.latency
+        # Median = latency, sigma = jitter
+        return self.latency * self._random.lognormvariate(0.0, self.jitter)
+
+    async def create(self, model: str, messages: list[dict[str, str]], **kwargs):
+        self.calls += 1
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            self.failures += 1
+            raise APITimeoutError(
+                request=httpx.Request("POST", "http://llm-stub/chat/completions")
+            )
+        content = self.answer(messages, **kwargs)
+        # Grobe Token-Schätzung: ~4 Zeichen pro Token
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        return _response(content, prompt_tokens, len(content) // 4 + 1)
+
+
+class RecordingBackend(LLMBackend):
+    """
+    Forwards every call to the pooled OpenAI client and appends request,
+    answer, token usage and latency as one JSON line to `path` (written in a
+    worker thread).
+    """
+
+    name = "record"
+
+    def __init__(self, path: str = LLM_RECORDING_PATH, inner=None):
+        super().__init__()
+        self.path = path
+        self.inner = inner
+        self._lock = threading.Lock()
+
+    async def create(self, model: str, messages: list[dict[str, str]], **kwargs):
+        self.calls += 1
+        inner = self.inner or client_pool.pooled
+        start = time.perf_counter()
+        resp = await inner.chat.completions.create(model=model, messages=messages, **kwargs)
+        latency = time.perf_counter() - start
+        usage = getattr(resp, "usage", None)
+        entry = {
+            "key": LLMResponseCache.make_key(model, messages, kwargs)[0],
+            "model": model,
+            "messages": messages,
+            "params": kwargs,
+            "content": resp.choices[0].message.content,
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "latency": round(latency, 4),
+        }
+        line = json.dumps(entry, ensure_ascii=False, sort_keys=True)
+        # Datei-I/O im Worker-Thread, nicht auf dem Event-Loop
+        await asyncio.to_thread(self._append, line)
+        return resp
+
+    def _append(self, line: str) -> None:
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class ReplayBackend(LLMBackend):
+    """
+    Answers from a recording made by RecordingBackend, matched on the same
+    key as the response cache (model, prompts, parameters). Unknown requests
+    raise KeyError or, with a fallback backend, are passed on to it.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        path: str = LLM_RECORDING_PATH,
+        replay_latency: bool = LLM_REPLAY_LATENCY,
+        fallback: Optional[LLMBackend] = None,
+    ):
+        super().__init__()
+        self.replay_latency = replay_latency
+        self.fallback = fallback
+        self.misses = 0
+        self.entries: dict[str, dict[str, object]] = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry
+
+    async def create(self, model: str, messages: list[dict[str, str]], **kwargs):
+        self.calls += 1
+        entry = self.entries.get(LLMResponseCache.make_key(model, messages, kwargs)[0])
+        if entry is None:
+            self.misses += 1
+            if self.fallback is None:
+                raise KeyError("No recorded response for this request.")
+            return await self.fallback.create(model, messages, **kwargs)
+        if self.replay_latency:
+            await asyncio.sleep(entry["latency"])
+        return _response(
+            entry["content"], entry["prompt_tokens"], entry["completion_tokens"]
+        )
+
+
+def configured_backend(name: str = LLM_BACKEND) -> Optional[LLMBackend]:
+    """The backend selected by LLM_BACKEND; None means the pooled OpenAI client."""
+    if name not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {name}")
+    if name == "stub":
+        return StubBackend.from_env()
+    if name == "record":
+        return RecordingBackend()
+    if name == "replay":
+        fallback = StubBackend.from_env() if LLM_REPLAY_MISSING == "stub" else None
+        return ReplayBackend(fallback=fallback)
+    return None
@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Antwort-Cache für deterministische LLM-Aufrufe (temperature=0)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")  # z.B. "../data/llm_cache.sqlite"
+
+logger = logging.getLogger(__name__)
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LRU cache for LLM responses keyed by (model, system prompt hash, user prompt)
+    plus the request parameters. Optionally spills to a SQLite file so entries
+    survive restarts; entries older than `ttl` seconds are treated as missing.
+    SQLite is never touched on the event loop: aget() reads in a worker thread
+    and put() hands the row to a single background writer.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = LLM_CACHE_SIZE,
+        ttl: Optional[float] = LLM_CACHE_TTL,
+        path: Optional[str] = LLM_CACHE_PATH,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes: "queue.Queue[tuple]" = queue.Queue()
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, system_hash TEXT, "
+                "user_prompt TEXT, response TEXT, created REAL)"
+            )
+            self._db.commit()
+            threading.Thread(target=self._write_loop, name="llm-cache-writer", daemon=True).start()
+
+    @staticmethod
+    def make_key(
+        model: str, messages: list[dict[str, str]], params: dict[str, object]
+    ) -> tuple[str, str, str]:
+        """Returns (key, system prompt hash, user prompt)."""
+        system_prompt = "\n".join(
+            m["content"] for m in messages if m["role"] == "system"
+        )
+        user_prompt = "\n".join(m["content"] for m in messages if m["role"] != "system")
+        system_hash = _sha256(system_prompt)
+        key = _sha256(
+            json.dumps(
+                [model, system_hash, user_prompt, params],
+                sort_keys=True,
+                ensure_ascii=False,
+            )
+        )
+        return key, system_hash, user_prompt
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[1]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            if self._db is None:
+                self.misses += 1
+            return None
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._expired(row[1]):
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self._remember(key, row[0], row[1])
+            self.hits += 1
+            self.disk_hits += 1
+            return row[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """Blocking lookup; use aget() on the event loop."""
+        response = self._memory_get(key)
+        if response is None and self._db is not None:
+            response = self._disk_get(key)
+        return response
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Like get(), but the SQLite lookup runs in a worker thread."""
+        response = self._memory_get(key)
+        if response is None and self._db is not None:
+            response = await asyncio.to_thread(self._disk_get, key)
+        return response
+
+    def put(
+        self,
+        key: str,
+        response: str,
+        model: str = "",
+        system_hash: str = "",
+        user_prompt: str = "",
+    ) -> None:
+        """Stores in memory right away; the SQLite write happens in the background."""
+        created = time.time()
+        with self._lock:
+            self._remember(key, response, created)
+        if self._db is not None:
+            self._writes.put((key, model, system_hash, user_prompt, response, created))
+
+    def _write_loop(self) -> None:
+        while True:
+            rows = [self._writes.get()]
+            # Alles, was inzwischen ansteht, in einer Transaktion schreiben
+            while True:
+                try:
+                    rows.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self._db_lock:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)", rows
+                    )
+                    self._db.commit()
+            except sqlite3.Error:
+                logger.exception("LLM cache write of %d rows failed", len(rows))
+            finally:
+                for _ in rows:
+                    self._writes.task_done()
+
+    def flush(self) -> None:
+        """Blocks until all pending SQLite writes are done."""
+        self._writes.join()
+
+    def _remember(self, key: str, response: str, created: float) -> None:
+        self._entries[key] = (response, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            self.flush()
+            with self._db_lock:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def get_stats(self) -> dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "persistent": self._db is not None,
+            "pending_writes": self._writes.unfinished_tasks,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+response_cache = LLMResponseCache() if LLM_CACHE_ENABLED else None
@@ -0,0 +1,226 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from models import InvalidRequestError
+
+# Verbindungs-Pool für alle LLM-Aufrufe
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+
+
+class PoolStats:
+    """Counters collected by the instrumented transport."""
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.new_connections = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def record(self, new_connection: bool, wait_seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight -= 1
+            self.new_connections += new_connection
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    @property
+    def reused_connections(self) -> int:
+        return self.requests - self.new_connections
+
+
+class _InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """
+    Keep-alive transport that records, per request, whether a new connection
+    had to be opened and how long the request waited for a connection.
+    Uses httpcore's `trace` extension, so nothing in the OpenAI client changes.
+    """
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        state = {"connected_at": None, "new_connection": False}
+        outer_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict) -> None:
+            if event_name == "connection.connect_tcp.started":
+                state["new_connection"] = True
+            if state["connected_at"] is None and (
+                event_name == "connection.connect_tcp.started"
+                or event_name.endswith("send_request_headers.started")
+            ):
+                # Bis hierhin hat die Anfrage auf eine Verbindung gewartet
+                state["connected_at"] = time.perf_counter()
+            if outer_trace is not None:
+                await outer_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        self.stats.started()
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            connected_at = state["connected_at"] or time.perf_counter()
+            self.stats.record(state["new_connection"], connected_at - started)
+
+    def connection_counts(self) -> Optional[tuple[int, int]]:
+        """
+        Returns (open, idle) connections of the underlying httpcore pool, None
+        if its (private) attributes are not available in this httpx version.
+        Keep-alive expiry closes connections without a request, so the trace
+        events alone cannot tell how many are open.
+        """
+        try:
+            connections = [c for c in self._pool.connections if not c.is_closed()]
+            idle = sum(1 for c in connections if c.is_idle())
+        except AttributeError:
+            return None
+        return len(connections), idle
+
+
+class LLMClientPool:
+    """
+    Owns the process-wide AsyncOpenAI client and its keep-alive connection pool.
+    FastAPI starts and closes it in the app lifespan; outside the app it is
+    started lazily. HTTP connections are bound to an event loop, so the client
+    is rebuilt if it is used from a different loop (e.g. repeated asyncio.run());
+    the replaced client is closed in the background and at the latest in aclose().
+    """
+
+    def __init__(
+        self,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_keepalive_connections: int = LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.stats = PoolStats()
+        self._client: Optional[AsyncOpenAI] = None
+        self._transport: Optional[_InstrumentedTransport] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._override = None
+        # Ersetzte Clients (anderer Event-Loop), die noch geschlossen werden müssen
+        self._retired: list[tuple[AsyncOpenAI, Optional[asyncio.AbstractEventLoop]]] = []
+        self._closing: set[asyncio.Task] = set()
+
+    def _create(self, loop: Optional[asyncio.AbstractEventLoop]) -> AsyncOpenAI:
+        if self._client is not None:
+            self._retired.append((self._client, self._loop))
+        self._transport = _InstrumentedTransport(self.stats, limits=self.limits)
+        try:
+            self._client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=0,  # Wiederholungen macht llm_utils._complete selbst
+                http_client=httpx.AsyncClient(transport=self._transport),
+            )
+        except Exception as e:
+            raise InvalidRequestError(f"Failed to initialize OpenAI client: {str(e)}")
+        self._loop = loop
+        return self._client
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """The active client: an installed backend (see use()) or the pooled one."""
+        if self._override is not None:
+            return self._override
+        return self.pooled
+
+    @property
+    def pooled(self) -> AsyncOpenAI:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if self._client is None or (loop is not None and loop is not self._loop):
+            client = self._create(loop)
+            if self._retired and loop is not None:
+                task = loop.create_task(self._close_retired())
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+            return client
+        return self._client
+
+    @staticmethod
+    async def _close(client: AsyncOpenAI, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Closes a client, on its own loop if that still runs in another thread."""
+        try:
+            if loop is not None and loop.is_running() and loop is not asyncio.get_running_loop():
+                future = asyncio.run_coroutine_threadsafe(client.close(), loop)
+                await asyncio.wrap_future(future)
+            else:
+                # Loop beendet (oder der aktuelle): die Sockets lassen sich hier schließen
+                await client.close()
+        except Exception:
+            pass
+
+    async def _close_retired(self) -> None:
+        while self._retired:
+            await self._close(*self._retired.pop())
+
+    @contextmanager
+    def use(self, client):
+        """
+        Hands out `client` instead of the pooled one while the block runs,
+        e.g. a stub or replay backend from llm_backends. None keeps the pool.
+        """
+        previous, self._override = self._override, client
+        try:
+            yield client
+        finally:
+            self._override = previous
+
+    async def start(self) -> None:
+        self._create(asyncio.get_running_loop())
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        closing = [task for task in self._closing if task.get_loop() is loop]
+        await asyncio.gather(*closing, return_exceptions=True)
+        await self._close_retired()
+        if self._client is not None:
+            await self._close(self._client, self._loop)
+        self._client = self._transport = self._loop = None
+
+    def get_stats(self) -> dict[str, object]:
+        counts = self._transport.connection_counts() if self._transport else (0, 0)
+        open_connections, idle_connections = counts or (None, None)
+        stats = self.stats
+        return {
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "open_connections": open_connections,
+            "idle_connections": idle_connections,
+            "in_flight": stats.in_flight,
+            "requests": stats.requests,
+            "new_connections": stats.new_connections,
+            "reused_connections": stats.reused_connections,
+            "wait_seconds_total": round(stats.wait_seconds_total, 6),
+            "wait_seconds_avg": round(
+                stats.wait_seconds_total / stats.requests if stats.requests else 0.0, 6
+            ),
+            "wait_seconds_max": round(stats.wait_seconds_max, 6),
+        }
+
+
+client_pool = LLMClientPool()
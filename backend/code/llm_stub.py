@@ -0,0 +1,158 @@
+import json
+import re
+from typing import Optional
+
+from column_matcher import column_matcher
+from numeric_parser import parse_numeric_constraints
+
+# Wörter, an denen der Stub eine Hotelsuche erkennt (zusätzlich zu Spalten/Zahlen)
+HOTEL_WORDS = re.compile(
+    r"\b(?:hotels?|stay|room|rooms|night|nights|accommodation|resort|hostel|"
+    r"unterkunft|zimmer|übernachtung)\b",
+    re.IGNORECASE,
+)
+# Schwellen für vage Angaben ("near the beach") wie sie das LLM schätzen würde
+VAGUE_THRESHOLDS = {
+    "distancetobeach": "<=,1",
+    "distancetocity": "<=,2",
+    "distancetounderground": "<=,0.5",
+    "distancetotrainstation": "<=,1",
+    "distancetoairport": "<=,10",
+    "distancetobathing": "<=,1",
+    "rating": ">=,8",
+    "starcategory": ">=,4",
+    "pricepernight": "<=,100",
+}
+_VAGUE_WORDS = {
+    "distancetobeach": r"beach|strand|sea",
+    "distancetocity": r"cent(?:er|re)|downtown|city|zentrum",
+    "distancetounderground": r"metro|subway|underground|u-bahn",
+    "distancetotrainstation": r"station|bahnhof",
+    "distancetoairport": r"airport|flughafen",
+    "distancetobathing": r"lake|bathing|badesee",
+    "rating": r"rating|rated|reviews?|bewertung",
+    "starcategory": r"stars?|luxur\w*|sterne",
+    "pricepernight": r"cheap|budget|affordable|günstig|billig",
+}
+
+
+def _between(text: str, start: str, end: str = "\n") -> str:
+    match = re.search(re.escape(start) + r"(.*?)(?:" + re.escape(end) + r"|$)", text, re.S)
+    return match.group(1).strip() if match else ""
+
+
+def _query(text: str) -> str:
+    quoted = re.search(r'"""(.*?)"""', text, re.S)
+    if quoted:
+        return quoted.group(1).strip()
+    return _between(text, "User query:") or _between(text, "User prompt:")
+
+
+def _comparison(column: str, query: str) -> Optional[str]:
+    parsed = parse_numeric_constraints(query).get(column)
+    if parsed is not None:
+        return f"{parsed.comparison},{parsed.value:g}"
+    words = _VAGUE_WORDS.get(column)
+    if words and re.search(rf"\b(?:{words})\b", query, re.IGNORECASE):
+        return VAGUE_THRESHOLDS[column]
+    return None
+
+
+def _values(possible: list[str], query: str) -> list[str]:
+    text = query.lower()
+    return [
+        value
+        for value in possible
+        if value and value.lower().replace("_", " ") in text
+    ]
+
+
+def _is_hotel_query(query: str) -> bool:
+    return bool(
+        HOTEL_WORDS.search(query)
+        or column_matcher.match(query).columns
+        or parse_numeric_constraints(query)
+    )
+
+
+def _is_restricted(query: str) -> bool:
+    return bool(column_matcher.match(query).columns or parse_numeric_constraints(query))
+
+
+def _columns(query: str) -> list[str]:
+    columns = list(column_matcher.match(query).columns)
+    columns += [c for c in parse_numeric_constraints(query) if c not in columns]
+    return columns
+
+
+class StubLLM:
+    """
+    Rule-derived answers for the prompts of llm_utils. It recognizes each
+    prompt by its system message and answers it with the local components
+    (column_matcher, numeric_parser), so the whole pipeline runs offline and
+    gives the same result every time. Served by llm_backends.StubBackend.
+    """
+
+    def answer(self, messages: list[dict[str, str]], **kwargs) -> str:
+        system = messages[0]["content"]
+        user = messages[-1]["content"]
+
+        if "request validator" in system:
+            return "valid" if _is_hotel_query(_query(user)) else "invalid"
+
+        if "hotel-query classifier" in system:
+            return "RESTRICTED" if _is_restricted(_query(user)) else "UNRESTRICTED"
+
+        if "improves hotel search queries" in system:
+            return _query(user)
+
+        if "strict extraction assistant" in system:
+            return ",".join(_columns(_query(user)))
+
+        if "query understanding assistant" in system:
+            query = _query(user)
+            return json.dumps(
+                {
+                    "valid": bool(_is_hotel_query(query)),
+                    "restricted": bool(_is_restricted(query)),
+                    "columns": _columns(query),
+                    "improved_query": query,
+                }
+            )
+
+        if kwargs.get("response_format", {}).get("type") == "json_object":
+            return json.dumps({"constraints": self._batched(user)})
+
+        column, query = _between(user, "Column:"), _query(user)
+        if "<operator>" in system:
+            return _comparison(column, query) or "REMOVE_CONSTRAINT"
+        if "Possible values:" in user:
+            possible = [v.strip() for v in _between(user, "Possible values:").split(",")]
+            return ",".join(_values(possible, query)) or "REMOVE_CONSTRAINT"
+        if "REMOVE_CONSTRAINT" in system:
+            return "1"
+        return ""
+
+    def _batched(self, user: str) -> list[dict[str, object]]:
+        query = _query(user)
+        constraints = []
+        for line in _between(user, "Columns:", "User query:").splitlines():
+            match = re.match(r"- (.+?) \((\w+)(?:; (.*))?\)$", line.strip())
+            if not match:
+                continue
+            column, kind, detail = match.groups()
+            if kind == "boolean":
+                constraints.append({"column": column, "value": 1})
+            elif kind == "numeric":
+                comparison = _comparison(column, query)
+                if comparison:
+                    op, value = comparison.split(",")
+                    constraints.append(
+                        {"column": column, "comparison": op, "value": float(value)}
+                    )
+            elif kind == "categorical" and detail:
+                possible = detail.removeprefix("allowed values:").split(",")
+                values = _values([v.strip() for v in possible], query)
+                if values:
+                    constraints.append({"column": column, "values": values})
+        return constraints
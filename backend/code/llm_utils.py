@@ -1,38 +1,192 @@
+import asyncio
+import json
 import os
+import random
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Optional
-from openai import OpenAI
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
 from dotenv import load_dotenv
-from models import Constraint
-from constants import CATEGORY_STRING, load_grouped_columns_from_json_string
+from models import Constraint, InvalidRequestError
+from llm_pool import client_pool
+from llm_cache import response_cache
+from column_schema import ColumnInfo
+from tracing import tracer
+from query_classifier import query_decider
+from hotel_store import HotelTable, as_table
+from prompt_vocabulary import FULL_VOCABULARY, estimate_tokens, prompt_vocabulary
 
 # Load .env file
 load_dotenv()
 
 MODEL = "gpt-4"  # or "gpt-3.5-turbo" depending on your needs
 
-def get_openai_client() -> OpenAI:
+# Zeitlimit pro Versuch, danach Wiederholung mit exponentiellem Backoff
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.25"))
+# Längste Dauer eines _complete-Aufrufs: alle Versuche laufen in den Timeout,
+# dazu der größtmögliche Backoff (Faktor 1 + random() < 2)
+LLM_CALL_BUDGET = (LLM_MAX_RETRIES + 1) * LLM_TIMEOUT + sum(
+    LLM_BACKOFF_BASE * 2**attempt * 2 for attempt in range(LLM_MAX_RETRIES)
+)
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    APITimeoutError,
+    APIConnectionError,
+    RateLimitError,
+    InternalServerError,
+)
+
+# "multi_call": improve/validate/classify/columns als getrennte Aufrufe,
+# "merged": ein strukturierter Aufruf (understand_query)
+QUERY_UNDERSTANDING_MODES = ("multi_call", "merged")
+QUERY_UNDERSTANDING_MODE = os.getenv("QUERY_UNDERSTANDING_MODE", "multi_call")
+
+def get_openai_client() -> AsyncOpenAI:
+    """Returns the pooled, process-wide AsyncOpenAI client (see llm_pool)."""
+    return client_pool.client
+
+class TokenUsage:
+    """Token counters for all LLM calls made inside a track_usage() block."""
+
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.prompt_tokens_saved = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, usage) -> None:
+        with self._lock:
+            self.calls += 1
+            if usage is not None:
+                self.prompt_tokens += usage.prompt_tokens or 0
+                self.completion_tokens += usage.completion_tokens or 0
+
+    def add_cache_hit(self) -> None:
+        with self._lock:
+            self.cache_hits += 1
+
+    def add_prompt_saving(self, tokens: int) -> None:
+        with self._lock:
+            self.prompt_tokens_saved += tokens
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "prompt_tokens_saved": self.prompt_tokens_saved,
+        }
+
+_usage: ContextVar[Optional[TokenUsage]] = ContextVar("llm_usage", default=None)
+
+@contextmanager
+def track_usage():
+    usage = TokenUsage()
+    token = _usage.set(usage)
     try:
-        client = OpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"),
-        )
-        return client
-    except Exception as e:
-        raise InvalidRequestError(f"Failed to initialize OpenAI client: {str(e)}")
+        yield usage
+    finally:
+        _usage.reset(token)
 
-def _ask_llm(system_prompt: str, user_prompt: str, client):
-    resp = client.chat.completions.create(
-        temperature=0,
-        model=MODEL,
-        messages=[
+def _record_usage(resp) -> None:
+    usage = _usage.get()
+    if usage is not None:
+        usage.add(getattr(resp, "usage", None))
+
+def _record_cache_hit() -> None:
+    usage = _usage.get()
+    if usage is not None:
+        usage.add_cache_hit()
+
+async def _complete(messages: list[dict[str, str]], client=None, **kwargs) -> str:
+    """
+    Sends one chat completion without blocking the event loop. Each attempt is
+    limited to LLM_TIMEOUT seconds; timeouts, connection errors, rate limits and
+    server errors are retried up to LLM_MAX_RETRIES times with backoff.
+    Calls with temperature=0 to an OpenAI client are answered from the
+    response cache when possible.
+    Every call is recorded as an "llm" span (model, cache hit, retries, tokens,
+    cancelled).
+    """
+    with tracer.span("llm", model=MODEL) as span:
+        client = client or get_openai_client()
+        cache_key = None
+        # Nur echte OpenAI-Antworten cachen, keine Stub-/Replay-Backends (llm_backends)
+        if (
+            response_cache is not None
+            and kwargs.get("temperature") == 0
+            and isinstance(client, AsyncOpenAI)
+        ):
+            cache_key, system_hash, user_prompt = response_cache.make_key(
+                MODEL, messages, kwargs
+            )
+            cached = await response_cache.aget(cache_key)
+            if cached is not None:
+                _record_cache_hit()
+                span.set(cache_hit=True)
+                return cached
+
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                resp = await asyncio.wait_for(
+                    client.chat.completions.create(model=MODEL, messages=messages, **kwargs),
+                    LLM_TIMEOUT,
+                )
+                break
+            except asyncio.CancelledError:
+                # Ergebnis wird nicht mehr gebraucht (z.B. Anfrage schon als ungültig erkannt)
+                span.set(cancelled=True)
+                raise
+            except RETRYABLE_ERRORS:
+                if attempt == LLM_MAX_RETRIES:
+                    span.set(cache_hit=False, retries=attempt, failed=True)
+                    raise
+                await asyncio.sleep(LLM_BACKOFF_BASE * 2**attempt * (1 + random.random()))
+        _record_usage(resp)
+        usage = getattr(resp, "usage", None)
+        span.set(
+            cache_hit=False,
+            retries=attempt,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        )
+        content = resp.choices[0].message.content.strip()
+        if cache_key is not None:
+            response_cache.put(cache_key, content, MODEL, system_hash, user_prompt)
+        return content
+
+async def _ask_llm(system_prompt: str, user_prompt: str, client, **kwargs):
+    return await _complete(
+        [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ],
+        client,
+        temperature=0,
+        **kwargs,
     )
-    return resp.choices[0].message.content.strip()
 
-def get_boolean_constraint(column: str, query: str, client) -> Optional[Constraint]:
+async def get_boolean_constraint(column: str, query: str, client) -> Optional[Constraint]:
     """
-    Returns Constraint(value=0|1) or None (if not relevant).
+    Returns Constraint(value=0|1) or None (if not relevant). Raises if the
+    call fails or the answer is malformed.
     """
     system_prompt = (
         "You are a column filter for hotel data.\n"
@@ -49,18 +203,16 @@ def get_boolean_constraint(column: str, query: str, client) -> Optional[Constrai
         "If the column is relevant return the appropriate boolean value."
     )
 
-    try:
-        content = _ask_llm(system_prompt, user_prompt, client)
-        if content == "REMOVE_CONSTRAINT":
-            return None
-        value = int(content)  # 0 or 1
-        return Constraint(column=column, datatype=int, value=value)
-    except Exception:
+    content = await _ask_llm(system_prompt, user_prompt, client)
+    if content == "REMOVE_CONSTRAINT":
         return None
+    value = int(content)  # 0 or 1
+    return Constraint(column=column, datatype=int, value=value)
 
-def get_comparison_constraint(column: str, query: str, client) -> Optional[Constraint]:
+async def get_comparison_constraint(column: str, query: str, client) -> Optional[Constraint]:
     """
-    Returns Constraint(comparison, value) or None.
+    Returns Constraint(comparison, value) or None (if not relevant). Raises if
+    the call fails or the answer is malformed.
     """
     system_prompt = (
         "You are a column filter for hotel data.\n"
@@ -82,22 +234,20 @@ def get_comparison_constraint(column: str, query: str, client) -> Optional[Const
         f"User query: {query}\n"
         "If relevant, return the appropriate numeric comparison."
     )
-    try:
-        content = _ask_llm(system_prompt, user_prompt, client)
-        if content == "REMOVE_CONSTRAINT":
-            return None
-        op, val = content.split(",", 1)
-        return Constraint(
-            column=column, datatype=float, comparison=op, value=float(val)
-        )
-    except Exception:
+    content = await _ask_llm(system_prompt, user_prompt, client)
+    if content == "REMOVE_CONSTRAINT":
         return None
+    op, val = content.split(",", 1)
+    return Constraint(
+        column=column, datatype=float, comparison=op, value=float(val)
+    )
 
-def get_value_constraint(
+async def get_value_constraint(
     column: str, query: str, client, possible_values: set[str]
 ) -> Optional[Constraint]:
     """
-    Returns Constraint(value=[…]) or None.
+    Returns Constraint(value=[…]) or None (if not relevant). Raises if the
+    call fails.
     """
     choices = ", ".join(sorted(possible_values))
 
@@ -114,69 +264,246 @@ def get_value_constraint(
         f"User query: {query}\n"
         "Select all matching values."
     )
-    try:
-        content = _ask_llm(system_prompt, user_prompt, client)
-        if content == "REMOVE_CONSTRAINT":
+    content = await _ask_llm(system_prompt, user_prompt, client)
+    if content == "REMOVE_CONSTRAINT":
+        return None
+    selected = [v.strip() for v in content.split(",") if v.strip()]
+    return (
+        Constraint(column=column, datatype=list[str], value=selected)
+        if selected
+        else None
+    )
+
+COMPARISON_OPERATORS = ("<", ">", "<=", ">=", "==")
+# Erlaubte Wichtigkeit pro Constraint (für das gewichtete Ranking)
+WEIGHT_RANGE = (0.1, 3.0)
+
+def _describe_column(info: ColumnInfo) -> str:
+    if info.kind == "categorical":
+        choices = ", ".join(sorted(info.possible_values))
+        return f"- {info.name} (categorical; allowed values: {choices})"
+    if info.kind == "numeric":
+        return f"- {info.name} (numeric; range {info.min:g} to {info.max:g})"
+    return f"- {info.name} ({info.kind})"
+
+def _parse_batched_constraint(
+    item: object, columns: dict[str, ColumnInfo]
+) -> Optional[Constraint]:
+    """
+    Validates one entry of the batched response against the column list.
+    Returns None for entries that do not match the schema.
+    """
+    if not isinstance(item, dict) or item.get("column") not in columns:
+        return None
+    column = item["column"]
+    info = columns[column]
+    weight = item.get("weight", 1.0)
+    if not isinstance(weight, (int, float)) or isinstance(weight, bool):
+        weight = 1.0
+    weight = min(max(float(weight), WEIGHT_RANGE[0]), WEIGHT_RANGE[1])
+
+    if info.kind == "boolean":
+        value = item.get("value")
+        if value not in (0, 1):
             return None
-        selected = [v.strip() for v in content.split(",") if v.strip()]
-        return (
-            Constraint(column=column, datatype=list[str], value=selected)
-            if selected
-            else None
+        return Constraint(column=column, datatype=int, value=int(value), weight=weight)
+
+    if info.kind == "numeric":
+        comparison, value = item.get("comparison"), item.get("value")
+        if comparison not in COMPARISON_OPERATORS:
+            return None
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return None
+        return Constraint(
+            column=column,
+            datatype=float,
+            comparison=comparison,
+            value=float(value),
+            weight=weight,
         )
-    except Exception:
+
+    values = item.get("values")
+    if not isinstance(values, list):
+        return None
+    selected = [v for v in values if isinstance(v, str) and v in info.possible_values]
+    if not selected:
         return None
+    return Constraint(column=column, datatype=list[str], value=selected, weight=weight)
 
-async def improve_user_query(query: str, hotels: dict[str, dict[str, object]]) -> str:
-    all_inner_keys = set()
+async def get_batched_constraints(
+    query: str, columns: dict[str, ColumnInfo], client
+) -> list[Constraint]:
+    """
+    Extracts the constraints for all columns with a single structured-output call.
+    `columns` maps column name -> ColumnInfo (see column_schema).
+    Entries that do not match the schema are dropped; raises if the call
+    fails or the response is not a JSON object with a "constraints" list.
+    """
+    system_prompt = (
+        "You are a column filter for hotel data.\n"
+        "For every column in the list decide whether the user query constrains it.\n"
+        "Respond ONLY with a JSON object of the form\n"
+        '  {"constraints": [ ... ]}\n'
+        "containing one entry per constrained column:\n"
+        '  boolean:     {"column": <name>, "value": 0 or 1}\n'
+        '  numeric:     {"column": <name>, "comparison": "<" | ">" | "<=" | ">=" | "==", "value": <number>}\n'
+        '  categorical: {"column": <name>, "values": [<allowed values>]}\n'
+        "Leave out every column that is irrelevant to the query.\n"
+        'Every entry may carry an optional "weight": 2 if the user insists on it\n'
+        "(must, need, only), 0.5 if it is only a nice-to-have, otherwise leave it out.\n\n"
+        "Additional rules:\n"
+        "- Distances are measured in kilometers.\n"
+        "- Star ratings (starcategory) are on a scale of 1 to 5.\n"
+        "- If the user specifies a location preference (e.g., 'near the beach', 'close to city center') but does not give an explicit number, you must reasonably estimate a suitable threshold based on typical expectations.\n"
+        "- Categorical values must be copied exactly from the allowed values.\n"
+    )
 
-    categories = load_grouped_columns_from_json_string(CATEGORY_STRING)
-    for category in categories.values():
-        all_inner_keys.update(category)
-    keys_string = ",".join(all_inner_keys)
+    column_list = "\n".join(_describe_column(info) for info in columns.values())
+    user_prompt = f"Columns:\n{column_list}\nUser query: {query}"
 
-    system_prompt = f"""
-            You are a travel assistant that improves hotel search queries.
+    content = await _ask_llm(
+        system_prompt,
+        user_prompt,
+        client,
+        response_format={"type": "json_object"},
+    )
+    items = json.loads(content).get("constraints", [])
+    if not isinstance(items, list):
+        raise ValueError("Batched response has no constraints list.")
+
+    constraints = []
+    seen = set()
+    for item in items:
+        constraint = _parse_batched_constraint(item, columns)
+        if constraint and constraint.column not in seen:
+            seen.add(constraint.column)
+            constraints.append(constraint)
+    return constraints
+
+def _improve_prompt(keys_string: str) -> str:
+    return (
+        "You are a travel assistant that improves hotel search queries.\n\n"
+        "Your job is to strictly rewrite the user's hotel search prompt to make it:\n"
+        "- More structured and specific\n"
+        "- Explicitly aligned with the hotel database fields listed at the end\n\n"
+        "Important Rules:\n"
+        "- Do NOT add any information that is not clearly stated in the original request.\n"
+        "- Do NOT assume or guess additional needs.\n"
+        "- ONLY rephrase or clarify what the user already asked for.\n"
+        "- Preserve the original intent exactly.\n"
+        "- Keep the language natural and friendly, as if a real user wrote it.\n\n"
+        "Response Format:\n"
+        "- Respond only with the improved query text.\n"
+        "- Do not add any explanations or extra text outside the query.\n\n"
+        "Example:\n"
+        'Original: "Need hotel with pool and breakfast."\n'
+        'Improved: "I\'m looking for a hotel that offers a pool and provides breakfast."\n\n'
+        "Hotel database fields:\n"
+        f"{keys_string}"
+    )
 
-            Your job is to strictly rewrite the user's hotel search prompt to make it:
-            - More structured and specific
-            - Explicitly aligned with the following hotel database fields:
-            {keys_string}
+def _columns_prompt(keys_string: str) -> str:
+    return (
+        "You are a strict extraction assistant for a hotel search system.\n\n"
+        "Given a user prompt, your job is to select exactly the matching column names from the list at the end.\n\n"
+        "Important:\n"
+        "- Information about included meals (e.g., breakfast included, all-inclusive) is found in the column named **mealtype**.\n"
+        "- Information about room types (e.g., Deluxe Double Room, Suite) is found in the column named **roomcategory**.\n\n"
+        "Instructions:\n"
+        "- Only select from the provided column names. Do not invent new ones.\n"
+        "- Only include columns that directly match or are clearly implied by the user prompt.\n"
+        "- Use a **single line**, comma-separated, **no spaces**.\n"
+        "- Do not include any explanations, words, or extra characters.\n"
+        "- If no relevant columns are found, return an **empty string**.\n\n"
+        "Example Output:\n"
+        "distancetotrainstation,Innenpool,rating\n"
+        "or\n"
+        "'' (empty quotes if no match)\n\n"
+        "Column names:\n"
+        f"{keys_string}"
+    )
 
-            Important Rules:
-            - Do NOT add any information that is not clearly stated in the original request.
-            - Do NOT assume or guess additional needs.
-            - ONLY rephrase or clarify what the user already asked for.
-            - Preserve the original intent exactly.
-            - Keep the language natural and friendly, as if a real user wrote it.
+def _understanding_prompt(keys_string: str) -> str:
+    return (
+        "You are a hotel search query understanding assistant.\n"
+        "Analyze the user query and respond ONLY with a JSON object:\n"
+        '  {"valid": true|false, "restricted": true|false,\n'
+        '   "columns": [<column names>], "improved_query": <string>}\n\n'
+        "valid: true if the query expresses needs, wishes or requirements for a hotel "
+        "stay; false for unrelated questions (games, finance, flights, car rentals, "
+        "jokes, ...).\n"
+        "restricted: true if the user mentions ANY concrete preference or constraint "
+        "(price, stars, rating, amenities, distances or location, room type, pets, "
+        "view, ...); false if they only want to see hotels in general. The number "
+        "of guests alone is not a constraint.\n"
+        "columns: exactly the matching column names from the list at the end, nothing else. "
+        "Included meals (breakfast, all-inclusive) are in **mealtype**, room types "
+        "(Deluxe Double Room, Suite) in **roomcategory**.\n"
+        "improved_query: the query rewritten to be structured and specific and aligned "
+        "with the columns, without adding anything the user did not ask for.\n\n"
+        "Column names:\n"
+        f"{keys_string}"
+    )
 
-            Response Format:
-            - Respond only with the improved query text.
-            - Do not add any explanations or extra text outside the query.
+# Prompts mit Spaltenliste: statischer Teil zuerst, Spalten am Ende des
+# System-Prompts, die Anfrage steht nur in der User-Nachricht
+PROMPT_BUILDERS = {
+    "improve": _improve_prompt,
+    "columns": _columns_prompt,
+    "understand": _understanding_prompt,
+}
+_FULL_PROMPTS = {
+    name: build(FULL_VOCABULARY.keys_string) for name, build in PROMPT_BUILDERS.items()
+}
 
-            Example:
-            Original: "Need hotel with pool and breakfast."
-            Improved: "I'm looking for a hotel that offers a pool and provides breakfast."
+def _city_prompt(name: str, table: HotelTable) -> tuple[str, int]:
+    """(prompt, tokens saved against the full vocabulary), built once per table."""
 
-            Now, improve the following hotel search request:
+    def build() -> tuple[str, int]:
+        prompt = PROMPT_BUILDERS[name](prompt_vocabulary(table).keys_string)
+        return prompt, estimate_tokens(_FULL_PROMPTS[name]) - estimate_tokens(prompt)
 
-            \"\"\"{query}\"\"\"
-            """
+    return table.derive(("system_prompt", name), build)
 
-    client = get_openai_client()
-    response = client.chat.completions.create(
-        model=MODEL,
-        temperature=0,
-        messages=[
+def prebuild_prompts(table: HotelTable) -> None:
+    """Builds all vocabulary prompts of a city, e.g. right after loading it."""
+    for name in PROMPT_BUILDERS:
+        _city_prompt(name, table)
+
+def system_prompt_for(name: str, table: Optional[HotelTable] = None) -> str:
+    """
+    The system prompt `name` with the city's vocabulary (all CATEGORY_STRING
+    columns without a table). The saved prompt tokens are counted in the
+    current track_usage() block.
+    """
+    if table is None:
+        return _FULL_PROMPTS[name]
+    prompt, saved = _city_prompt(name, table)
+    usage = _usage.get()
+    if usage is not None:
+        usage.add_prompt_saving(saved)
+    return prompt
+
+async def improve_user_query(query: str, hotels: dict[str, dict[str, object]]) -> str:
+    """Rewrites the query; the field list is the city's prompt vocabulary."""
+    system_prompt = system_prompt_for("improve", as_table(hotels) if hotels else None)
+    improved_query = await _complete(
+        [
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"User query: {query}"},
+            {
+                "role": "user",
+                "content": f'Improve the following hotel search request:\n"""{query}"""',
+            },
         ],
+        temperature=0,
     )
-
-    improved_query = response.choices[0].message.content.strip()
     return improved_query
 
 async def is_valid_request(request: str) -> bool:
+    """Answered by the local classifier when it is confident (see query_classifier)."""
+    return await query_decider.decide("valid", request, lambda: _llm_is_valid(request))
+
+async def _llm_is_valid(request: str) -> bool:
     try:
         return not await check_invalid_request(request)
     except InvalidRequestError as e:
@@ -189,8 +516,6 @@ async def check_invalid_request(request: str) -> bool:
         return True
 
     try:
-        client = get_openai_client()
-
         # Prepare the prompt for validation
         prompt = f"""
         You are an assistant that checks whether a user request is suitable for a hotel search.
@@ -209,20 +534,18 @@ async def check_invalid_request(request: str) -> bool:
         Respond with exactly one word: **'valid'** or **'invalid'**.
         """
 
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
+        content = await _complete(
+            [
                 {
                     "role": "system",
                     "content": "You are a hotel search request validator.",
                 },
                 {"role": "user", "content": prompt},
             ],
+            temperature=0,
         )
 
-        print(response)
-
-        result = response.choices[0].message.content.strip().lower()
+        result = content.lower()
         return result == "invalid"
 
     except Exception as e:
@@ -232,14 +555,18 @@ async def is_unrestricted_request(request: str) -> bool:
     """
     Returns True  → the prompt contains no concrete restrictions / filters.
     Returns False → at least one specific requirement is stated.
+    Answered by the local classifier when it is confident (see query_classifier).
     """
+    return await query_decider.decide(
+        "unrestricted", request, lambda: _llm_is_unrestricted(request)
+    )
+
+async def _llm_is_unrestricted(request: str) -> bool:
 
     if not request or not isinstance(request, str):
         return True  # empty => unrestricted by definition
 
     try:
-        client = get_openai_client()
-
         system_msg = (
             "You are a hotel-query classifier.\n"
             "Respond with ONE word only:\n"
@@ -259,75 +586,107 @@ async def is_unrestricted_request(request: str) -> bool:
 
         user_msg = f'User prompt: """{request}"""'
 
-        resp = client.chat.completions.create(
-            model=MODEL,
-            temperature=0,
-            messages=[
+        content = await _complete(
+            [
                 {"role": "system", "content": system_msg},
                 {"role": "user", "content": user_msg},
             ],
+            temperature=0,
         )
 
-        verdict = resp.choices[0].message.content.strip().upper()
+        verdict = content.upper()
         return verdict == "UNRESTRICTED"
 
     except Exception as e:
         raise InvalidRequestError(f"Error classifying restriction level: {str(e)}")
 
-async def get_relevant_columns(query: str) -> Optional[list[str]]:
-    all_inner_keys = set()
-
-    categories = load_grouped_columns_from_json_string(CATEGORY_STRING)
-    for category in categories.values():
-        all_inner_keys.update(category)
-    keys_string = ",".join(all_inner_keys)
-
+async def get_relevant_columns(
+    query: str, table: Optional[HotelTable] = None
+) -> Optional[list[str]]:
+    """Column names for the query, chosen from the prompt vocabulary of `table`'s city."""
     try:
-        client = get_openai_client()
-        response = client.chat.completions.create(
-            model=MODEL,
-            temperature=0,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a strict extraction assistant for a hotel search system.\n\n"
-                        "Given a user prompt, your job is to select exactly the matching column names from the following list:\n\n"
-                        f"{keys_string}\n\n"
-                        "Important:\n"
-                        "- Information about included meals (e.g., breakfast included, all-inclusive) is found in the column named **mealtype**.\n"
-                        "- Information about room types (e.g., Deluxe Double Room, Suite) is found in the column named **roomcategory**.\n\n"
-                        "Instructions:\n"
-                        "- Only select from the provided column names. Do not invent new ones.\n"
-                        "- Only include columns that directly match or are clearly implied by the user prompt.\n"
-                        "- Use a **single line**, comma-separated, **no spaces**.\n"
-                        "- Do not include any explanations, words, or extra characters.\n"
-                        "- If no relevant columns are found, return an **empty string**.\n\n"
-                        "Example Output:\n"
-                        "distancetotrainstation,Innenpool,rating\n"
-                        "or\n"
-                        "'' (empty quotes if no match)"
-                    ),
-                },
+        content = await _complete(
+            [
+                {"role": "system", "content": system_prompt_for("columns", table)},
                 {
                     "role": "user",
                     "content": f"User prompt: {query}",
                 },
             ],
+            temperature=0,
         )
 
-        if len(response.choices[0].message.content) < 3:
+        if len(content) < 3:
             return []
-        return [
-            part.strip()
-            for part in response.choices[0].message.content.split(",")
-            if part.strip()
-        ]
+        return [part.strip() for part in content.split(",") if part.strip()]
     except Exception as e:
         return None
 
+class QueryUnderstanding:
+    """Result of understand_query: everything the pipeline needs before extraction."""
+
+    def __init__(
+        self,
+        is_valid: bool,
+        is_unrestricted: bool,
+        columns: list[str],
+        improved_query: str,
+    ):
+        self.is_valid = is_valid
+        self.is_unrestricted = is_unrestricted
+        self.columns = columns
+        self.improved_query = improved_query
+
+    def __repr__(self):
+        return (
+            f"QueryUnderstanding(valid={self.is_valid}, unrestricted={self.is_unrestricted}, "
+            f"columns={self.columns}, improved_query={self.improved_query!r})"
+        )
+
+async def understand_query(
+    query: str, table: Optional[HotelTable] = None
+) -> Optional[QueryUnderstanding]:
+    """
+    One structured call instead of improve_user_query, is_valid_request,
+    is_unrestricted_request and get_relevant_columns. Returns None if the
+    call fails or the answer is malformed, so the caller can fall back to
+    the separate calls.
+    """
+    if not query or not isinstance(query, str):
+        return QueryUnderstanding(False, True, [], "")
+
+    system_prompt = system_prompt_for("understand", table)
+    try:
+        content = await _complete(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"User query: {query}"},
+            ],
+            temperature=0,
+            response_format={"type": "json_object"},
+        )
+        data = json.loads(content)
+    except Exception:
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("valid"), bool):
+        return None
+
+    columns = data.get("columns")
+    if not isinstance(columns, list):
+        columns = []
+    # Erfundene Spaltennamen verwerfen
+    vocabulary = prompt_vocabulary(table)
+    columns = [c for c in columns if isinstance(c, str) and c in vocabulary]
+    improved_query = data.get("improved_query")
+    if not isinstance(improved_query, str) or not improved_query.strip():
+        improved_query = query
+    return QueryUnderstanding(
+        is_valid=data["valid"],
+        is_unrestricted=data.get("restricted") is False,
+        columns=columns,
+        improved_query=improved_query.strip(),
+    )
+
 if __name__ == "__main__":
-    import asyncio
-    client = get_openai_client()
     result = asyncio.run(get_relevant_columns("I want a hotel with a pool and a gym"))
     print(result)
\ No newline at end of file
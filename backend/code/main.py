@@ -1,23 +1,57 @@
 import asyncio
-from fastapi import FastAPI, HTTPException
+import time
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional
+from column_matcher import LOCAL_COLUMN_MIN_CONFIDENCE, column_matcher
+from hotel_store import HotelTable, as_table, hotel_store
+from prompt_vocabulary import constant_columns, prompt_vocabulary
+from llm_backends import configured_backend
+from llm_pool import client_pool
+from llm_cache import response_cache
+from models import Constraint
+from semantic_cache import CachedUnderstanding, semantic_cache
+from query_classifier import query_decider
+from speculation import SPECULATIVE_EXTRACTION, speculation_stats
+from tracing import SERVER_TIMING_ENABLED, Trace, tracer
 from hotel_utils import (
-    parse_hotels_from_parquet,
+    CONSTRAINT_EXTRACTION_MODE,
+    EXTRACTION_MODES,
+    RANKING_MODES,
     create_constraints,
-    get_score,
-    sort_hotels_by_score,
-    sort_hotels_by_ltr_score,
+    rank_hotels,
+    score_hotels,
+    top_hotels_by_ltr_score,
 )
 from llm_utils import (
+    QUERY_UNDERSTANDING_MODE,
+    QUERY_UNDERSTANDING_MODES,
+    understand_query,
     improve_user_query,
     is_valid_request,
     is_unrestricted_request,
     get_relevant_columns,
     get_openai_client,
+    prebuild_prompts,
 )
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Alle Städte einmal beim Start laden, danach nur bei geänderter mtime
+    hotel_store.load_all()
+    # Prompts mit der Spaltenliste je Stadt einmal bauen statt pro Anfrage
+    for city in hotel_store.cities():
+        prebuild_prompts(hotel_store.get_table(city))
+    try:
+        await client_pool.start()
+        # LLM_BACKEND=stub/record/replay ersetzt den OpenAI-Client (Lasttests, CI)
+        with client_pool.use(configured_backend()):
+            yield
+    finally:
+        await client_pool.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,70 +59,481 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Column-Path", "Server-Timing"],
 )
 
-async def find_matching_hotels(query: str, hotels: dict[str, dict[str, object]]) -> list[str] | None:
+@contextmanager
+def _stage(report: dict[str, object], stage: str):
+    """Traces a pipeline stage and records its duration under report["timings"][stage]."""
+    with tracer.span(stage) as span:
+        try:
+            yield span
+        finally:
+            report.setdefault("timings", {})[stage] = time.perf_counter() - span.start
+
+async def _timed(report: dict[str, object], stage: str, awaitable):
+    with _stage(report, stage):
+        return await awaitable
+
+def _discard(task: asyncio.Task) -> None:
+    """Cancels a task whose result is no longer needed, without leaving an unretrieved error."""
+    if task.done():
+        if not task.cancelled():
+            task.exception()
+    else:
+        task.cancel()
+
+def _add_constant_columns(
+    columns: Optional[list[str]],
+    matched: list[str],
+    table: HotelTable,
+    report: dict[str, object],
+) -> Optional[list[str]]:
+    """
+    Constant columns are left out of the LLM prompts (see prompt_vocabulary),
+    so the LLM path never selects them. Adds the ones the local matcher found
+    in the query and lists them in report["constant_columns"]; a failed LLM
+    call (None) stays a failure.
+    """
+    if columns is None:
+        return None
+    added = [c for c in constant_columns(matched, table) if c not in columns]
+    if not added:
+        return columns
+    report["constant_columns"] = added
+    return columns + added
+
+async def _extract(
+    query: str,
+    extraction_query: str,
+    hotels: dict[str, dict[str, object]],
+    table: HotelTable,
+    report: dict[str, object],
+    extraction: Optional[str],
+) -> tuple[Optional[list[str]], list[Constraint]]:
+    """
+    Column selection and constraint extraction. The local column matcher
+    sees the raw query, the LLM calls get `extraction_query` (the improved
+    query, or the raw one when speculating).
+    """
+    # Eindeutige Anfragen löst der lokale Index ohne LLM-Aufruf auf
+    with _stage(report, "columns") as span:
+        match = column_matcher.match(query, table.columns)
+        if match.confidence >= LOCAL_COLUMN_MIN_CONFIDENCE:
+            report["column_path"] = "local"
+            relevant_columns = match.columns
+        else:
+            report["column_path"] = "llm"
+            relevant_columns = _add_constant_columns(
+                await get_relevant_columns(extraction_query, table),
+                match.columns,
+                table,
+                report,
+            )
+        span.set(path=report["column_path"])
+
+    constraints = []
+    if relevant_columns:
+        constraints = await _timed(
+            report,
+            "constraints",
+            create_constraints(
+                hotels,
+                extraction_query,
+                relevant_columns,
+                get_openai_client(),
+                mode=extraction,
+                report=report,
+            ),
+        )
+    report["finished_at"] = time.perf_counter()
+    return relevant_columns, constraints
+
+async def _finish_speculation(
+    speculation: asyncio.Task,
+    spec_report: dict[str, object],
+    query: str,
+    improved_query: str,
+    hotels: dict[str, dict[str, object]],
+    report: dict[str, object],
+    extraction: Optional[str],
+) -> tuple[Optional[list[str]], list[Constraint]]:
+    """
+    Called once the pre-checks passed. A finished speculation is used
+    directly; otherwise the regular extraction on the improved query races
+    it, the first to finish wins and the other one is cancelled. A failed
+    speculation or one without columns is discarded for the regular result.
+    """
+    checks_done = time.perf_counter()
+    started = spec_report["started_at"]
+    table = as_table(hotels)
+    regular_report: dict[str, object] = {}
+    regular = None
+    if not speculation.done():
+        regular = asyncio.create_task(
+            _extract(query, improved_query, hotels, table, regular_report, extraction)
+        )
+        try:
+            await asyncio.wait({speculation, regular}, return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            _discard(speculation)
+            _discard(regular)
+            raise
+
+    usable = (
+        speculation.done()
+        and not speculation.cancelled()
+        and speculation.exception() is None
+        and speculation.result()[0]
+    )
+    if usable:
+        if regular is not None:
+            _discard(regular)
+        # Eingespart: der Teil der Extraktion, der parallel zu den Vorprüfungen lief
+        saved = min(checks_done, spec_report["finished_at"]) - started
+        speculation_stats.record("used", saved=saved)
+        winner = spec_report
+        report["speculation"] = "used"
+        result = speculation.result()
+    else:
+        outcome = "discarded" if speculation.done() else "lost_race"
+        _discard(speculation)
+        speculation_stats.record(
+            outcome, wasted=spec_report.get("finished_at", time.perf_counter()) - started
+        )
+        report["speculation"] = outcome
+        if regular is None:
+            regular = asyncio.create_task(
+                _extract(query, improved_query, hotels, table, regular_report, extraction)
+            )
+        result = await regular
+        winner = regular_report
+
+    report["column_path"] = winner["column_path"]
+    for key in ("constant_columns", "constraints_complete"):
+        if key in winner:
+            report[key] = winner[key]
+    report.setdefault("timings", {}).update(winner.get("timings", {}))
+    return result
+
+async def _pre_checks(
+    report: dict[str, object],
+    query: str,
+    hotels: Optional[dict[str, dict[str, object]]] = None,
+) -> tuple[Optional[str], bool, bool]:
+    """
+    Runs validate, unrestricted and (if `hotels` is given) improve as one
+    group of tasks and returns (improved_query, is_valid, is_unrestricted) as
+    soon as the outcome is decided: an invalid query returns right after the
+    validator, a valid unrestricted one without waiting for the rewrite. The
+    sibling calls still running are cancelled and listed in report["cancelled"].
+    """
+    tasks = {
+        "validate": asyncio.create_task(_timed(report, "validate", is_valid_request(query))),
+        "unrestricted": asyncio.create_task(
+            _timed(report, "unrestricted", is_unrestricted_request(query))
+        ),
+    }
+    if hotels is not None:
+        tasks["improve"] = asyncio.create_task(
+            _timed(report, "improve", improve_user_query(query, hotels))
+        )
+    validate, unrestricted = tasks["validate"], tasks["unrestricted"]
+    try:
+        pending = set(tasks.values())
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if validate.done() and not validate.result():
+                return None, False, False
+            for task in done:
+                task.result()  # Fehler sofort weitergeben, wie bei gather
+            if validate.done() and unrestricted.done() and unrestricted.result():
+                return None, True, True
+    finally:
+        cancelled = [name for name, task in tasks.items() if not task.done()]
+        for name in cancelled:
+            tasks[name].cancel()
+        if cancelled:
+            report["cancelled"] = report.get("cancelled", []) + cancelled
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+    improved_query = tasks["improve"].result() if hotels is not None else None
+    return improved_query, True, False
+
+async def find_matching_hotels(
+    query: str,
+    hotels: dict[str, dict[str, object]],
+    extraction: Optional[str] = None,
+    report: Optional[dict[str, object]] = None,
+    ranking: Optional[str] = None,
+    understanding: Optional[str] = None,
+    speculative: Optional[bool] = None,
+) -> list[str] | None:
     """
     Main pipeline: improves query, validates, checks restriction, extracts columns,
     builds constraints, scores, and returns top 10 hotel names.
+    extraction: "per_column" or "batched" (see create_constraints), defaults to
+    CONSTRAINT_EXTRACTION_MODE.
+    ranking: "binary" or "graded" (see top_hotels_by_score), defaults to
+    RANKING_MODE.
+    understanding: "multi_call" (separate improve/validate/classify/column
+    calls) or "merged" (one understand_query call, falling back to the
+    separate calls if it fails), defaults to QUERY_UNDERSTANDING_MODE.
+    speculative: start column and constraint extraction on the raw query in
+    parallel with the multi_call pre-checks (see _finish_speculation),
+    defaults to SPECULATIVE_EXTRACTION.
+    report: optional dict that receives details about the run: which path
+    selected the columns ("semantic_cache", "merged", "local" or "llm") and
+    the seconds per stage in report["timings"] (understand, improve, validate,
+    unrestricted, columns, constraints, scoring, ranking); also the selected
+    "columns" and "constraints" once they are known, the "speculation"
+    outcome, the LLM calls "cancelled" once the outcome was decided, the
+    "constant_columns" added for the LLM path (see _add_constant_columns) and
+    whether every extraction call succeeded ("constraints_complete"); only
+    complete results go into the semantic cache.
     """
-    improved_query, is_valid, is_unrestricted = await asyncio.gather(
-        improve_user_query(query, hotels),
-        is_valid_request(query),
-        is_unrestricted_request(query)
-    )
+    if report is None:
+        report = {}
+    table = as_table(hotels)
+    # Fremde dicts einmal umwandeln, danach tragen sie ihre Tabelle mit
+    hotels = table.to_hotels()
+    # Gecachte Constraints gelten nur für den Extraktionsmodus, der sie erzeugt hat
+    extraction = extraction or CONSTRAINT_EXTRACTION_MODE
+    cached = semantic_cache.lookup(query, table, extraction) if semantic_cache else None
+    if cached is not None:
+        report["column_path"] = "semantic_cache"
+        # Ähnliche Anfrage schon verstanden: Query-Verbesserung, Spaltenwahl
+        # und Constraint-Extraktion entfallen
+        _, is_valid, is_unrestricted = await _pre_checks(report, query)
+        if not is_valid:
+            return None
+        if is_unrestricted:
+            return top_hotels_by_ltr_score(hotels)
+        relevant_columns = cached.relevant_columns
+        constraints = cached.constraints
+    else:
+        understood = None
+        if (understanding or QUERY_UNDERSTANDING_MODE) == "merged":
+            understood = await _timed(report, "understand", understand_query(query, table))
+        speculation = None
+        if understood is None and (
+            SPECULATIVE_EXTRACTION if speculative is None else speculative
+        ):
+            # Spalten und Constraints schon auf der Original-Anfrage ermitteln
+            spec_report: dict[str, object] = {"started_at": time.perf_counter()}
+            speculation = asyncio.create_task(
+                _extract(query, query, hotels, table, spec_report, extraction)
+            )
 
-    print(improved_query, is_valid, is_unrestricted)
-    if not is_valid:
-        return None
-    if is_unrestricted:
-        return sort_hotels_by_ltr_score(hotels)[:10]
+        if understood is not None:
+            improved_query = understood.improved_query
+            is_valid = understood.is_valid
+            is_unrestricted = understood.is_unrestricted
+        else:
+            try:
+                improved_query, is_valid, is_unrestricted = await _pre_checks(
+                    report, query, hotels
+                )
+            except BaseException:
+                if speculation is not None:
+                    _discard(speculation)
+                raise
 
-    relevant_columns = await get_relevant_columns(improved_query)
-    print(relevant_columns)
-    if not relevant_columns:
-        return None
+        print(improved_query, is_valid, is_unrestricted)
+        if not is_valid or is_unrestricted:
+            if speculation is not None:
+                _discard(speculation)
+                speculation_stats.record(
+                    "wasted_invalid" if not is_valid else "wasted_unrestricted",
+                    wasted=time.perf_counter() - spec_report["started_at"],
+                )
+                report["speculation"] = "wasted"
+            return None if not is_valid else top_hotels_by_ltr_score(hotels)
+
+        if understood is not None:
+            report["column_path"] = "merged"
+            relevant_columns = understood.columns
+            # Konstante Spalten fehlen im Prompt ("kein Hotel hat X"),
+            # der lokale Index kennt aber alle Spalten der Stadt
+            match = column_matcher.match(query, table.columns)
+            if not relevant_columns and match.confidence >= LOCAL_COLUMN_MIN_CONFIDENCE:
+                report["column_path"] = "local"
+                relevant_columns = match.columns
+            relevant_columns = _add_constant_columns(
+                relevant_columns, match.columns, table, report
+            )
+            constraints = await _timed(
+                report,
+                "constraints",
+                create_constraints(
+                    hotels,
+                    improved_query,
+                    relevant_columns,
+                    get_openai_client(),
+                    mode=extraction,
+                    report=report,
+                ),
+            )
+        elif speculation is not None:
+            relevant_columns, constraints = await _finish_speculation(
+                speculation, spec_report, query, improved_query, hotels, report, extraction
+            )
+        else:
+            relevant_columns, constraints = await _extract(
+                query, improved_query, hotels, table, report, extraction
+            )
+        print(relevant_columns)
+        if not relevant_columns:
+            return None
 
-    client = get_openai_client()
-    constraints = create_constraints(hotels, improved_query, relevant_columns, client)
-    scores = get_score(constraints, hotels)
-    sorted_hotel_names = sort_hotels_by_score(scores, hotels)
-    return sorted_hotel_names[:10]
+        # Nur vollständige Extraktionen cachen: ein Timeout oder Fehler würde
+        # sonst für alle ähnlichen Anfragen wiederholt
+        if (
+            semantic_cache is not None
+            and constraints
+            and report.get("constraints_complete", False)
+        ):
+            semantic_cache.store(
+                query,
+                table,
+                extraction,
+                CachedUnderstanding(improved_query, relevant_columns, constraints),
+            )
+
+    report["columns"] = relevant_columns
+    report["constraints"] = constraints
+    with _stage(report, "scoring"):
+        scores = score_hotels(constraints, hotels, mode=ranking)
+    with _stage(report, "ranking"):
+        top_hotels = rank_hotels(scores, hotels, mode=ranking)
+    return top_hotels
 
 @app.get("/hotels")
-async def get_hotels(city: str = "Mallorca", query: str = "") -> dict[str, object]:
+async def get_hotels(
+    response: Response,
+    city: str = "Mallorca",
+    query: str = "",
+    extraction: Optional[str] = None,
+    ranking: Optional[str] = None,
+    understanding: Optional[str] = None,
+    speculative: Optional[bool] = None,
+) -> dict[str, object]:
     """
     API endpoint: returns top 10 matching hotels for a city and user query.
+    With SERVER_TIMING_ENABLED the response carries a Server-Timing header
+    with the duration of every traced stage.
     """
-    filepaths = {
-        "New York": "../data/hotels/resultlist_New York.parquet",
-        "Mallorca": "../data/hotels/resultlist_Mallorca.parquet",
-        "Kopenhagen": "../data/hotels/resultlist_Kopenhagen.parquet",
-    }
+    with tracer.trace() as trace:
+        with tracer.span("request"):
+            return await _get_hotels(
+                response, city, query, extraction, ranking, understanding, speculative, trace
+            )
 
-    if city not in filepaths:
+async def _get_hotels(
+    response: Response,
+    city: str,
+    query: str,
+    extraction: Optional[str],
+    ranking: Optional[str],
+    understanding: Optional[str],
+    speculative: Optional[bool],
+    trace: Trace,
+) -> dict[str, object]:
+    if extraction is not None and extraction not in EXTRACTION_MODES:
+        raise HTTPException(status_code=400, detail="Unknown extraction mode.")
+    if ranking is not None and ranking not in RANKING_MODES:
+        raise HTTPException(status_code=400, detail="Unknown ranking mode.")
+    if understanding is not None and understanding not in QUERY_UNDERSTANDING_MODES:
+        raise HTTPException(status_code=400, detail="Unknown understanding mode.")
+
+    try:
+        with tracer.span("load_hotels"):
+            all_hotels = hotel_store.get_hotels(city)
+    except KeyError:
         raise HTTPException(
             status_code=404, detail="Could not find hotel file for this city."
         )
-
-    file = filepaths["Mallorca"]
-
-    try:
-        all_hotels = parse_hotels_from_parquet(file)
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error parsing hotel file: {str(e)}"
         )
 
-    print(all_hotels)
-    top_ten_hotels = await find_matching_hotels(query, all_hotels)
+    report = {}
+    top_ten_hotels = await find_matching_hotels(
+        query, all_hotels, extraction, report, ranking, understanding, speculative
+    )
+    headers = {"X-Column-Path": str(report.get("column_path", "none"))}
+    if SERVER_TIMING_ENABLED:
+        headers["Server-Timing"] = trace.server_timing()
 
     if top_ten_hotels is None:
-        raise HTTPException(status_code=400, detail="Invalid request.")
+        raise HTTPException(status_code=400, detail="Invalid request.", headers=headers)
 
     if not top_ten_hotels:  # This will handle both None and empty list cases
-        raise HTTPException(status_code=404, detail="No matching hotels found.")
+        raise HTTPException(
+            status_code=404, detail="No matching hotels found.", headers=headers
+        )
 
+    response.headers.update(headers)
     hotels_with_description = {hotel: all_hotels[hotel] for hotel in top_ten_hotels}
 
-    return hotels_with_description
\ No newline at end of file
+    return hotels_with_description
+
+@app.get("/metrics")
+async def get_metrics() -> dict[str, object]:
+    """
+    API endpoint: latency histograms (p50/p95/p99) per traced stage and
+    counters such as LLM tokens and cache hits.
+    """
+    return tracer.get_stats()
+
+@app.get("/speculation")
+async def get_speculation_stats() -> dict[str, object]:
+    """
+    API endpoint: outcomes of speculative extraction, wasted-speculation rate
+    and latency saved.
+    """
+    return speculation_stats.get_stats()
+
+@app.get("/query-classifier")
+async def get_query_classifier_stats() -> dict[str, object]:
+    """
+    API endpoint: abstain rate (deferred to the LLM) and agreement rate of the
+    local validity/restriction classifier.
+    """
+    return query_decider.get_stats()
+
+@app.get("/prompt-vocabulary")
+async def get_prompt_vocabulary() -> dict[str, object]:
+    """
+    API endpoint: per city, the columns offered to the LLM and the missing or
+    constant ones left out of the prompts.
+    """
+    return {
+        city: prompt_vocabulary(hotel_store.get_table(city)).to_dict()
+        for city in hotel_store.cities()
+    }
+
+@app.get("/llm-pool")
+async def get_llm_pool_stats() -> dict[str, object]:
+    """
+    API endpoint: connection statistics of the shared LLM client.
+    """
+    return client_pool.get_stats()
+
+@app.get("/llm-cache")
+async def get_llm_cache_stats() -> dict[str, object]:
+    """
+    API endpoint: hit/miss counters of the LLM response cache.
+    """
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.get_stats()}
+
+@app.get("/semantic-cache")
+async def get_semantic_cache_stats() -> dict[str, object]:
+    """
+    API endpoint: hit/miss counters of the semantic query cache.
+    """
+    if semantic_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **semantic_cache.get_stats()}
@@ -1,97 +1,168 @@
-from typing import Optional, List, Dict, Any
+import operator
+import os
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+from constants import load_grouped_columns_from_json_string
+
+# Synthetische Spalten ("Massage", "Pool", ...): erfüllt, wenn eine der Amenities zutrifft
+AMENITY_GROUPS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "amenity_groups.json"
+)
+
+COMPARISONS: dict[str, Callable] = {
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "==": operator.eq,
+}
+
+class Constraint(ABC):
+    """
+    A filter on one column. Creating a Constraint compiles it into one of the
+    specialized predicate classes below (group, boolean, range, value list),
+    so `is_satisfied` does no dispatching per hotel. Constraints are
+    immutable and hashable; sets of them can be used as cache keys.
+    """
+
+    __slots__ = ("column", "datatype", "value", "comparison", "weight", "_key")
+
+    def __new__(
+        cls,
+        column: str,
+        datatype: type,
+        value: object,
+        comparison: Optional[str] = None,
+        weight: float = 1.0,
+    ):
+        if cls is Constraint:
+            if column in AMENITY_GROUPS:
+                cls = GroupConstraint
+            elif datatype == int:
+                cls = BooleanConstraint
+            elif datatype == float:
+                cls = RangeConstraint
+            elif datatype == list[str]:
+                cls = ValueConstraint
+            else:
+                raise TypeError(f"Unsupported datatype: {datatype}")
+        return object.__new__(cls)
 
-class Constraint:
     def __init__(
         self,
         column: str,
         datatype: type,
         value: object,
         comparison: Optional[str] = None,
+        weight: float = 1.0,
     ):
         """
         column: Name der Spalte
-        datatype: str, int oder float
-        value: der Wert (z.B. True/False bei int, Vergleichswert bei float, exakter String bei str)
+        datatype: int, float oder list[str]
+        value: der Wert (z.B. True/False bei int, Vergleichswert bei float, erlaubte Strings bei list[str])
         comparison: für float ('<', '>', '<=', '>=', '==') – bei int/str wird es ignoriert
+        weight: Wichtigkeit für das gewichtete Ranking (1.0 = normal)
         """
-        self.column = column
-        self.datatype = datatype
-        self.value = value
-        self.comparison = comparison
+        object.__setattr__(self, "column", column)
+        object.__setattr__(self, "datatype", datatype)
+        object.__setattr__(self, "value", value)
+        object.__setattr__(self, "comparison", comparison)
+        object.__setattr__(self, "weight", float(weight))
+        object.__setattr__(self, "_key", (type(self), column, value, comparison, float(weight)))
 
-    def is_satisfied(self, hotel_data: dict[str, object]) -> bool:
-        if self.column not in hotel_data:
-            return False
-        if self.column == "Massage":
-            score = 0
-            for column in massage:
-                score += hotel_data[column]
-            return score > 0
-        if self.column == "Pool":
-            score = 0
-            for column in pool:
-                score += hotel_data[column]
-            return score > 0
-        hotel_value = hotel_data[self.column]
-        if hotel_value is None:
-            return False
-        if self.datatype == int:
-            # Boolesche Prüfung: int -> 1 = True, 0 = False
-            return bool(hotel_value) == bool(self.value)
-
-        elif self.datatype == float:
-            if not isinstance(hotel_value, (int, float)):
-                return False
-            if self.comparison == ">":
-                return hotel_value > self.value
-            elif self.comparison == "<":
-                return hotel_value < self.value
-            elif self.comparison == ">=":
-                return hotel_value >= self.value
-            elif self.comparison == "<=":
-                return hotel_value <= self.value
-            elif self.comparison == "==":
-                return hotel_value == self.value
-            else:
-                raise ValueError(f"Ungültige Vergleichsoperation: {self.comparison}")
+    def __setattr__(self, name: str, value: object):
+        raise AttributeError("Constraint is immutable")
+
+    def __reduce__(self):
+        return Constraint, (
+            self.column, self.datatype, self.value, self.comparison, self.weight
+        )
 
-        elif self.datatype == list[str]:
-            return hotel_value in self.value
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Constraint) and self._key == other._key
 
-        else:
-            raise TypeError(f"Unsupported datatype: {self.datatype}")
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    @abstractmethod
+    def is_satisfied(self, hotel_data: dict[str, object]) -> bool:
+        """Whether one hotel (dict view) satisfies the constraint."""
 
     def __repr__(self):
-        return f"Constraint(column={self.column}, datatype={self.datatype.__name__}, value={self.value}, comparison={self.comparison})"
+        weight = f", weight={self.weight:g}" if self.weight != 1.0 else ""
+        return f"Constraint(column={self.column}, datatype={self.datatype.__name__}, value={self.value}, comparison={self.comparison}{weight})"
+
+class GroupConstraint(Constraint):
+    """Synthetic column ("Massage", "Pool"): satisfied if any member amenity is 1."""
+
+    __slots__ = ("columns", "expected")
+
+    def __init__(self, column, datatype, value, comparison=None, weight=1.0):
+        super().__init__(column, datatype, value, None, weight)
+        object.__setattr__(self, "columns", tuple(AMENITY_GROUPS[column]))
+        object.__setattr__(self, "expected", bool(value))
+
+    def is_satisfied(self, hotel_data: dict[str, object]) -> bool:
+        # Vorhanden ist eine Amenity nur mit dem Wert 1; fehlende Spalten, NaN
+        # und andere Werte (z.B. 2) zählen als "nicht vorhanden", wie in amenity_bits
+        get = hotel_data.get
+        for column in self.columns:
+            if get(column) == 1:
+                return self.expected
+        return not self.expected
+
+class BooleanConstraint(Constraint):
+    """int column used as flag: 1 = True, 0 = False."""
+
+    __slots__ = ("expected",)
+
+    def __init__(self, column, datatype, value, comparison=None, weight=1.0):
+        super().__init__(column, datatype, value, None, weight)
+        object.__setattr__(self, "expected", bool(value))
+
+    def is_satisfied(self, hotel_data: dict[str, object]) -> bool:
+        hotel_value = hotel_data.get(self.column)
+        return hotel_value is not None and bool(hotel_value) == self.expected
+
+class RangeConstraint(Constraint):
+    """float column compared against a threshold."""
+
+    __slots__ = ("compare",)
+
+    def __init__(self, column, datatype, value, comparison=None, weight=1.0):
+        if comparison not in COMPARISONS:
+            raise ValueError(f"Ungültige Vergleichsoperation: {comparison}")
+        super().__init__(column, datatype, value, comparison, weight)
+        object.__setattr__(self, "compare", COMPARISONS[comparison])
+
+    def is_satisfied(self, hotel_data: dict[str, object]) -> bool:
+        hotel_value = hotel_data.get(self.column)
+        return isinstance(hotel_value, (int, float)) and self.compare(hotel_value, self.value)
+
+class ValueConstraint(Constraint):
+    """Categorical column that has to take one of the given values."""
+
+    __slots__ = ()
+
+    def __init__(self, column, datatype, value, comparison=None, weight=1.0):
+        # Ein einzelner String ist ein Wert, keine Folge von Zeichen
+        values = frozenset({value}) if isinstance(value, str) else frozenset(value)
+        super().__init__(column, datatype, values, None, weight)
+
+    def is_satisfied(self, hotel_data: dict[str, object]) -> bool:
+        hotel_value = hotel_data.get(self.column)
+        return hotel_value is not None and hotel_value in self.value
+
+def load_amenity_groups(path: str = AMENITY_GROUPS_PATH) -> dict[str, list[str]]:
+    with open(path, encoding="utf-8") as f:
+        return load_grouped_columns_from_json_string(f.read())
+
+AMENITY_GROUPS = load_amenity_groups()
 
 # Special amenity lists
-massage = [
-    "Fußmassage",
-    "Ganzkörpermassage",
-    "Handmassage",
-    "Kopfmassage",
-    "Massage",
-    "Massagestuhl",
-    "Nackenmassage",
-    "Paarmassage",
-    "Rückenmassage",
-    "Massage im Zimmer",
-]
-
-pool = [
-    "Infinity-Pool",
-    "Innenpool",
-    "Innenpool (saisonal)",
-    "Pool",
-    "Pool Cabana",
-    "Pool mit Rampe",
-    "Pool-/Strandtücher",
-    "Außenpool",
-    "Außenpool (saisonal)",
-    "Beheizter Pool",
-    "Whirlpool",
-    "Whirlpool/Jacuzzi",
-]
+massage = AMENITY_GROUPS["Massage"]
+pool = AMENITY_GROUPS["Pool"]
 
 class InvalidRequestError(Exception):
     pass 
\ No newline at end of file
@@ -0,0 +1,270 @@
+import os
+import re
+from typing import Optional
+
+from models import Constraint
+
+# Explizite Zahlen ("unter 40 EUR", "rating at least 9.3") ohne LLM auflösen
+LOCAL_NUMERIC_PARSER_ENABLED = os.getenv("LOCAL_NUMERIC_PARSER_ENABLED", "1") == "1"
+
+# "1,000"/"1.000" als Tausendertrennung, sonst "8,5"/"8.5" als Dezimalzahl
+_NUM = r"\d{1,3}(?:[.,]\d{3})+(?![.,]?\d)|\d+(?:[.,]\d+)?"
+_NUMBER = rf"({_NUM})"
+
+# Vergleichswörter vor der Zahl (das letzte im Teilsatz gilt)
+_COMPARATORS_BEFORE = [
+    (r"less than|lower than|cheaper than|under|below|fewer than", "<"),
+    (r"weniger als|günstiger als|billiger als|unter|unterhalb von", "<"),
+    (r"at most|no more than|not more than|up to|max(?:imum)?\.?|within|maximal", "<="),
+    (r"höchstens|bis zu|bis|innerhalb von|nicht mehr als", "<="),
+    (r"more than|higher than|better than|greater than|over|above", ">"),
+    (r"mehr als|besser als|höher als|über|oberhalb von", ">"),
+    (r"at least|min(?:imum)?\.?|from|starting at|mindestens|ab", ">="),
+    (r"exactly|genau", "=="),
+]
+# Vergleichswörter nach der Zahl ("4 stars or more", "40 EUR or less")
+_COMPARATORS_AFTER = [
+    (r"or (?:more|higher|better|above)|and (?:up|above|more)|oder (?:mehr|besser|höher)", ">="),
+    (r"or (?:less|lower|cheaper|below)|oder (?:weniger|günstiger|billiger)", "<="),
+]
+
+_CURRENCY = r"€|eur(?:os?)?|\$|usd|dollars?|bucks"
+_DISTANCE_UNITS = {
+    "km": 1.0,
+    "kilometer": 1.0,
+    "kilometers": 1.0,
+    "kilometre": 1.0,
+    "kilometres": 1.0,
+    "m": 0.001,
+    "meter": 0.001,
+    "meters": 0.001,
+    "metre": 0.001,
+    "metres": 0.001,
+    "mile": 1.609,
+    "miles": 1.609,
+}
+_UNIT_AFTER = re.compile(
+    rf"^\s*(?:(?P<currency>{_CURRENCY})|(?P<star>-?\s?(?:stars?|sterne?n?)\b)"
+    r"|(?P<distance>km|kilometers?|kilometres?|m|meters?|metres?|miles?)\b)",
+    re.IGNORECASE,
+)
+_CURRENCY_BEFORE = re.compile(rf"(?:{_CURRENCY})\s*$", re.IGNORECASE)
+
+_PRICE_WORDS = (
+    r"price|prices|cheap|cheaper|cost|costs|budget|pay|per night|a night|"
+    r"preis|kosten|kostet|günstiger|pro nacht"
+)
+_RATING_WORDS = r"rating|ratings|rated|score|reviews?|bewertung|bewertet"
+_STAR_WORDS = r"stars?|sterne?n?|starcategory"
+_KEYWORDS = [
+    (re.compile(rf"\b(?:{_STAR_WORDS})\b", re.IGNORECASE), "starcategory", ">="),
+    (re.compile(rf"\b(?:{_RATING_WORDS})\b", re.IGNORECASE), "rating", ">="),
+    (re.compile(rf"\b(?:{_PRICE_WORDS})\b", re.IGNORECASE), "pricepernight", "<="),
+]
+
+# Alle Vergleichswörter einer Anfrage; "or above" vor "above", damit nichts doppelt zählt
+_COMPARATOR_WORDS = re.compile(
+    "|".join(
+        rf"(?<!\w)(?:{pattern})(?!\w)"
+        for pattern, _ in _COMPARATORS_AFTER + _COMPARATORS_BEFORE
+    ),
+    re.IGNORECASE,
+)
+
+# Was direkt vor bzw. nach einer Zahl stehen darf, damit Vergleichswort und
+# Schlüsselwort zu ihr gehören ("rating at least 9.3", "300 per night")
+_FILLER = r"of|is|the|a|an|von|ist|eine?"
+_KEYWORD_WORDS = rf"{_STAR_WORDS}|{_RATING_WORDS}|{_PRICE_WORDS}"
+_LEAD = re.compile(
+    r"(?:[\s:=]|(?<!\w)(?:"
+    + "|".join([_FILLER, _KEYWORD_WORDS, _CURRENCY] + [p for p, _ in _COMPARATORS_BEFORE])
+    + r")(?!\w))*$",
+    re.IGNORECASE,
+)
+_TRAIL = re.compile(
+    r"^(?:[\s+]|(?<!\w)(?:"
+    + "|".join([_FILLER, _KEYWORD_WORDS] + [p for p, _ in _COMPARATORS_AFTER])
+    + r")(?!\w))*",
+    re.IGNORECASE,
+)
+
+# Ziel der Entfernungsangabe -> Spalte
+_DISTANCE_TARGETS = [
+    (r"beach|strand|sea|meer", "distancetobeach"),
+    (r"train station|station|bahnhof", "distancetotrainstation"),
+    (r"airport|flughafen", "distancetoairport"),
+    (r"metro|subway|underground|u-bahn|tube", "distancetounderground"),
+    (r"lake|bathing|badesee|badestelle", "distancetobathing"),
+    (r"city cent(?:er|re)|downtown|cent(?:er|re)|zentrum|innenstadt|city|stadt", "distancetocity"),
+]
+
+# Bereiche ("between 50 and 100 EUR", "zwischen 50 und 100 €", "50–100 EUR",
+# "from 3 to 4 stars"): werden vor der Teilsatz-Trennung erkannt, weil "and"/"und"
+# sonst die beiden Grenzen trennt
+_RANGE_UNIT = rf"(?:\s*(?:{_CURRENCY}|km|m|stars?|sterne?n?)\b)?"
+_RANGE_BOUND = rf"(?:(?:{_CURRENCY})\s*)?"
+_RANGE = re.compile(
+    rf"(?:\b(?:between|zwischen)\s+{_RANGE_BOUND}(?P<lo1>{_NUM}){_RANGE_UNIT}\s+(?:and|und)\s+"
+    rf"{_RANGE_BOUND}(?P<hi1>{_NUM})"
+    rf"|\b(?:from|von)\s+{_RANGE_BOUND}(?P<lo2>{_NUM}){_RANGE_UNIT}\s+(?:to|bis)\s+"
+    rf"{_RANGE_BOUND}(?P<hi2>{_NUM})"
+    rf"|(?<![\d.,])(?P<lo3>{_NUM}){_RANGE_UNIT}\s*(?:-|–|—|to|bis)\s*{_RANGE_BOUND}(?P<hi3>{_NUM}))",
+    re.IGNORECASE,
+)
+
+# Teilsätze: jede Zahl gehört zu ihrem eigenen Teilsatz
+_CLAUSE_SPLIT = re.compile(r",(?!\d)|;|\band\b|\bund\b|\bbut\b|\baber\b|\bwhile\b", re.IGNORECASE)
+
+
+def _to_float(number: str) -> float:
+    if re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", number):
+        return float(re.sub(r"[.,]", "", number))
+    return float(number.replace(",", "."))
+
+
+def _last_comparator(text: str) -> Optional[str]:
+    best, best_end = None, -1
+    for pattern, op in _COMPARATORS_BEFORE:
+        for m in re.finditer(rf"(?<!\w)(?:{pattern})(?!\w)", text, re.IGNORECASE):
+            if m.end() > best_end:
+                best, best_end = op, m.end()
+    return best
+
+
+def _comparator_after(text: str) -> Optional[str]:
+    for pattern, op in _COMPARATORS_AFTER:
+        if re.match(rf"\s*(?:{pattern})\b", text, re.IGNORECASE):
+            return op
+    return None
+
+
+def _distance_column(clause: str) -> Optional[str]:
+    for pattern, column in _DISTANCE_TARGETS:
+        if re.search(rf"\b(?:{pattern})\b", clause, re.IGNORECASE):
+            return column
+    return None
+
+
+def _parse_number(
+    value: float, before: str, after: str
+) -> tuple[Optional[Constraint], int]:
+    """
+    Builds the constraint for one number given the text around it and returns
+    it with the number of comparator phrases it used. Only a unit, a currency
+    or a keyword right next to the number decides the column.
+    """
+    lead = _LEAD.search(before).group()
+    unit = _UNIT_AFTER.match(after)
+    rest = after[unit.end() :] if unit else after
+    comparison, comparison_after = _last_comparator(lead), _comparator_after(rest)
+    used = (comparison is not None) + (comparison_after is not None)
+    if after.startswith("+"):
+        comparison = ">="
+    else:
+        comparison = comparison or comparison_after
+
+    if (unit and unit.group("currency")) or _CURRENCY_BEFORE.search(before):
+        column, default = "pricepernight", "<="
+    elif unit and unit.group("star"):
+        column, default = "starcategory", ">="
+    elif unit and unit.group("distance"):
+        column, default = _distance_column(before + after), "<="
+        if column is None:
+            return None, 0
+        value = round(value * _DISTANCE_UNITS[unit.group("distance").lower()], 3)
+    else:
+        # Ohne Einheit braucht es genau eine Spalte mit Schlüsselwort direkt an der Zahl
+        trail = _TRAIL.match(rest).group()
+        candidates = {
+            column: default
+            for pattern, column, default in _KEYWORDS
+            if pattern.search(lead) or pattern.search(trail)
+        }
+        if len(candidates) != 1:
+            return None, 0
+        column, default = next(iter(candidates.items()))
+
+    if column == "starcategory" and not 1 <= value <= 5:
+        return None, 0
+    if column == "rating" and not 0 <= value <= 10:
+        return None, 0
+    constraint = Constraint(
+        column=column, datatype=float, comparison=comparison or default, value=value
+    )
+    return constraint, used
+
+
+def _parse_clause(clause: str) -> tuple[list[Constraint], int]:
+    """Constraints of one clause and the number of comparator phrases they used."""
+    numbers = list(re.finditer(_NUMBER, clause))
+    constraints, used = [], 0
+    for i, m in enumerate(numbers):
+        # Kontext einer Zahl reicht nur bis zur vorherigen bzw. nächsten Zahl
+        start = numbers[i - 1].end() if i > 0 else 0
+        end = numbers[i + 1].start() if i + 1 < len(numbers) else len(clause)
+        before, after = clause[start : m.start()], clause[m.end() : end]
+        # Tausendertrennzeichen/Datumsangaben u.ä. nicht anfassen
+        if re.match(r"[.,:/]\d", clause[m.end() :]):
+            continue
+        constraint, comparators = _parse_number(_to_float(m.group(1)), before, after)
+        if constraint is not None:
+            constraints.append(constraint)
+            used += comparators
+    return constraints, used
+
+
+def _range_bounds(m: re.Match) -> tuple[tuple[int, int], tuple[int, int]]:
+    for i in "123":
+        if m.group(f"lo{i}") is not None:
+            return m.span(f"lo{i}"), m.span(f"hi{i}")
+
+
+def _remove_ranges(query: str) -> tuple[str, set[str]]:
+    """
+    Blanks out numeric ranges and returns the remaining query plus the
+    columns the ranges refer to. A range needs two bounds on one column,
+    which a single Constraint cannot express.
+    """
+    columns = set()
+    for m in _RANGE.finditer(query):
+        (lo_start, lo_end), (hi_start, hi_end) = _range_bounds(m)
+        before = _CLAUSE_SPLIT.split(query[:lo_start])[-1]
+        after = _CLAUSE_SPLIT.split(query[hi_end:])[0]
+        between = query[lo_end:hi_start]
+        for constraint, _ in (
+            _parse_number(_to_float(query[hi_start:hi_end]), before + between, after),
+            _parse_number(_to_float(query[lo_start:lo_end]), before, between + after),
+        ):
+            if constraint is not None:
+                columns.add(constraint.column)
+                break
+        query = query[: m.start()] + " " * (m.end() - m.start()) + query[m.end() :]
+    return query, columns
+
+
+def parse_numeric_constraints(query: str) -> dict[str, Constraint]:
+    """
+    Extracts explicit numeric constraints for pricepernight, rating,
+    starcategory and the distanceto* columns, e.g. "cheaper than 40 EUR",
+    "rating at least 9.3", "4 stars or more", "within 500 m of the beach"
+    (English and German). Vague phrasing without a number ("near the beach",
+    "cheap") yields nothing and is left to the LLM, and so does any column
+    with a range ("between 50 and 100 EUR") or with several different
+    numbers ("under 100 EUR ... at most 80 EUR"). If a comparator is not
+    attached to a parsed number ("5 star hotel less than 300"), the whole
+    query is left to the LLM.
+    Returns column -> Constraint.
+    """
+    query, ambiguous = _remove_ranges(query)
+    found: dict[str, set[Constraint]] = {}
+    for clause in _CLAUSE_SPLIT.split(query):
+        constraints, used = _parse_clause(clause)
+        if used < len(_COMPARATOR_WORDS.findall(clause)):
+            return {}
+        for constraint in constraints:
+            found.setdefault(constraint.column, set()).add(constraint)
+    return {
+        column: next(iter(constraints))
+        for column, constraints in found.items()
+        if column not in ambiguous and len(constraints) == 1
+    }
@@ -0,0 +1,90 @@
+from typing import Optional
+
+from column_schema import ColumnInfo, get_schema
+from constants import CATEGORY_STRING, load_grouped_columns_from_json_string
+from hotel_store import HotelTable, normalize_column_name
+
+# CATEGORY_STRING nur einmal parsen; feste Reihenfolge wie in der Kategorienliste,
+# damit gleiche Prompts byteidentisch sind (Prefix-Caching beim Anbieter)
+CATEGORIES = load_grouped_columns_from_json_string(CATEGORY_STRING)
+ALL_COLUMNS = tuple(
+    dict.fromkeys(column for columns in CATEGORIES.values() for column in columns)
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough to compare prompts."""
+    return len(text) // 4
+
+
+def is_constant(info: ColumnInfo) -> bool:
+    """Same as test/research.py: a single distinct value, NaN counted as a value."""
+    return len(info.distinct) + (info.null_ratio > 0) <= 1
+
+
+class PromptVocabulary:
+    """The column names offered to the LLM for one city, plus what was left out."""
+
+    __slots__ = ("columns", "missing", "constant", "keys_string")
+
+    def __init__(
+        self,
+        columns: tuple[str, ...],
+        missing: tuple[str, ...] = (),
+        constant: tuple[str, ...] = (),
+    ):
+        self.columns = columns
+        self.missing = missing
+        self.constant = constant
+        self.keys_string = ",".join(columns)
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.columns
+
+    def to_dict(self) -> dict[str, object]:
+        full_tokens = estimate_tokens(FULL_VOCABULARY.keys_string)
+        tokens = estimate_tokens(self.keys_string)
+        return {
+            "columns": len(self.columns),
+            "missing": list(self.missing),
+            "constant": list(self.constant),
+            "vocabulary_tokens": tokens,
+            "vocabulary_tokens_saved": full_tokens - tokens,
+        }
+
+
+FULL_VOCABULARY = PromptVocabulary(ALL_COLUMNS)
+
+
+def build_vocabulary(table: HotelTable) -> PromptVocabulary:
+    schema = get_schema(table)
+    columns, missing, constant = [], [], []
+    for column in ALL_COLUMNS:
+        info = schema.get(normalize_column_name(column))
+        if info is None or info.kind is None:
+            missing.append(column)
+        elif is_constant(info):
+            constant.append(column)
+        else:
+            columns.append(column)
+    return PromptVocabulary(tuple(columns), tuple(missing), tuple(constant))
+
+
+def prompt_vocabulary(table: Optional[HotelTable]) -> PromptVocabulary:
+    """
+    Columns that exist in the city and are not constant there, computed once
+    per HotelTable. Without a table all CATEGORY_STRING columns are offered.
+    """
+    if table is None:
+        return FULL_VOCABULARY
+    return table.derive("prompt_vocabulary", lambda: build_vocabulary(table))
+
+
+def constant_columns(columns: list[str], table: Optional[HotelTable]) -> list[str]:
+    """
+    The given columns (e.g. from the local column matcher) that are constant
+    in the city and therefore missing from its prompts: the LLM cannot select
+    them, although the query asks for them.
+    """
+    constant = {normalize_column_name(c) for c in prompt_vocabulary(table).constant}
+    return [c for c in columns if normalize_column_name(c) in constant]
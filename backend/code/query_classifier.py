@@ -0,0 +1,395 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from typing import Optional
+
+import numpy as np
+
+# Lokaler Klassifikator (TF-IDF + logistische Regression) für is_valid_request
+# und is_unrestricted_request; das LLM wird nur innerhalb des Unsicherheitsbands
+# gefragt
+QUERY_CLASSIFIER_ENABLED = os.getenv("QUERY_CLASSIFIER_ENABLED", "0") == "1"
+QUERY_CLASSIFIER_PATH = os.getenv(
+    "QUERY_CLASSIFIER_PATH",
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "data", "query_classifier.json"
+    ),
+)
+# Band um 0.5, in dem der Klassifikator sich enthält: p in (0.5 - m, 0.5 + m)
+QUERY_CLASSIFIER_MARGIN = float(os.getenv("QUERY_CLASSIFIER_MARGIN", "0.3"))
+# Anteil sicherer Entscheidungen, die im Hintergrund zusätzlich vom LLM geprüft werden
+QUERY_CLASSIFIER_SHADOW_RATE = float(os.getenv("QUERY_CLASSIFIER_SHADOW_RATE", "0"))
+ARTIFACT_VERSION = 1
+TASKS = ("valid", "unrestricted")
+
+_WORD = re.compile(r"[^\W\d_]+|\d+(?:[.,]\d+)?")
+_QUOTED = re.compile(r'"""(.*?)"""', re.S)
+
+
+def features(query: str) -> list[str]:
+    """Lower-cased word unigrams and bigrams; every number becomes <num>."""
+    tokens = [
+        "<num>" if token[0].isdigit() else token
+        for token in _WORD.findall(query.lower())
+    ]
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def _tf_idf(query: str, idf: dict[str, float]) -> dict[str, float]:
+    counts: dict[str, int] = {}
+    for feature in features(query):
+        if feature in idf:
+            counts[feature] = counts.get(feature, 0) + 1
+    vector = {f: (1 + math.log(c)) * idf[f] for f, c in counts.items()}
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    if norm:
+        for feature in vector:
+            vector[feature] /= norm
+    return vector
+
+
+class QueryClassifier:
+    """
+    Inference side of the artifact written by `train`: a shared TF-IDF
+    vocabulary and one logistic regression per task. Inference is plain
+    dict lookups, about 30 µs per prediction.
+    """
+
+    def __init__(self, artifact: dict[str, object]):
+        if artifact.get("version") != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported classifier version: {artifact.get('version')}")
+        self.model_id = artifact["model_id"]
+        self.idf: dict[str, float] = artifact["idf"]
+        self.tasks: dict[str, tuple[float, dict[str, float]]] = {
+            task: (model["bias"], model["weights"])
+            for task, model in artifact["tasks"].items()
+        }
+
+    @classmethod
+    def load(cls, path: str = QUERY_CLASSIFIER_PATH) -> "QueryClassifier":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def probability(self, task: str, query: str) -> float:
+        bias, weights = self.tasks[task]
+        z = bias + sum(
+            value * weights.get(feature, 0.0)
+            for feature, value in _tf_idf(query, self.idf).items()
+        )
+        return 1 / (1 + math.exp(-max(min(z, 50.0), -50.0)))
+
+
+class ClassifierStats:
+    """Per task: answered locally vs. deferred to the LLM, and agreement with it."""
+
+    def __init__(self):
+        self.counts = {
+            task: {"local": 0, "deferred": 0, "agree": 0, "disagree": 0} for task in TASKS
+        }
+        self._lock = threading.Lock()
+
+    def add(self, task: str, key: str) -> None:
+        with self._lock:
+            self.counts[task][key] += 1
+
+    def get_stats(self) -> dict[str, object]:
+        with self._lock:
+            stats = {}
+            for task, counts in self.counts.items():
+                decided = counts["local"] + counts["deferred"]
+                compared = counts["agree"] + counts["disagree"]
+                stats[task] = {
+                    **counts,
+                    "abstain_rate": round(counts["deferred"] / decided, 4) if decided else 0.0,
+                    "agreement_rate": round(counts["agree"] / compared, 4) if compared else None,
+                }
+            return stats
+
+
+class LocalDecider:
+    """
+    Wraps an LLM classification: answers locally when the classifier is
+    outside the uncertainty band, otherwise asks the LLM and records whether
+    the local guess agreed. A sample of the local answers (shadow rate) is
+    also checked against the LLM in the background.
+    """
+
+    def __init__(
+        self,
+        classifier: Optional[QueryClassifier],
+        margin: float = QUERY_CLASSIFIER_MARGIN,
+        shadow_rate: float = QUERY_CLASSIFIER_SHADOW_RATE,
+    ):
+        self.classifier = classifier
+        self.margin = margin
+        self.shadow_rate = shadow_rate
+        self.stats = ClassifierStats()
+        self._shadow_tasks: set[asyncio.Task] = set()
+        self._shadow_counter = 0
+
+    async def decide(self, task: str, query: str, ask_llm) -> bool:
+        """`ask_llm` is a coroutine function returning the LLM verdict for the task."""
+        if self.classifier is None or not query:
+            return await ask_llm()
+        p = self.classifier.probability(task, query)
+        local = p >= 0.5
+        if abs(p - 0.5) < self.margin:
+            self.stats.add(task, "deferred")
+            verdict = await ask_llm()
+            self.stats.add(task, "agree" if verdict == local else "disagree")
+            return verdict
+
+        self.stats.add(task, "local")
+        if self.shadow_rate > 0:
+            # Deterministische Stichprobe: jede n-te lokale Entscheidung
+            self._shadow_counter += 1
+            if self._shadow_counter * self.shadow_rate >= 1:
+                self._shadow_counter = 0
+                shadow = asyncio.create_task(self._shadow(task, local, ask_llm))
+                self._shadow_tasks.add(shadow)
+                shadow.add_done_callback(self._shadow_tasks.discard)
+        return local
+
+    async def _shadow(self, task: str, local: bool, ask_llm) -> None:
+        try:
+            verdict = await ask_llm()
+        except Exception:
+            return
+        self.stats.add(task, "agree" if verdict == local else "disagree")
+
+    def get_stats(self) -> dict[str, object]:
+        return {
+            "enabled": self.classifier is not None,
+            "model_id": self.classifier.model_id if self.classifier else None,
+            "margin": self.margin,
+            "shadow_rate": self.shadow_rate,
+            **self.stats.get_stats(),
+        }
+
+
+def _load_decider() -> LocalDecider:
+    classifier = None
+    if QUERY_CLASSIFIER_ENABLED and os.path.exists(QUERY_CLASSIFIER_PATH):
+        classifier = QueryClassifier.load()
+    return LocalDecider(classifier)
+
+
+query_decider = _load_decider()
+
+
+# --- Training -----------------------------------------------------------------
+
+
+def _label_from_prompt(user: str, response: str) -> Optional[tuple[str, str, bool]]:
+    """(task, query, label) for a logged validator or classifier call, else None."""
+    match = _QUOTED.search(user)
+    if not match:
+        return None
+    query = match.group(1).strip()
+    if "suitable for a hotel search" in user:
+        return "valid", query, response.strip().lower() != "invalid"
+    if user.startswith("User prompt:"):
+        return "unrestricted", query, response.strip().upper() == "UNRESTRICTED"
+    return None
+
+
+def _labels_from_understanding(user: str, response: str) -> list[tuple[str, str, bool]]:
+    try:
+        data = json.loads(response)
+    except ValueError:
+        return []
+    query = user.removeprefix("User query:").strip()
+    if not isinstance(data, dict) or not isinstance(data.get("valid"), bool):
+        return []
+    labels = [("valid", query, data["valid"])]
+    if data["valid"] and isinstance(data.get("restricted"), bool):
+        labels.append(("unrestricted", query, not data["restricted"]))
+    return labels
+
+
+def collect_examples(
+    labels: list[str], recordings: list[str], caches: list[str]
+) -> dict[str, dict[str, bool]]:
+    """
+    Training examples per task as {query: label}. Sources: hand-labeled JSONL
+    files ({"query", "valid", "unrestricted"}), recordings of
+    LLM_BACKEND=record and LLM response cache databases (LLM_CACHE_PATH).
+    Later sources override earlier ones, logged LLM verdicts override seeds.
+    """
+    examples: dict[str, dict[str, bool]] = {task: {} for task in TASKS}
+
+    def add(task: str, query: str, label: bool) -> None:
+        if query:
+            examples[task][query] = label
+
+    for path in labels:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                for task in TASKS:
+                    if isinstance(entry.get(task), bool):
+                        add(task, entry["query"], entry[task])
+
+    for path in recordings:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                system, user = entry["messages"][0]["content"], entry["messages"][-1]["content"]
+                if "query understanding assistant" in system:
+                    for label in _labels_from_understanding(user, entry["content"]):
+                        add(*label)
+                else:
+                    label = _label_from_prompt(user, entry["content"])
+                    if label:
+                        add(*label)
+
+    for path in caches:
+        db = sqlite3.connect(path)
+        try:
+            rows = db.execute("SELECT user_prompt, response FROM responses").fetchall()
+        finally:
+            db.close()
+        for user, response in rows:
+            label = _label_from_prompt(user, response)
+            if label:
+                add(*label)
+    return examples
+
+
+def _fit_logistic(
+    x: np.ndarray, y: np.ndarray, l2: float, iterations: int = 2000, lr: float = 2.0
+) -> tuple[float, np.ndarray]:
+    """Full-batch gradient descent on the L2-regularized log loss, classes balanced."""
+    weights = np.zeros(x.shape[1])
+    bias = 0.0
+    positive = y.mean()
+    sample_weight = np.where(y == 1, 0.5 / max(positive, 1e-9), 0.5 / max(1 - positive, 1e-9))
+    sample_weight /= sample_weight.sum()
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-(x @ weights + bias)))
+        error = (p - y) * sample_weight
+        weights -= lr * (x.T @ error + l2 * weights)
+        bias -= lr * error.sum()
+    return float(bias), weights
+
+
+def train(examples: dict[str, dict[str, bool]], l2: float = 1e-3) -> dict[str, object]:
+    """Builds the artifact: shared vocabulary/IDF over all queries, one model per task."""
+    queries = sorted({query for task in TASKS for query in examples[task]})
+    document_frequency: dict[str, int] = {}
+    for query in queries:
+        for feature in set(features(query)):
+            document_frequency[feature] = document_frequency.get(feature, 0) + 1
+    n = len(queries)
+    idf = {
+        feature: math.log((1 + n) / (1 + df)) + 1
+        for feature, df in sorted(document_frequency.items())
+    }
+    columns = {feature: i for i, feature in enumerate(idf)}
+
+    def matrix(task_queries: list[str]) -> np.ndarray:
+        x = np.zeros((len(task_queries), len(columns)))
+        for row, query in enumerate(task_queries):
+            for feature, value in _tf_idf(query, idf).items():
+                x[row, columns[feature]] = value
+        return x
+
+    tasks, training = {}, {}
+    for task in TASKS:
+        task_queries = sorted(examples[task])
+        y = np.array([examples[task][q] for q in task_queries], dtype=float)
+        if len(set(y)) < 2:
+            raise ValueError(f"Task {task!r} needs examples of both classes.")
+        x = matrix(task_queries)
+        bias, weights = _fit_logistic(x, y, l2)
+        p = 1 / (1 + np.exp(-(x @ weights + bias)))
+        tasks[task] = {
+            "bias": round(bias, 6),
+            "weights": {
+                feature: round(float(w), 6)
+                for feature, w in zip(columns, weights)
+                if abs(w) >= 1e-6
+            },
+        }
+        training[task] = {
+            "examples": len(task_queries),
+            "positive": int(y.sum()),
+            "train_accuracy": round(float(((p >= 0.5) == (y == 1)).mean()), 4),
+        }
+
+    digest = hashlib.sha256(
+        json.dumps(examples, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    return {
+        "version": ARTIFACT_VERSION,
+        "model_id": f"tfidf-logreg-{digest[:12]}",
+        "l2": l2,
+        "training": training,
+        "idf": {feature: round(value, 6) for feature, value in idf.items()},
+        "tasks": tasks,
+    }
+
+
+def cross_validate(
+    examples: dict[str, dict[str, bool]], folds: int = 5, l2: float = 1e-3
+) -> dict[str, dict[str, float]]:
+    """
+    k-fold estimate per task: accuracy of the confident (local) answers and
+    the share of queries that would be deferred to the LLM.
+    """
+    results = {}
+    for task in TASKS:
+        queries = sorted(examples[task])
+        confident = correct = 0
+        for fold in range(folds):
+            held_out = set(queries[fold::folds])
+            subset = {
+                t: {q: label for q, label in examples[t].items() if q not in held_out}
+                for t in TASKS
+            }
+            classifier = QueryClassifier(train(subset, l2))
+            for query in held_out:
+                p = classifier.probability(task, query)
+                if abs(p - 0.5) >= QUERY_CLASSIFIER_MARGIN:
+                    confident += 1
+                    correct += (p >= 0.5) == examples[task][query]
+        results[task] = {
+            "cv_local_accuracy": round(correct / confident, 4) if confident else None,
+            "cv_abstain_rate": round(1 - confident / len(queries), 4),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    # python query_classifier.py --labels ../data/query_labels.jsonl \
+    #     --recordings ../data/llm_recording.jsonl --cache ../data/llm_cache.sqlite
+    parser = argparse.ArgumentParser(description="Train the local query classifier.")
+    parser.add_argument("--labels", nargs="*", default=["../data/query_labels.jsonl"])
+    parser.add_argument("--recordings", nargs="*", default=[])
+    parser.add_argument("--cache", nargs="*", default=[])
+    parser.add_argument("--l2", type=float, default=1e-3)
+    parser.add_argument("--folds", type=int, default=5, help="0 skips cross-validation")
+    parser.add_argument("--out", default=QUERY_CLASSIFIER_PATH)
+    args = parser.parse_args()
+
+    examples = collect_examples(args.labels, args.recordings, args.cache)
+    artifact = train(examples, args.l2)
+    if args.folds > 1:
+        for task, stats in cross_validate(examples, args.folds, args.l2).items():
+            artifact["training"][task].update(stats)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+    print(f"{artifact['model_id']} written to {args.out}")
+    for task, stats in artifact["training"].items():
+        print(f"  {task}: {stats}")
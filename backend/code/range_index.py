@@ -0,0 +1,86 @@
+from functools import reduce
+from typing import Optional
+
+import numpy as np
+
+from column_schema import get_schema
+from constraint_engine import _numeric
+from hotel_store import HotelTable
+from models import COMPARISONS, Constraint
+
+
+class SortedColumn:
+    """Row ids of one numeric column sorted by value; NaN/None rows are left out."""
+
+    __slots__ = ("values", "rows")
+
+    def __init__(self, values: np.ndarray):
+        numbers, is_number = _numeric(values)
+        is_number = is_number & ~np.isnan(numbers)
+        rows = np.flatnonzero(is_number)
+        order = np.argsort(numbers[rows], kind="stable")
+        self.rows = rows[order].astype(np.int32)
+        self.values = numbers[rows][order]
+
+    def select(self, comparison: str, value: float) -> np.ndarray:
+        """Row ids satisfying `column <comparison> value` in O(log n + k)."""
+        if comparison not in COMPARISONS:
+            raise ValueError(f"Ungültige Vergleichsoperation: {comparison}")
+        if value != value:  # NaN erfüllt keinen Vergleich
+            return self.rows[:0]
+        left = np.searchsorted(self.values, value, side="left")
+        right = np.searchsorted(self.values, value, side="right")
+        if comparison == "<":
+            return self.rows[:left]
+        if comparison == "<=":
+            return self.rows[:right]
+        if comparison == ">":
+            return self.rows[right:]
+        if comparison == ">=":
+            return self.rows[left:]
+        return self.rows[left:right]
+
+
+class RangeIndex:
+    """
+    Sorted-array index over every numeric column of a city (price, rating,
+    distances, ...). The argsort runs once per table; a range constraint is
+    two binary searches plus a slice.
+    """
+
+    def __init__(self, table: HotelTable):
+        self.size = len(table)
+        self.columns = {
+            name: SortedColumn(table.columns[name])
+            for name, info in get_schema(table).items()
+            if info.kind == "numeric" and name in table.columns
+        }
+
+    def rows(self, constraint: Constraint) -> Optional[np.ndarray]:
+        """Matching row ids of a float constraint, None if it cannot be answered here."""
+        if constraint.datatype != float:
+            return None
+        column = self.columns.get(constraint.column)
+        if column is None:
+            return None
+        return column.select(constraint.comparison, constraint.value)
+
+    def intersect(self, constraints: list[Constraint]) -> Optional[np.ndarray]:
+        """
+        Sorted row ids satisfying all constraints, None if one of them is not
+        indexed. Starts with the smallest row set so every step stays cheap.
+        """
+        row_sets = [self.rows(constraint) for constraint in constraints]
+        if not row_sets or any(rows is None for rows in row_sets):
+            return None
+        row_sets.sort(key=len)
+        return reduce(
+            lambda a, b: np.intersect1d(a, b, assume_unique=True),
+            row_sets[1:],
+            np.sort(row_sets[0]),
+        )
+
+
+def range_index(table: HotelTable) -> RangeIndex:
+    """Index of a city, built once per HotelTable."""
+    return table.derive("range_index", lambda: RangeIndex(table))
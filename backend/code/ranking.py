@@ -0,0 +1,89 @@
+from typing import Optional
+
+import numpy as np
+
+from hotel_store import HotelTable
+
+# Anzahl der Hotels, die find_matching_hotels zurückgibt
+TOP_K = 10
+
+
+def _ltr_scores(table: HotelTable) -> np.ndarray:
+    """ltr_score as float array; a missing column counts as 0, NaN as -inf."""
+
+    def build() -> np.ndarray:
+        values = table.columns.get("ltr_score")
+        if values is None:
+            return np.zeros(len(table))
+        scores = np.array(
+            [np.nan if value is None else value for value in values]
+            if values.dtype.kind == "O"
+            else values,
+            dtype=float,
+        )
+        scores[np.isnan(scores)] = -np.inf
+        return scores
+
+    return table.derive("ltr_scores", build)
+
+
+def ltr_order(table: HotelTable) -> np.ndarray:
+    """
+    Row indices by descending ltr_score, ties in row order - the same order as
+    a stable `sorted(..., reverse=True)` over the hotels dict. Computed once per
+    table.
+    """
+
+    def build() -> np.ndarray:
+        rows = np.arange(len(table))
+        return np.lexsort((rows, -_ltr_scores(table)))
+
+    return table.derive("ltr_order", build)
+
+
+def _ltr_rank(table: HotelTable) -> np.ndarray:
+    """Position of each row in ltr_order (0 = best)."""
+
+    def build() -> np.ndarray:
+        rank = np.empty(len(table), dtype=np.int64)
+        rank[ltr_order(table)] = np.arange(len(table))
+        return rank
+
+    return table.derive("ltr_rank", build)
+
+
+def top_k_by_ltr(table: HotelTable, k: Optional[int] = TOP_K) -> list[str]:
+    """The k best hotels by ltr_score; k=None returns all of them."""
+    return table.names[ltr_order(table)[:k]].tolist()
+
+
+def top_k_by_score(
+    scores: np.ndarray, table: HotelTable, k: Optional[int] = TOP_K
+) -> list[str]:
+    """
+    The k best hotels with a positive score, ordered by (score, ltr_score)
+    descending with ties in row order, exactly like sort_hotels_by_score.
+    Uses argpartition, so only the k winners are sorted.
+    """
+    candidates = np.flatnonzero(scores > 0)
+    # Eindeutiger Schlüssel je Zeile: Score zuerst, dann Position in der ltr-Ordnung
+    n = len(table)
+    keys = scores[candidates].astype(np.int64) * n + (n - 1 - _ltr_rank(table)[candidates])
+    if k is not None and k < len(candidates):
+        best = np.argpartition(-keys, k - 1)[:k]
+        candidates, keys = candidates[best], keys[best]
+    return table.names[candidates[np.argsort(-keys)]].tolist()
+
+
+def top_k_by_value(
+    values: np.ndarray, table: HotelTable, k: Optional[int] = TOP_K
+) -> list[str]:
+    """
+    The k best hotels with a positive (float) score, e.g. from graded scoring.
+    Equal scores fall back to the ltr order, like top_k_by_score.
+    """
+    candidates = np.flatnonzero(values > 0)
+    if k is not None and k < len(candidates):
+        candidates = candidates[np.argpartition(-values[candidates], k - 1)[:k]]
+    order = np.lexsort((_ltr_rank(table)[candidates], -values[candidates]))
+    return table.names[candidates[order]].tolist()
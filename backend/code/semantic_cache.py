@@ -0,0 +1,190 @@
+import os
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Optional
+
+from column_matcher import column_matcher
+from constants import STOPWORDS
+from hotel_store import HotelTable
+from models import Constraint
+from numeric_parser import parse_numeric_constraints
+
+# Ähnlichkeitsschwelle (Jaccard über die normalisierten Tokens)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8"))
+# Höchstzahl der Einträge über alle Städte, Lebensdauer eines Eintrags in Sekunden
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+
+# Tokens, die exakt übereinstimmen müssen: Zahlen, Verneinungen und Vergleichswörter
+NEGATIONS = frozenset(
+    "no not without non dont don't never kein keine keinen ohne nicht".split()
+)
+COMPARATORS = frozenset(
+    """
+    under over below above less more least most max maximum min minimum up upto
+    within exactly cheaper higher lower better fewer greater
+    unter über bis ab weniger mehr mindesten maximal höchsten genau günstiger
+    billiger höher besser
+    """.split()
+)
+STRICT_WORDS = NEGATIONS | COMPARATORS
+
+_TOKEN = re.compile(r"[0-9]+(?:[.,][0-9]+)?|[^\W\d_]+(?:['-][^\W\d_]+)*")
+
+
+def normalize(query: str) -> frozenset[str]:
+    """
+    Canonical token set of a query: lowercased, stopwords removed, plural "s"
+    stripped. Word order and filler words do not matter.
+    """
+    tokens = set()
+    for token in _TOKEN.findall(query.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.add(token.replace(",", "."))
+    return frozenset(tokens)
+
+
+def _strict_tokens(tokens: frozenset[str]) -> frozenset[str]:
+    return frozenset(t for t in tokens if t[0].isdigit() or t in STRICT_WORDS)
+
+
+def similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    """
+    Jaccard similarity of two normalized queries; 0 if they differ in a number,
+    a negation or a comparator ("under 40" vs "under 50" vs "over 40", "with
+    pool" vs "without pool").
+    """
+    if not a and not b:
+        return 1.0
+    if _strict_tokens(a) != _strict_tokens(b):
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def signature(query: str, table: HotelTable) -> tuple[frozenset, frozenset]:
+    """What the local parsers read from a query: matched columns and numeric constraints."""
+    columns = column_matcher.match(query, table.columns).columns
+    return frozenset(columns), frozenset(parse_numeric_constraints(query).values())
+
+
+class CachedUnderstanding:
+    """What the pipeline derived from a query for one city dataset."""
+
+    def __init__(
+        self,
+        improved_query: str,
+        relevant_columns: list[str],
+        constraints: list[Constraint],
+    ):
+        self.improved_query = improved_query
+        self.relevant_columns = relevant_columns
+        self.constraints = constraints
+
+
+class SemanticQueryCache:
+    """
+    Maps previous queries to their (relevant_columns, constraints) per
+    HotelTable and extraction mode. A lookup hits a stored query if
+    - every token of the new query occurs in the stored one (nothing the new
+      query asks for can be missing from the cached constraints),
+    - both have the same signature(): the column matcher and the numeric
+      parser read the same columns and numbers from them,
+    - their Jaccard similarity is at least `threshold`.
+    Entries expire after `ttl` seconds; beyond `max_entries` (all tables
+    together) the least recently used entry of the fullest table goes first.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_SIZE,
+        ttl: float = SEMANTIC_CACHE_TTL,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Einträge hängen am HotelTable-Objekt: neue Daten -> leerer Cache
+        self._tables: "weakref.WeakKeyDictionary[HotelTable, OrderedDict]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def _expire(self, entries: OrderedDict, now: float) -> None:
+        expired = [
+            key for key, (_, _, stored_at) in entries.items() if now - stored_at > self.ttl
+        ]
+        for key in expired:
+            del entries[key]
+
+    def _size(self) -> int:
+        return sum(len(entries) for entries in self._tables.values())
+
+    def lookup(
+        self, query: str, table: HotelTable, extraction: str
+    ) -> Optional[CachedUnderstanding]:
+        tokens = normalize(query)
+        key = (extraction, tokens)
+        with self._lock:
+            entries = self._tables.get(table)
+            best, best_score = None, self.threshold
+            if entries:
+                self._expire(entries, time.monotonic())
+            if entries:
+                query_signature = signature(query, table)
+                if key in entries and entries[key][0] == query_signature:
+                    best = key
+                else:
+                    for stored, (stored_signature, _, _) in entries.items():
+                        if stored[0] != extraction or not tokens <= stored[1]:
+                            continue
+                        score = similarity(tokens, stored[1])
+                        if score >= best_score and stored_signature == query_signature:
+                            best, best_score = stored, score
+            if best is None:
+                self.misses += 1
+                return None
+            entries.move_to_end(best)
+            self.hits += 1
+            return entries[best][1]
+
+    def store(
+        self, query: str, table: HotelTable, extraction: str, entry: CachedUnderstanding
+    ) -> None:
+        tokens = normalize(query)
+        if not tokens:
+            return
+        key = (extraction, tokens)
+        query_signature = signature(query, table)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._tables.setdefault(table, OrderedDict())
+            self._expire(entries, now)
+            entries[key] = (query_signature, entry, now)
+            entries.move_to_end(key)
+            while self._size() > self.max_entries:
+                fullest = max(self._tables.values(), key=len)
+                fullest.popitem(last=False)
+
+    def get_stats(self) -> dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "threshold": self.threshold,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "entries": self._size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+semantic_cache = SemanticQueryCache() if SEMANTIC_CACHE_ENABLED else None
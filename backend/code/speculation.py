@@ -0,0 +1,53 @@
+import os
+import threading
+
+# Spalten- und Constraint-Extraktion schon parallel zu den Vorprüfungen auf der
+# Original-Anfrage starten (nur im multi_call-Modus)
+SPECULATIVE_EXTRACTION = os.getenv("SPECULATIVE_EXTRACTION", "0") == "1"
+
+# Ausgänge einer Spekulation
+OUTCOMES = (
+    "used",  # Ergebnis übernommen
+    "lost_race",  # reguläre Extraktion war schneller
+    "discarded",  # keine Spalten gefunden oder Fehler -> reguläre Extraktion
+    "wasted_invalid",  # Anfrage ungültig, abgebrochen
+    "wasted_unrestricted",  # Anfrage ohne Filter, abgebrochen
+)
+
+
+class SpeculationStats:
+    """
+    Outcome counters of speculative extraction. `saved_seconds` is the part of
+    a used speculation that overlapped the pre-checks, i.e. the latency the
+    regular path would have added after them; `wasted_seconds` is the work
+    thrown away.
+    """
+
+    def __init__(self):
+        self.outcomes = {outcome: 0 for outcome in OUTCOMES}
+        self.saved_seconds = 0.0
+        self.wasted_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str, saved: float = 0.0, wasted: float = 0.0) -> None:
+        with self._lock:
+            self.outcomes[outcome] += 1
+            self.saved_seconds += saved
+            self.wasted_seconds += wasted
+
+    def get_stats(self) -> dict[str, object]:
+        with self._lock:
+            started = sum(self.outcomes.values())
+            used = self.outcomes["used"]
+            return {
+                "enabled": SPECULATIVE_EXTRACTION,
+                "started": started,
+                **self.outcomes,
+                "wasted_rate": round((started - used) / started, 4) if started else 0.0,
+                "saved_seconds_total": round(self.saved_seconds, 6),
+                "saved_seconds_avg": round(self.saved_seconds / used, 6) if used else 0.0,
+                "wasted_seconds_total": round(self.wasted_seconds, 6),
+            }
+
+
+speculation_stats = SpeculationStats()
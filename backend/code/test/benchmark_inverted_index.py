@@ -0,0 +1,104 @@
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# Module aus backend/code importierbar machen
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from constraint_engine import score_table
+from hotel_store import HotelTable, hotel_store
+from inverted_index import inverted_index, score_table_inverted
+from range_index import range_index
+from models import Constraint
+
+# Compares the dense scan (one mask per constraint over all hotels) with the
+# index path (inverted index for amenities, range index for price/rating/
+# distance filters, one bincount over the postings) on the bundled parquet
+# files and on copies scaled up to more hotels.
+ROUNDS = 200
+SCALES = (1, 100, 1000)
+random.seed(42)
+
+
+def scaled(table: HotelTable, factor: int) -> HotelTable:
+    if factor == 1:
+        return table
+    names = np.array(
+        [f"{name}#{i}" for i in range(factor) for name in table.names.tolist()],
+        dtype=object,
+    )
+    columns = {name: np.tile(values, factor) for name, values in table.columns.items()}
+    return HotelTable(names, columns)
+
+
+RANGE_COLUMNS = ("pricepernight", "rating", "starcategory", "distancetocity")
+
+
+def constraint_sets(table: HotelTable, ranges: bool) -> list[list[Constraint]]:
+    index = inverted_index(table)
+    columns = [c for c in table.columns if index.postings(c) is not None]
+    sets = []
+    for _ in range(ROUNDS):
+        picked = random.sample(columns, random.randint(1, 8))
+        constraints = [Constraint(column=c, datatype=int, value=1) for c in picked]
+        if ranges:
+            # Schwellwert = zufälliger Wert der Spalte, wie "rating >= 9.3"
+            for column in random.sample(RANGE_COLUMNS, random.randint(1, 3)):
+                value = float(random.choice(table.columns[column].tolist()))
+                constraints.append(
+                    Constraint(
+                        column=column,
+                        datatype=float,
+                        comparison=random.choice(("<", "<=", ">", ">=")),
+                        value=value,
+                    )
+                )
+        sets.append(constraints)
+    return sets
+
+
+def timed(function, sets, table) -> float:
+    start = time.perf_counter()
+    for constraints in sets:
+        function(constraints, table)
+    return (time.perf_counter() - start) / len(sets) * 1e6
+
+
+def main():
+    print(
+        f"{'city':<12}{'hotels':>9}{'ranges':>8}{'density':>9}"
+        f"{'dense µs':>11}{'index µs':>11}{'speedup':>9}"
+    )
+    for city in hotel_store.cities():
+        base = hotel_store.get_table(city)
+        for factor in SCALES:
+            table = scaled(base, factor)
+            index_start = time.perf_counter()
+            index = inverted_index(table)
+            range_index(table)
+            build_ms = (time.perf_counter() - index_start) * 1000
+
+            for ranges in (False, True):
+                sets = constraint_sets(table, ranges)
+                for constraints in sets[:20]:
+                    assert np.array_equal(
+                        score_table(constraints, table),
+                        score_table_inverted(constraints, table),
+                    )
+                densities = [
+                    index.density(c.column) for s in sets for c in s if c.datatype == int
+                ]
+                dense = timed(score_table, sets, table)
+                inverted = timed(score_table_inverted, sets, table)
+                print(
+                    f"{city:<12}{len(table):>9}{'yes' if ranges else 'no':>8}"
+                    f"{np.mean(densities):>9.3f}{dense:>11.1f}{inverted:>11.1f}"
+                    f"{dense / inverted:>8.1f}x   (index build {build_ms:.0f} ms)"
+                )
+
+
+if __name__ == "__main__":
+    main()
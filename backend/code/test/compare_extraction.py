@@ -0,0 +1,68 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Beide Modi müssen die echten Kosten zeigen, keine Cache-Treffer vom Lauf davor
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "0")
+
+# Module aus backend/code importierbar machen
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hotel_store import hotel_store
+from hotel_utils import EXTRACTION_MODES, create_constraints
+from llm_utils import get_openai_client, get_relevant_columns, improve_user_query, track_usage
+
+# Compares token usage and latency of the per-column and the batched
+# constraint extraction on the example queries.
+queries_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "queries.json"
+)
+
+with open(queries_path, encoding="utf-8") as f:
+    queries = json.load(f)
+
+
+async def main():
+    client = get_openai_client()
+    totals = {
+        mode: {"seconds": 0.0, "tokens": 0, "calls": 0} for mode in EXTRACTION_MODES
+    }
+
+    for city in hotel_store.cities():
+        hotels = hotel_store.get_hotels(city)
+        for query in queries:
+            # Query-Verbesserung und Spaltenauswahl sind für beide Modi gleich
+            improved_query = await improve_user_query(query, hotels)
+            relevant_columns = await get_relevant_columns(improved_query) or []
+
+            print(f"\n[{city}] {query}")
+            print(f"  columns: {relevant_columns}")
+            for mode in EXTRACTION_MODES:
+                with track_usage() as usage:
+                    start = time.perf_counter()
+                    constraints = await create_constraints(
+                        hotels, improved_query, relevant_columns, client, mode=mode
+                    )
+                    seconds = time.perf_counter() - start
+
+                totals[mode]["seconds"] += seconds
+                totals[mode]["tokens"] += usage.total_tokens
+                totals[mode]["calls"] += usage.calls
+                print(
+                    f"  {mode:<10} {seconds * 1000:8.0f} ms  {usage.calls:3d} calls  "
+                    f"{usage.prompt_tokens:6d} prompt / {usage.completion_tokens:5d} completion tokens"
+                )
+                print(f"             {constraints}")
+
+    print("\nTotals:")
+    for mode, total in totals.items():
+        print(
+            f"  {mode:<10} {total['seconds']:8.2f} s  {total['calls']:4d} calls  "
+            f"{total['tokens']:7d} tokens"
+        )
+
+
+asyncio.run(main())
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# Module aus backend/code importierbar machen (wie in den Skripten hier)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hotel_store import HotelTable, hotel_store
+
+
+@pytest.fixture(scope="session")
+def tables() -> dict[str, HotelTable]:
+    """All cities from backend/data/hotels."""
+    hotel_store.load_all()
+    return {city: hotel_store.get_table(city) for city in hotel_store.cities()}
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+# Caches verfälschen Durchsatz und Latenzen (wiederholte Anfragen): standardmäßig
+# aus, mit LLM_CACHE_ENABLED=1 / SEMANTIC_CACHE_ENABLED=1 gezielt einschalten
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "0")
+
+# Module aus backend/code importierbar machen
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx
+
+from hotel_store import hotel_store
+from llm_backends import ReplayBackend, StubBackend
+from llm_cache import response_cache
+from llm_pool import client_pool
+from main import app
+from semantic_cache import semantic_cache
+from tracing import Histogram, tracer
+
+# Fires concurrent /hotels requests at the FastAPI app in-process (no network)
+# with an offline LLM backend and prints throughput and latency percentiles.
+#   python load_test.py --latency 0.8 --jitter 0.4 --failure-rate 0.02
+#   python load_test.py --replay ../../data/llm_recording.jsonl
+QUERIES = [
+    "I'm travelling with a dog and need a parking space.",
+    "Hotel with a pool and free WiFi under 150 EUR per night.",
+    "Hotel mit Sauna und Fitnessstudio, mindestens 4 Sterne.",
+    "Find me a hotel with rating at least 9.3 and cheaper than 400 EUR.",
+    "Just show me some hotels.",
+]
+
+
+async def worker(client: httpx.AsyncClient, jobs: asyncio.Queue, latency: Histogram, statuses: dict):
+    while True:
+        try:
+            city, query = jobs.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        start = time.perf_counter()
+        try:
+            response = await client.get("/hotels", params={"city": city, "query": query})
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        latency.observe(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+
+
+async def main(args):
+    hotel_store.load_all()
+    if args.replay:
+        backend = ReplayBackend(args.replay, replay_latency=True, fallback=StubBackend())
+    else:
+        backend = StubBackend(args.latency, args.jitter, args.failure_rate, seed=args.seed)
+
+    jobs = asyncio.Queue()
+    cities = hotel_store.cities()
+    for i in range(args.requests):
+        jobs.put_nowait((cities[i % len(cities)], QUERIES[i % len(QUERIES)]))
+
+    latency = Histogram()
+    statuses: dict[object, int] = {}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    start = time.perf_counter()
+    with client_pool.use(backend), contextlib.redirect_stdout(io.StringIO()):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await asyncio.gather(
+                *(worker(client, jobs, latency, statuses) for _ in range(args.concurrency))
+            )
+    seconds = time.perf_counter() - start
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, backend {backend.name}")
+    print(
+        f"caches: llm {'on' if response_cache is not None else 'off'}, "
+        f"semantic {'on' if semantic_cache is not None else 'off'}"
+    )
+    print(f"throughput {args.requests / seconds:.1f} req/s, status {statuses}")
+    print("request", latency.to_dict())
+    for name, stats in tracer.get_stats()["histograms"].items():
+        print(f"  {name:<14} {stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test of /hotels.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="median LLM latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.3, help="lognormal sigma")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", default=None, help="recording from LLM_BACKEND=record")
+    asyncio.run(main(parser.parse_args()))
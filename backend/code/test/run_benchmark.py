@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+# Caches verfälschen Latenzen und Tokenzahlen: für den Benchmark standardmäßig aus
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "0")
+
+# Module aus backend/code importierbar machen
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from constraint_engine import score_table
+from hotel_store import HotelTable, hotel_store
+from llm_backends import StubBackend
+from llm_pool import client_pool
+from llm_utils import track_usage
+from main import find_matching_hotels
+from query_classifier import query_decider
+from speculation import speculation_stats
+from models import Constraint
+
+# Runs the labeled query set against every city through find_matching_hotels
+# and writes a JSON report (per-stage timings, tokens, NDCG@10, None/[]
+# classification accuracy) that can be diffed between commits.
+#   python run_benchmark.py                 # deterministic stub LLM
+#   python run_benchmark.py --llm live      # real OpenAI calls
+QUERIES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "benchmark_queries.json"
+)
+STAGES = (
+    "understand",
+    "improve",
+    "validate",
+    "unrestricted",
+    "columns",
+    "constraints",
+    "scoring",
+    "ranking",
+)
+K = 10
+
+
+def rule_constraint(rule: dict[str, object]) -> Constraint:
+    if "values" in rule:
+        return Constraint(rule["column"], list[str], rule["values"])
+    if "comparison" in rule:
+        return Constraint(rule["column"], float, float(rule["value"]), rule["comparison"])
+    return Constraint(rule["column"], int, rule["value"])
+
+
+def ndcg_at_k(results: list[str], rules: list[dict], table: HotelTable) -> float | None:
+    """Graded relevance = number of rules a hotel satisfies; None if no hotel is relevant."""
+    gains = score_table([rule_constraint(rule) for rule in rules], table)
+    ideal = np.sort(gains)[::-1][:K]
+    discounts = 1 / np.log2(np.arange(2, K + 2))
+    idcg = float(((2.0**ideal - 1) * discounts[: len(ideal)]).sum())
+    if idcg == 0:
+        return None
+    retrieved = np.array([gains[table.index[name]] for name in results[:K]])
+    dcg = float(((2.0**retrieved - 1) * discounts[: len(retrieved)]).sum())
+    return dcg / idcg
+
+
+def classify(results: list[str] | None) -> str:
+    if results is None:
+        return "none"
+    return "hotels" if results else "empty"
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+async def run_query(city: str, entry: dict, args) -> dict[str, object]:
+    hotels = hotel_store.get_hotels(city)
+    report: dict[str, object] = {}
+    with track_usage() as usage:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = await find_matching_hotels(
+                entry["query"],
+                hotels,
+                args.extraction,
+                report,
+                args.ranking,
+                args.understanding,
+                args.speculative,
+            )
+        seconds = time.perf_counter() - start
+
+    predicted = classify(results)
+    ndcg = None
+    if results and entry.get("relevant"):
+        ndcg = ndcg_at_k(results, entry["relevant"], hotels.table)
+    timings = report.get("timings", {})
+    return {
+        "city": city,
+        "query": entry["query"],
+        "expected": entry["expected"],
+        "predicted": predicted,
+        "correct": predicted == entry["expected"],
+        "ndcg@10": None if ndcg is None else round(ndcg, 4),
+        "column_path": report.get("column_path"),
+        "columns": report.get("columns"),
+        "constraints": [repr(c) for c in report.get("constraints", [])],
+        "results": results,
+        "timings_ms": {
+            stage: round(timings[stage] * 1000, 2) for stage in STAGES if stage in timings
+        },
+        "total_ms": round(seconds * 1000, 2),
+        "tokens": usage.to_dict(),
+    }
+
+
+def summarize(rows: list[dict]) -> dict[str, object]:
+    ndcgs = [row["ndcg@10"] for row in rows if row["ndcg@10"] is not None]
+    stages = {}
+    for stage in STAGES + ("total",):
+        values = [
+            row["total_ms"] if stage == "total" else row["timings_ms"][stage]
+            for row in rows
+            if stage == "total" or stage in row["timings_ms"]
+        ]
+        stages[stage] = {
+            "count": len(values),
+            "mean_ms": round(float(np.mean(values)), 2) if values else 0.0,
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+        }
+    tokens = {
+        key: sum(row["tokens"][key] for row in rows)
+        for key in (
+            "calls",
+            "cache_hits",
+            "prompt_tokens",
+            "completion_tokens",
+            "prompt_tokens_saved",
+        )
+    }
+    return {
+        "queries": len(rows),
+        "classification_accuracy": round(
+            sum(row["correct"] for row in rows) / len(rows), 4
+        )
+        if rows
+        else 0.0,
+        "ndcg@10_mean": round(float(np.mean(ndcgs)), 4) if ndcgs else None,
+        "ndcg@10_count": len(ndcgs),
+        "stages": stages,
+        "tokens": tokens,
+    }
+
+
+async def main(args):
+    with open(args.queries, encoding="utf-8") as f:
+        labeled = json.load(f)
+    cities = args.cities or hotel_store.cities()
+    backend = None
+    if args.llm == "stub":
+        backend = StubBackend(latency=args.latency, jitter=0.0, failure_rate=0.0)
+
+    rows = []
+    with client_pool.use(backend):
+        for city in cities:
+            for entry in labeled["queries"]:
+                row = await run_query(city, entry, args)
+                rows.append(row)
+                print(
+                    f"[{city}] {row['predicted']:<6} (expected {row['expected']:<6}) "
+                    f"ndcg={row['ndcg@10']}  {row['total_ms']:8.1f} ms  "
+                    f"{row['query'][:60]}"
+                )
+
+    report = {
+        "config": {
+            "llm": args.llm,
+            "stub_latency": args.latency if args.llm == "stub" else None,
+            "extraction": args.extraction,
+            "ranking": args.ranking,
+            "understanding": args.understanding,
+            "speculative": args.speculative,
+            "cities": cities,
+            "queries_file": os.path.basename(args.queries),
+            "queries_version": labeled.get("version"),
+        },
+        "summary": summarize(rows),
+        "per_city": {
+            city: summarize([row for row in rows if row["city"] == city]) for city in cities
+        },
+        "queries": rows,
+        "speculation": speculation_stats.get_stats(),
+        "query_classifier": query_decider.get_stats(),
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+    summary = report["summary"]
+    print(
+        f"\naccuracy {summary['classification_accuracy']:.3f}  "
+        f"NDCG@10 {summary['ndcg@10_mean']}  "
+        f"tokens {summary['tokens']['prompt_tokens']}+{summary['tokens']['completion_tokens']}  "
+        f"(saved {summary['tokens']['prompt_tokens_saved']})  "
+        f"total p50 {summary['stages']['total']['p50_ms']} ms"
+    )
+    print(f"report written to {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline evaluation and latency benchmark.")
+    parser.add_argument("--llm", choices=("stub", "live"), default="stub")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub latency per call (s)")
+    parser.add_argument("--extraction", choices=("per_column", "batched"), default=None)
+    parser.add_argument("--ranking", choices=("binary", "graded"), default=None)
+    parser.add_argument("--understanding", choices=("multi_call", "merged"), default=None)
+    parser.add_argument("--speculative", action=argparse.BooleanOptionalAction, default=None)
+    parser.add_argument("--cities", nargs="*", default=None)
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--out", default="benchmark_report.json")
+    asyncio.run(main(parser.parse_args()))
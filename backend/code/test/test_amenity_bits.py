@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from amenity_bits import amenity_bits, group_mask
+from constraint_engine import constraint_mask
+from hotel_store import HotelTable
+from models import AMENITY_GROUPS, Constraint
+
+
+def _has(table, column):
+    return table.columns[column] == 1
+
+
+def test_any_and_all_match_the_columns(tables):
+    for table in tables.values():
+        bits = amenity_bits(table)
+        # über eine Byte-Grenze hinweg: Spalten vom Anfang und vom Ende
+        columns = bits.columns[:3] + bits.columns[-3:]
+        masks = [_has(table, column) for column in columns]
+        assert np.array_equal(bits.any_of(columns), np.logical_or.reduce(masks))
+        assert np.array_equal(bits.all_of(columns), np.logical_and.reduce(masks))
+
+
+def test_unknown_amenity(tables):
+    table = tables["Kopenhagen"]
+    bits = amenity_bits(table)
+    column = bits.columns[0]
+    assert np.array_equal(bits.any_of([column, "gibt es nicht"]), _has(table, column))
+    assert not bits.all_of([column, "gibt es nicht"]).any()
+
+
+def test_group_mask_is_any_of_the_group(tables):
+    for table in tables.values():
+        for group, columns in AMENITY_GROUPS.items():
+            present = [c for c in columns if c in amenity_bits(table).bit]
+            expected = np.zeros(len(table), dtype=bool)
+            for column in present:
+                expected |= _has(table, column)
+            assert np.array_equal(group_mask(table, group), expected)
+
+
+@pytest.mark.parametrize("value", [1, 0])
+def test_group_constraint_paths_agree_on_nan_and_other_values(value):
+    table = HotelTable(
+        np.array(["a", "b", "c", "d", "e"], dtype=object),
+        {
+            "Pool": np.array([np.nan, 0, 1, 2, 0]),
+            "Whirlpool": np.array([0, 0, 0, 0, 1]),
+        },
+    )
+    constraint = Constraint("Pool", int, value)
+    expected = [constraint.is_satisfied(h) for h in table.to_hotels().values()]
+    assert constraint_mask(constraint, table).tolist() == expected
+    has_pool = [False, False, True, False, True]
+    assert expected == (has_pool if value else [not x for x in has_pool])
@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+
+from column_schema import ColumnInfo
+from llm_backends import StubBackend
+from llm_utils import WEIGHT_RANGE, _parse_batched_constraint, get_batched_constraints
+
+COLUMNS = {
+    "Sauna": ColumnInfo("Sauna", "boolean", 0.0, frozenset({0, 1})),
+    "pricepernight": ColumnInfo("pricepernight", "numeric", 0.0, frozenset(), 20.0, 900.0),
+    "mealtype": ColumnInfo(
+        "mealtype", "categorical", 0.0, frozenset({"Frühstück", "Halbpension"})
+    ),
+}
+
+
+def _parse(item):
+    return _parse_batched_constraint(item, COLUMNS)
+
+
+def test_accepts_every_kind():
+    boolean = _parse({"column": "Sauna", "value": 1})
+    assert (boolean.column, boolean.datatype, boolean.value) == ("Sauna", int, 1)
+    numeric = _parse({"column": "pricepernight", "comparison": "<=", "value": 100})
+    assert (numeric.datatype, numeric.comparison, numeric.value) == (float, "<=", 100.0)
+    assert isinstance(numeric.value, float)
+    categorical = _parse({"column": "mealtype", "values": ["Frühstück", "Vollpension"]})
+    assert categorical.value == frozenset({"Frühstück"})
+
+
+@pytest.mark.parametrize(
+    "item",
+    [
+        "Sauna",
+        {"column": "Pool", "value": 1},
+        {"value": 1},
+        {"column": "Sauna", "value": 2},
+        {"column": "Sauna", "value": "yes"},
+        {"column": "pricepernight", "comparison": "!=", "value": 100},
+        {"column": "pricepernight", "comparison": "<", "value": "100"},
+        {"column": "pricepernight", "comparison": "<", "value": True},
+        {"column": "pricepernight", "value": 100},
+        {"column": "mealtype", "values": "Frühstück"},
+        {"column": "mealtype", "values": ["Vollpension"]},
+    ],
+    ids=repr,
+)
+def test_rejects_entries_outside_the_schema(item):
+    assert _parse(item) is None
+
+
+@pytest.mark.parametrize(
+    "weight, expected",
+    [
+        (2, 2.0),
+        (0.5, 0.5),
+        (100, WEIGHT_RANGE[1]),
+        (0, WEIGHT_RANGE[0]),
+        ("high", 1.0),
+        (True, 1.0),
+    ],
+)
+def test_weights_are_clamped(weight, expected):
+    assert _parse({"column": "Sauna", "value": 1, "weight": weight}).weight == expected
+
+
+def test_default_weight():
+    assert _parse({"column": "Sauna", "value": 1}).weight == 1.0
+
+
+def _batched(response):
+    backend = StubBackend(latency=0, script=[{"match": ".", "response": response}])
+    return asyncio.run(get_batched_constraints("query", COLUMNS, backend))
+
+
+def test_valid_entries_survive_invalid_ones_and_duplicates():
+    response = json.dumps(
+        {
+            "constraints": [
+                {"column": "Sauna", "value": 1},
+                {"column": "Sauna", "value": 0},
+                {"column": "Pool", "value": 1},
+                {"column": "pricepernight", "comparison": "<", "value": 80},
+            ]
+        }
+    )
+    constraints = _batched(response)
+    assert [(c.column, c.value) for c in constraints] == [
+        ("Sauna", 1),
+        ("pricepernight", 80.0),
+    ]
+
+
+@pytest.mark.parametrize(
+    "response", ["not json", '{"constraints": {"column": "Sauna"}}', "[1, 2]"]
+)
+def test_malformed_responses_raise(response):
+    with pytest.raises(Exception):
+        _batched(response)
+
+
+def test_missing_constraints_list_means_none():
+    assert _batched("{}") == []
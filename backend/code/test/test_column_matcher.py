@@ -0,0 +1,28 @@
+from column_matcher import LOCAL_COLUMN_MIN_CONFIDENCE, column_matcher
+
+
+def test_synonyms_resolve_to_columns(tables):
+    match = column_matcher.match(
+        "I'm travelling with a dog and need a parking space.", tables["Mallorca"].columns
+    )
+    assert match.columns == ["Haustiere erlaubt", "Parken vor Ort"]
+    assert match.confidence >= LOCAL_COLUMN_MIN_CONFIDENCE
+
+
+def test_german_query():
+    match = column_matcher.match("Hotel mit Sauna und Schwimmbad")
+    assert set(match.columns) == {"Sauna", "Pool"}
+
+
+def test_unknown_words_lower_the_confidence():
+    match = column_matcher.match("a romantic hotel with a pool and a breathtaking view")
+    assert "Pool" in match.columns
+    assert match.confidence < LOCAL_COLUMN_MIN_CONFIDENCE
+    assert match.unmatched == ["breathtaking", "view"]
+
+
+def test_available_restricts_to_city_columns():
+    assert column_matcher.match("hotel with a pool", available={"Schwimmbad"}).columns == [
+        "Schwimmbad"
+    ]
+    assert column_matcher.match("hotel with a pool", available=set()).columns == []
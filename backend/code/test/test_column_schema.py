@@ -0,0 +1,52 @@
+import numpy as np
+
+from amenity_bits import amenity_bits
+from column_schema import build_schema, column_info
+from hotel_store import HotelTable
+
+
+def _table(**columns):
+    size = len(next(iter(columns.values())))
+    return HotelTable(
+        np.array([f"h{i}" for i in range(size)], dtype=object),
+        {name: np.asarray(values) for name, values in columns.items()},
+    )
+
+
+def test_flags_need_values_from_zero_and_one():
+    schema = build_schema(
+        _table(
+            Sauna=[0, 1, 1],
+            Heizung=[0, 1, 2],  # Amenity mit Zählwert -> kein Flag
+            nights=[1, 1, 1],  # Anzahl, die zufällig überall 1 ist
+            flag=[0, 1, 0],
+            Pool=[0.0, 1.0, np.nan],
+            rating=[7.5, 8.0, 9.1],
+            mealtype=np.array(["Frühstück", None, "Halbpension"], dtype=object),
+        )
+    )
+    kinds = {name: schema[name].kind for name in ("Sauna", "Heizung", "nights", "flag", "Pool", "rating", "mealtype")}
+    assert kinds == {
+        "Sauna": "boolean",
+        "Heizung": "numeric",
+        "nights": "numeric",
+        "flag": "boolean",
+        "Pool": "boolean",
+        "rating": "numeric",
+        "mealtype": "categorical",
+    }
+    assert schema["mealtype"].possible_values == {"Frühstück", "Halbpension"}
+
+
+def test_counting_amenities_are_packed_by_value_one():
+    # 2 zählt nicht als vorhanden, wie in GroupConstraint.is_satisfied
+    bits = amenity_bits(_table(Sauna=[0, 1, 1], Heizung=[0, 1, 2]))
+    assert bits.any_of(["Heizung"]).tolist() == [False, True, False]
+
+
+def test_city_columns(tables):
+    for table in tables.values():
+        assert column_info(table, "Heizung").kind == "numeric"
+        assert column_info(table, "nights").kind == "numeric"
+        assert column_info(table, "amenity_Sauna").kind == "boolean"
+        assert column_info(table, "does_not_exist") is None
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from constraint_engine import constraint_mask, score_table
+from models import Constraint
+
+CONSTRAINTS = [
+    Constraint("pricepernight", float, 150.0, "<="),
+    Constraint("rating", float, 8.5, ">"),
+    Constraint("starcategory", float, 4.0, ">="),
+    Constraint("distancetocity", float, 2.0, "<"),
+    Constraint("cancelable", int, 1),
+    Constraint("Parken vor Ort", int, 1),
+    Constraint("Haustiere erlaubt", int, 0),
+    Constraint("Pool", int, 1),
+    Constraint("Massage", int, 0),
+    Constraint("mealtype", list[str], ["Frühstück", "Halbpension"]),
+    Constraint("does_not_exist", int, 1),
+]
+
+
+@pytest.mark.parametrize("constraint", CONSTRAINTS, ids=repr)
+def test_mask_matches_is_satisfied(tables, constraint):
+    for table in tables.values():
+        expected = [constraint.is_satisfied(h) for h in table.to_hotels().values()]
+        assert constraint_mask(constraint, table).tolist() == expected
+
+
+def test_score_table_counts_satisfied_constraints(tables):
+    for table in tables.values():
+        hotels = table.to_hotels().values()
+        expected = [sum(c.is_satisfied(h) for c in CONSTRAINTS) for h in hotels]
+        assert np.array_equal(score_table(CONSTRAINTS, table), expected)
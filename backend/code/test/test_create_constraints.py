@@ -0,0 +1,123 @@
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import llm_utils
+from hotel_utils import create_constraints
+from llm_backends import _response
+
+BOOLEAN_FIELDS = ["Sauna", "Whirlpool", "Pool", "Bar", "Restaurant", "Aufzug"]
+
+
+class ColumnClient:
+    """
+    Answers per-column prompts by column name: "1" after `delay` seconds,
+    hangs for the columns in `hang` and raises for those in `fail`. Records
+    how many calls ran at the same time.
+    """
+
+    def __init__(self, delay=0.0, hang=(), fail=(), batched=None):
+        self.chat = SimpleNamespace(completions=self)
+        self.delay = delay
+        self.hang = set(hang)
+        self.fail = set(fail)
+        self.batched = batched
+        self.active = self.max_active = 0
+
+    async def create(self, model, messages, **kwargs):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            user = messages[-1]["content"]
+            if "response_format" in kwargs:
+                if self.batched is None:
+                    raise ValueError("batched call failed")
+                return _response(self.batched, 10, 10)
+            column = re.match(r"Column: (.*)", user).group(1)
+            await asyncio.sleep(10 if column in self.hang else self.delay)
+            if column in self.fail:
+                raise ValueError(f"call for {column} failed")
+            return _response("1", 10, 1)
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def hotels(tables):
+    return tables["Mallorca"].to_hotels()
+
+
+@pytest.fixture(autouse=True)
+def no_retries(monkeypatch):
+    monkeypatch.setattr(llm_utils, "LLM_MAX_RETRIES", 0)
+
+
+def _create(hotels, client, fields, query="hotel", **kwargs):
+    report = {}
+    constraints = asyncio.run(
+        create_constraints(hotels, query, fields, client, report=report, **kwargs)
+    )
+    return [c.column for c in constraints], report["constraints_complete"]
+
+
+def test_concurrency_stays_within_the_limit(hotels):
+    client = ColumnClient(delay=0.02)
+    columns, complete = _create(hotels, client, BOOLEAN_FIELDS, max_concurrency=2)
+    assert client.max_active == 2
+    assert columns == BOOLEAN_FIELDS and complete
+
+
+def test_timed_out_call_leaves_a_partial_result(hotels):
+    client = ColumnClient(hang={"Pool"})
+    started = time.perf_counter()
+    columns, complete = _create(hotels, client, BOOLEAN_FIELDS, timeout=0.05)
+    assert time.perf_counter() - started < 1
+    assert columns == [f for f in BOOLEAN_FIELDS if f != "Pool"]
+    assert not complete
+
+
+def test_failed_call_leaves_a_partial_result(hotels):
+    columns, complete = _create(hotels, ColumnClient(fail={"Bar"}), BOOLEAN_FIELDS)
+    assert columns == [f for f in BOOLEAN_FIELDS if f != "Bar"]
+    assert not complete
+
+
+def test_deadline_returns_what_was_found(hotels):
+    client = ColumnClient(hang={"Sauna", "Aufzug"})
+    started = time.perf_counter()
+    columns, complete = _create(hotels, client, BOOLEAN_FIELDS, deadline=0.1)
+    assert time.perf_counter() - started < 1
+    assert columns == ["Whirlpool", "Pool", "Bar", "Restaurant"]
+    assert not complete
+    assert client.active == 0  # nichts läuft weiter
+
+
+def test_local_numeric_constraints_keep_field_order(hotels):
+    fields = ["Sauna", "rating", "Pool"]
+    query = "hotel with sauna, pool and a rating of at least 8"
+    columns, complete = _create(hotels, ColumnClient(), fields, query=query)
+    assert columns == fields and complete
+
+
+def test_batched_mode(hotels):
+    answer = json.dumps(
+        {"constraints": [{"column": "Pool", "value": 1}, {"column": "Sauna", "value": 1}]}
+    )
+    fields = ["Sauna", "rating", "Pool"]
+    query = "hotel with sauna, pool and a rating of at least 8"
+    columns, complete = _create(
+        hotels, ColumnClient(batched=answer), fields, query=query, mode="batched"
+    )
+    assert columns == fields and complete
+
+    columns, complete = _create(hotels, ColumnClient(), fields, query=query, mode="batched")
+    assert columns == ["rating"] and not complete
+
+
+def test_unknown_fields_are_skipped(hotels):
+    columns, complete = _create(hotels, ColumnClient(), ["gibt es nicht", "Sauna"])
+    assert columns == ["Sauna"] and complete
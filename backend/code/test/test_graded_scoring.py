@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from graded_scoring import graded_scores, satisfaction
+from hotel_store import HotelTable
+from models import Constraint
+
+
+def _table():
+    return HotelTable(
+        np.array(["a", "b", "c", "d"], dtype=object),
+        {
+            "pricepernight": np.array([30.0, 40.0, 45.0, np.nan]),
+            "nights": np.array([1, 3, 5, 7]),
+            "Sauna": np.array([1, 0, 1, 0]),
+            "ltr_score": np.array([0.1, 0.2, 0.3, 0.4]),
+        },
+    )
+
+
+def test_inside_the_range_is_fully_satisfied_and_decays_outside():
+    degree = satisfaction(Constraint("pricepernight", float, 40.0, "<="), _table())
+    assert degree[0] == degree[1] == 1.0
+    assert 0 < degree[2] < 1
+    assert degree[3] == 0.0  # NaN
+
+
+@pytest.mark.parametrize("comparison", ["<", "<=", ">", ">=", "=="])
+def test_integer_column_and_value(comparison):
+    degree = satisfaction(Constraint("nights", float, 3, comparison), _table())
+    assert degree.dtype == float
+    assert ((0 <= degree) & (degree <= 1)).all()
+    if comparison in (">=", "=="):
+        assert degree[1] == 1.0
+
+
+def test_boolean_constraints_are_zero_or_one():
+    assert satisfaction(Constraint("Sauna", int, 1), _table()).tolist() == [1, 0, 1, 0]
+
+
+def test_weights_and_ltr_blend():
+    table = _table()
+    constraints = [
+        Constraint("Sauna", int, 1, weight=2.0),
+        Constraint("pricepernight", float, 40.0, "<="),
+    ]
+    scores = graded_scores(constraints, table, ltr_weight=0.0)
+    assert scores[0] == pytest.approx(1.0)
+    assert scores[1] == pytest.approx(1 / 3)
+    assert scores[3] == 0.0
+    # ltr_score hebt bei gleicher Übereinstimmung das bessere Hotel
+    blended = graded_scores(constraints[:1], table, ltr_weight=0.1)
+    assert blended[2] > blended[0] > 0
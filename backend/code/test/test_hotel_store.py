@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from hotel_store import HotelDict, HotelTable, as_table
+
+
+def _hotels():
+    return {
+        "A": {"pricepernight": 80.0, "amenity_Pool": 1},
+        "B": {"pricepernight": 120.0, "amenity_Pool": 0},
+    }
+
+
+def test_from_dataframe_keeps_first_position_and_last_values():
+    df = pd.DataFrame(
+        {"hotel_name": ["A", "B", "A"], "rating": [7.0, 8.0, 9.0], " amenity_Pool": [0, 1, 1]}
+    )
+    table = HotelTable.from_dataframe(df)
+    assert table.names.tolist() == ["A", "B"]
+    assert table.columns["rating"].tolist() == [9.0, 8.0]
+    # "amenity_"-Präfix und Leerzeichen entfernt
+    assert "Pool" in table
+
+
+def test_to_hotels_carries_table():
+    table = HotelTable.from_hotels(_hotels())
+    hotels = table.to_hotels()
+    assert isinstance(hotels, HotelDict)
+    assert as_table(hotels) is table
+
+
+def test_as_table_sees_in_place_changes_of_plain_dicts():
+    hotels = _hotels()
+    assert as_table(hotels).columns["pricepernight"].tolist() == [80.0, 120.0]
+    hotels["B"] = {"pricepernight": 60.0, "amenity_Pool": 1}
+    table = as_table(hotels)
+    assert table.columns["pricepernight"].tolist() == [80.0, 60.0]
+    assert np.array_equal(table.columns["Pool"], [1, 1])
+
+
+def test_missing_numbers_become_nan():
+    table = HotelTable.from_hotels({"A": {"rating": 8.0}, "B": {"rating": None}})
+    assert np.isnan(table.columns["rating"][1])
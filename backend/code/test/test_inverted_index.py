@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from constraint_engine import constraint_mask, score_table
+from inverted_index import inverted_index, score, score_table_inverted
+from models import Constraint
+
+CONSTRAINTS = [
+    Constraint("cancelable", int, 1),
+    Constraint("Parken vor Ort", int, 1),
+    Constraint("Haustiere erlaubt", int, 0),
+    Constraint("Pool", int, 1),
+    Constraint("Massage", int, 0),
+    Constraint("pricepernight", float, 150.0, "<="),
+    Constraint("rating", float, 8.5, ">"),
+    Constraint("mealtype", list[str], ["Frühstück"]),
+    Constraint("does_not_exist", int, 1),
+]
+
+
+@pytest.mark.parametrize("value", [1, 0])
+def test_postings_match_the_masks(tables, value):
+    for table in tables.values():
+        index = inverted_index(table)
+        for column in ("cancelable", "Parken vor Ort", "Pool", "Massage"):
+            mask = constraint_mask(Constraint(column, int, value), table)
+            assert np.array_equal(index.postings(column, value), np.flatnonzero(mask))
+
+
+def test_unindexed_column_has_no_postings(tables):
+    index = inverted_index(tables["Kopenhagen"])
+    assert index.postings("pricepernight") is None
+    assert index.postings("does_not_exist") is None
+
+
+def test_inverted_scores_equal_dense_scores(tables):
+    for table in tables.values():
+        dense = score_table(CONSTRAINTS, table)
+        assert np.array_equal(score_table_inverted(CONSTRAINTS, table), dense)
+        assert np.array_equal(score(CONSTRAINTS, table, "inverted"), dense)
+        assert np.array_equal(score([], table, "inverted"), score_table([], table))
+
+
+def test_unknown_scoring_mode(tables):
+    with pytest.raises(ValueError):
+        score(CONSTRAINTS, tables["Kopenhagen"], "sparse")
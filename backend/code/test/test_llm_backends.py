@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+import pytest
+from openai import APITimeoutError
+
+from llm_backends import LLMBackend, RecordingBackend, ReplayBackend, StubBackend
+
+MESSAGES = [
+    {"role": "system", "content": "system"},
+    {"role": "user", "content": "Hotel with a pool"},
+]
+
+
+def _ask(backend, messages=MESSAGES):
+    async def run():
+        resp = await backend.chat.completions.create(model="gpt", messages=messages, temperature=0)
+        return resp.choices[0].message.content
+
+    return asyncio.run(run())
+
+
+def test_backend_needs_create():
+    class Incomplete(LLMBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_stub_script_and_failures():
+    backend = StubBackend(latency=0, script=[{"match": "pool", "response": "Pool"}])
+    assert _ask(backend) == "Pool"
+    failing = StubBackend(latency=0, failure_rate=1.0, seed=0)
+    with pytest.raises(APITimeoutError):
+        _ask(failing)
+    assert failing.failures == 1
+
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "recording.jsonl")
+    inner = StubBackend(latency=0, script=[{"match": ".", "response": "recorded"}])
+    assert _ask(RecordingBackend(path, inner=inner)) == "recorded"
+
+    replay = ReplayBackend(path)
+    assert _ask(replay) == "recorded"
+    other = [MESSAGES[0], {"role": "user", "content": "Something else"}]
+    with pytest.raises(KeyError):
+        _ask(replay, other)
+
+    fallback = ReplayBackend(path, fallback=StubBackend(latency=0, script=[{"match": ".", "response": "stub"}]))
+    assert _ask(fallback, other) == "stub"
+    assert fallback.misses == 1
+
+
+def test_recording_is_written_off_the_event_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "recording.jsonl")
+    backend = RecordingBackend(path, inner=StubBackend(latency=0))
+    threads = []
+    append = backend._append
+
+    def tracked(line):
+        threads.append(threading.get_ident())
+        append(line)
+
+    monkeypatch.setattr(backend, "_append", tracked)
+    _ask(backend)
+    assert threads and threads[0] != threading.get_ident()
+    with open(path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
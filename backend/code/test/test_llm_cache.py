@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import llm_utils
+from llm_backends import StubBackend
+from llm_cache import LLMResponseCache
+
+MESSAGES = [
+    {"role": "system", "content": "system prompt"},
+    {"role": "user", "content": "Hotel with pool"},
+]
+
+
+def _key(messages=MESSAGES, **params):
+    return LLMResponseCache.make_key("gpt", messages, {"temperature": 0, **params})[0]
+
+
+def test_key_depends_on_prompts_and_params():
+    assert _key() == _key()
+    assert _key() != _key(max_tokens=5)
+    assert _key() != _key(messages=MESSAGES[:1] + [{"role": "user", "content": "Spa"}])
+
+
+def test_lru_eviction_and_ttl():
+    cache = LLMResponseCache(max_entries=2, ttl=60, path=None)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")  # verdrängt "b", "a" wurde zuletzt benutzt
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+    cache._entries["a"] = ("1", time.time() - 120)
+    assert cache.get("a") is None
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_sqlite_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = LLMResponseCache(path=path)
+    cache.put("key", "answer", "gpt", "hash", "prompt")
+    cache.flush()
+
+    restarted = LLMResponseCache(path=path)
+    assert asyncio.run(restarted.aget("key")) == "answer"
+    assert restarted.get_stats()["disk_hits"] == 1
+    assert asyncio.run(restarted.aget("other")) is None
+
+
+def test_backend_answers_are_not_cached(monkeypatch):
+    cache = LLMResponseCache(path=None)
+    monkeypatch.setattr(llm_utils, "response_cache", cache)
+    backend = StubBackend(latency=0, jitter=0, failure_rate=0, script=[{"match": ".", "response": "x"}])
+
+    for _ in range(2):
+        assert asyncio.run(llm_utils._complete(MESSAGES, backend, temperature=0)) == "x"
+    assert backend.calls == 2
+    assert cache.get_stats()["entries"] == 0
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from llm_pool import LLMClientPool
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    return LLMClientPool()
+
+
+def test_client_is_reused_within_a_loop(pool):
+    async def run():
+        first = pool.pooled
+        assert pool.pooled is first
+        await pool.aclose()
+        return first
+
+    assert asyncio.run(run()).is_closed()
+
+
+def test_client_of_a_previous_loop_is_closed(pool):
+    async def get():
+        return pool.pooled
+
+    first = asyncio.run(get())
+
+    async def run():
+        second = pool.pooled
+        assert second is not first
+        # Der alte Client wird im Hintergrund geschlossen
+        for _ in range(100):
+            if first.is_closed():
+                break
+            await asyncio.sleep(0.01)
+        assert first.is_closed()
+        await pool.aclose()
+        return second
+
+    assert asyncio.run(run()).is_closed()
+
+
+def test_get_stats_without_client(pool):
+    stats = pool.get_stats()
+    assert stats["open_connections"] == 0
+    assert stats["in_flight"] == 0
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import APITimeoutError
+
+import llm_utils
+from llm_backends import _response
+from llm_utils import LLM_CALL_BUDGET, _complete
+
+MESSAGES = [{"role": "user", "content": "Hotel with a pool"}]
+
+
+class FlakyClient:
+    """Fails the first `failures` calls with `error` (or hangs), then answers."""
+
+    def __init__(self, failures: int, error: Exception = None, hang: float = 0.0):
+        self.chat = SimpleNamespace(completions=self)
+        self.failures = failures
+        self.error = error
+        self.hang = hang
+        self.calls = 0
+        self.answer = "answer"
+
+    async def create(self, model, messages, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            if self.hang:
+                await asyncio.sleep(self.hang)
+            raise self.error
+        return _response(self.answer, 3, 1)
+
+
+def _timeout_error():
+    return APITimeoutError(request=httpx.Request("POST", "http://llm/chat"))
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(llm_utils, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(llm_utils, "LLM_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(llm_utils.random, "random", lambda: 0.0)
+
+
+def test_retries_with_exponential_backoff():
+    client = FlakyClient(2, _timeout_error())
+    started = time.perf_counter()
+    assert asyncio.run(_complete(MESSAGES, client)) == "answer"
+    assert client.calls == 3
+    # Backoff 0.01 s, dann 0.02 s
+    assert time.perf_counter() - started >= 0.03
+
+
+def test_gives_up_after_the_last_retry():
+    client = FlakyClient(5, _timeout_error())
+    with pytest.raises(APITimeoutError):
+        asyncio.run(_complete(MESSAGES, client))
+    assert client.calls == 3
+
+
+def test_other_errors_are_not_retried():
+    client = FlakyClient(1, ValueError("bad request"))
+    with pytest.raises(ValueError):
+        asyncio.run(_complete(MESSAGES, client))
+    assert client.calls == 1
+
+
+def test_each_attempt_is_limited_to_llm_timeout(monkeypatch):
+    monkeypatch.setattr(llm_utils, "LLM_TIMEOUT", 0.05)
+    client = FlakyClient(1, _timeout_error(), hang=10)
+    started = time.perf_counter()
+    assert asyncio.run(_complete(MESSAGES, client)) == "answer"
+    assert client.calls == 2
+    assert time.perf_counter() - started < 1
+
+
+def test_constraint_calls_get_their_retries(tables, monkeypatch):
+    from hotel_utils import CONSTRAINT_CALL_TIMEOUT, create_constraints
+
+    assert CONSTRAINT_CALL_TIMEOUT == LLM_CALL_BUDGET > llm_utils.LLM_TIMEOUT
+    client = FlakyClient(1, _timeout_error())
+    client.answer = "1"
+    report = {}
+    constraints = asyncio.run(
+        create_constraints(
+            tables["Mallorca"].to_hotels(),
+            "hotel with a sauna",
+            ["Sauna"],
+            client,
+            report=report,
+        )
+    )
+    assert client.calls == 2
+    assert [c.column for c in constraints] == ["Sauna"]
+    assert report["constraints_complete"]
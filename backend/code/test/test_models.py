@@ -0,0 +1,58 @@
+import pickle
+
+import pytest
+
+from models import (
+    BooleanConstraint,
+    Constraint,
+    GroupConstraint,
+    RangeConstraint,
+    ValueConstraint,
+)
+
+
+def test_constraints_compile_to_predicate_classes():
+    assert type(Constraint("Sauna", int, 1)) is BooleanConstraint
+    assert type(Constraint("Pool", int, 1)) is GroupConstraint
+    assert type(Constraint("rating", float, 8.0, ">=")) is RangeConstraint
+    assert type(Constraint("mealtype", list[str], ["Frühstück"])) is ValueConstraint
+    with pytest.raises(TypeError):
+        Constraint("rating", str, "x")
+    with pytest.raises(ValueError):
+        Constraint("rating", float, 8.0, "~")
+
+
+def test_constraints_are_hashable_immutable_and_picklable():
+    a = Constraint("rating", float, 8.0, ">=")
+    assert a == Constraint("rating", float, 8.0, ">=")
+    assert len({a, Constraint("rating", float, 8.0, ">=")}) == 1
+    assert a != Constraint("rating", float, 8.0, ">")
+    with pytest.raises(AttributeError):
+        a.value = 9.0
+    assert pickle.loads(pickle.dumps(a)) == a
+
+
+def test_predicates():
+    hotel = {"Sauna": 1, "Innenpool": 1, "rating": 8.5, "mealtype": "Frühstück"}
+    assert Constraint("Sauna", int, 1).is_satisfied(hotel)
+    assert not Constraint("Sauna", int, 0).is_satisfied(hotel)
+    assert not Constraint("Massage", int, 1).is_satisfied(hotel)
+    assert Constraint("Pool", int, 1).is_satisfied(hotel)
+    assert Constraint("rating", float, 8.0, ">=").is_satisfied(hotel)
+    assert not Constraint("rating", float, 9.0, ">=").is_satisfied(hotel)
+    assert Constraint("mealtype", list[str], ["Frühstück", "Halbpension"]).is_satisfied(hotel)
+
+
+def test_single_string_value_is_not_split_into_characters():
+    constraint = Constraint("mealtype", list[str], "Frühstück")
+    assert constraint.value == frozenset({"Frühstück"})
+    assert constraint.is_satisfied({"mealtype": "Frühstück"})
+    assert not constraint.is_satisfied({"mealtype": "F"})
+
+
+def test_base_class_cannot_be_used_without_is_satisfied():
+    class Incomplete(Constraint):
+        __slots__ = ()
+
+    with pytest.raises(TypeError):
+        Incomplete("rating", float, 8.0, ">=")
@@ -0,0 +1,82 @@
+import pytest
+
+from models import Constraint
+from numeric_parser import parse_numeric_constraints
+
+
+def _price(comparison, value):
+    return Constraint("pricepernight", float, value, comparison)
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("cheaper than 40 EUR", {"pricepernight": _price("<", 40.0)}),
+        ("unter 40 € pro Nacht", {"pricepernight": _price("<", 40.0)}),
+        ("budget of 1,200 dollars", {"pricepernight": _price("<=", 1200.0)}),
+        ("rating at least 9.3", {"rating": Constraint("rating", float, 9.3, ">=")}),
+        ("4 stars or more", {"starcategory": Constraint("starcategory", float, 4.0, ">=")}),
+        (
+            "within 500 m of the beach",
+            {"distancetobeach": Constraint("distancetobeach", float, 0.5, "<=")},
+        ),
+        (
+            "rating at least 9 and cheaper than 400 EUR",
+            {
+                "rating": Constraint("rating", float, 9.0, ">="),
+                "pricepernight": _price("<", 400.0),
+            },
+        ),
+        ("near the beach and cheap", {}),
+    ],
+)
+def test_explicit_numbers(query, expected):
+    assert parse_numeric_constraints(query) == expected
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "price between 50 and 100 EUR",
+        "zwischen 50 und 100 € pro Nacht",
+        "50–100 EUR per night",
+        "$50-$100 per night",
+        "from 50 to 100 EUR",
+    ],
+)
+def test_price_ranges_are_left_to_the_llm(query):
+    assert "pricepernight" not in parse_numeric_constraints(query)
+
+
+def test_range_does_not_hide_other_columns():
+    assert parse_numeric_constraints("between 3 and 4 stars, rating at least 8") == {
+        "rating": Constraint("rating", float, 8.0, ">=")
+    }
+
+
+def test_conflicting_numbers_are_left_to_the_llm():
+    assert parse_numeric_constraints("under 100 EUR, but at most 80 EUR") == {}
+    # Dieselbe Angabe zweimal ist kein Widerspruch
+    assert parse_numeric_constraints("under 100 EUR, really under 100 EUR") == {
+        "pricepernight": _price("<", 100.0)
+    }
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        # Zwei Schlüsselwörter an derselben Zahl: unklar, welches gilt
+        ("hotel with price 8.5 rating", {}),
+        # "less than" gehört zu keiner erkannten Zahl -> alles ans LLM
+        ("5 star hotel less than 300", {}),
+        ("hotel over the river for 80 EUR", {}),
+        (
+            "4 star hotel in the city center",
+            {"starcategory": Constraint("starcategory", float, 4.0, ">=")},
+        ),
+        ("300 per night", {"pricepernight": _price("<=", 300.0)}),
+        ("9+ rating", {"rating": Constraint("rating", float, 9.0, ">=")}),
+    ],
+)
+def test_keywords_must_sit_next_to_the_number(query, expected):
+    assert parse_numeric_constraints(query) == expected
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+import main
+
+
+def _install(monkeypatch, valid, unrestricted, delays):
+    """Replaces the three pre-check calls; records which ones were cancelled."""
+    cancelled = []
+
+    def call(name, result):
+        async def run(*args):
+            try:
+                await asyncio.sleep(delays[name])
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        return run
+
+    monkeypatch.setattr(main, "is_valid_request", call("validate", valid))
+    monkeypatch.setattr(main, "is_unrestricted_request", call("unrestricted", unrestricted))
+    monkeypatch.setattr(main, "improve_user_query", call("improve", "improved"))
+    return cancelled
+
+
+def _run(hotels=True):
+    report = {}
+    result = asyncio.run(main._pre_checks(report, "query", {} if hotels else None))
+    return result, report
+
+
+def test_invalid_query_cancels_the_rest(monkeypatch):
+    cancelled = _install(
+        monkeypatch, False, False, {"validate": 0, "unrestricted": 1, "improve": 1}
+    )
+    result, report = _run()
+    assert result == (None, False, False)
+    assert sorted(report["cancelled"]) == sorted(cancelled) == ["improve", "unrestricted"]
+
+
+def test_unrestricted_query_does_not_wait_for_the_rewrite(monkeypatch):
+    cancelled = _install(
+        monkeypatch, True, True, {"validate": 0, "unrestricted": 0.01, "improve": 1}
+    )
+    result, report = _run()
+    assert result == (None, True, True)
+    assert report["cancelled"] == cancelled == ["improve"]
+
+
+def test_invalid_wins_over_a_finished_unrestricted(monkeypatch):
+    _install(monkeypatch, False, True, {"validate": 0.01, "unrestricted": 0, "improve": 1})
+    result, _ = _run()
+    assert result == (None, False, False)
+
+
+def test_restricted_query_waits_for_all(monkeypatch):
+    cancelled = _install(
+        monkeypatch, True, False, {"validate": 0, "unrestricted": 0, "improve": 0.01}
+    )
+    result, report = _run()
+    assert result == ("improved", True, False)
+    assert "cancelled" not in report and not cancelled
+    assert set(report["timings"]) == {"validate", "unrestricted", "improve"}
+
+
+def test_without_hotels_there_is_no_rewrite(monkeypatch):
+    _install(monkeypatch, True, False, {"validate": 0, "unrestricted": 0, "improve": 0})
+    result, report = _run(hotels=False)
+    assert result == (None, True, False)
+    assert "improve" not in report["timings"]
+
+
+def test_errors_cancel_the_siblings(monkeypatch):
+    cancelled = _install(
+        monkeypatch,
+        True,
+        RuntimeError("boom"),
+        {"validate": 1, "unrestricted": 0, "improve": 1},
+    )
+    with pytest.raises(RuntimeError):
+        _run()
+    assert sorted(cancelled) == ["improve", "validate"]
@@ -0,0 +1,54 @@
+import asyncio
+
+import main
+from column_matcher import column_matcher
+from prompt_vocabulary import constant_columns, prompt_vocabulary
+
+
+def test_vocabulary_leaves_out_constant_columns(tables):
+    vocabulary = prompt_vocabulary(tables["New York"])
+    assert "Wellness" in vocabulary.constant
+    assert "Wellness" not in vocabulary
+    assert "Sauna" in vocabulary
+
+
+def test_constant_columns_of_a_match(tables):
+    table = tables["New York"]
+    match = column_matcher.match("hotel with wellness and sauna", table.columns)
+    assert "Wellness" in match.columns
+    assert constant_columns(match.columns, table) == ["Wellness"]
+    assert constant_columns(match.columns, tables["Kopenhagen"]) == []
+
+
+def test_llm_path_keeps_constant_columns(tables, monkeypatch):
+    async def llm_columns(query, table=None):
+        return ["Sauna"]  # "Wellness" steht nicht im Prompt von New York
+
+    async def no_constraints(hotels, query, columns, client, mode=None, report=None):
+        return []
+
+    monkeypatch.setattr(main, "get_relevant_columns", llm_columns)
+    monkeypatch.setattr(main, "create_constraints", no_constraints)
+    monkeypatch.setattr(main, "LOCAL_COLUMN_MIN_CONFIDENCE", 2.0)  # nie lokal
+    table = tables["New York"]
+    report = {}
+    columns, _ = asyncio.run(
+        main._extract(
+            "hotel with wellness and sauna",
+            "hotel with wellness and sauna",
+            table.to_hotels(),
+            table,
+            report,
+            None,
+        )
+    )
+    assert report["column_path"] == "llm"
+    assert columns == ["Sauna", "Wellness"]
+    assert report["constant_columns"] == ["Wellness"]
+
+
+def test_failed_llm_call_is_not_turned_into_columns(tables):
+    table = tables["New York"]
+    report = {}
+    assert main._add_constant_columns(None, ["Wellness"], table, report) is None
+    assert "constant_columns" not in report
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from query_classifier import LocalDecider, QueryClassifier, features, train
+
+EXAMPLES = {
+    "valid": {
+        "Hotel with a pool in the city centre": True,
+        "Cheap hotel with parking": True,
+        "Hotel mit Sauna und Frühstück": True,
+        "Tell me a joke about cats": False,
+        "What's the weather tomorrow": False,
+        "Write a poem about the sea": False,
+    },
+    "unrestricted": {
+        "Just show me some hotels": True,
+        "Any hotel is fine": True,
+        "Zeig mir Hotels": True,
+        "Hotel with a pool under 100 euros": False,
+        "Hotel mit Sauna": False,
+        "Cheap hotel with parking": False,
+    },
+}
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return QueryClassifier(train(EXAMPLES))
+
+
+def test_features_replace_numbers():
+    tokens = ["hotel", "unter", "<num>", "euro"]
+    bigrams = ["hotel unter", "unter <num>", "<num> euro"]
+    assert features("Hotel unter 100 Euro") == tokens + bigrams
+
+
+def test_trained_model_separates_the_examples(classifier):
+    for task, examples in EXAMPLES.items():
+        for query, label in examples.items():
+            assert (classifier.probability(task, query) >= 0.5) == label
+
+
+def test_artifact_version_is_checked():
+    artifact = train(EXAMPLES)
+    artifact["version"] = -1
+    with pytest.raises(ValueError):
+        QueryClassifier(artifact)
+
+
+def test_one_class_is_not_enough():
+    with pytest.raises(ValueError):
+        train({"valid": {"a": True}, "unrestricted": {"b": True, "c": False}})
+
+
+def _decide(decider, query, llm_verdict):
+    calls = []
+
+    async def ask_llm():
+        calls.append(query)
+        return llm_verdict
+
+    return asyncio.run(decider.decide("valid", query, ask_llm)), calls
+
+
+def test_confident_queries_are_answered_locally(classifier):
+    decider = LocalDecider(classifier, margin=0.0)
+    verdict, calls = _decide(decider, "Tell me a joke about cats", True)
+    assert verdict is False and not calls
+    assert decider.get_stats()["valid"]["local"] == 1
+
+
+def test_uncertain_queries_go_to_the_llm(classifier):
+    decider = LocalDecider(classifier, margin=0.5)  # alles im Unsicherheitsband
+    verdict, calls = _decide(decider, "Tell me a joke about cats", True)
+    assert verdict is True and calls
+    stats = decider.get_stats()["valid"]
+    assert stats["deferred"] == 1 and stats["disagree"] == 1
+
+
+def test_without_classifier_the_llm_decides():
+    verdict, calls = _decide(LocalDecider(None), "Hotel with a pool", False)
+    assert verdict is False and calls
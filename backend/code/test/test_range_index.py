@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from constraint_engine import constraint_mask
+from models import Constraint
+from range_index import SortedColumn, range_index
+
+COMPARISONS = ["<", "<=", ">", ">=", "=="]
+
+
+@pytest.mark.parametrize("comparison", COMPARISONS)
+def test_rows_match_the_masks(tables, comparison):
+    for table in tables.values():
+        index = range_index(table)
+        for column in ("pricepernight", "rating", "starcategory", "distancetocity"):
+            # Schwellen auf und zwischen vorhandenen Werten
+            for value in np.quantile(index.columns[column].values, [0.0, 0.3, 0.5, 1.0]):
+                constraint = Constraint(column, float, float(value), comparison)
+                expected = np.flatnonzero(constraint_mask(constraint, table))
+                assert np.array_equal(np.sort(index.rows(constraint)), expected)
+
+
+def test_intersect_matches_the_combined_masks(tables):
+    constraints = [
+        Constraint("pricepernight", float, 150.0, "<="),
+        Constraint("rating", float, 8.0, ">="),
+    ]
+    for table in tables.values():
+        expected = constraint_mask(constraints[0], table) & constraint_mask(
+            constraints[1], table
+        )
+        rows = range_index(table).intersect(constraints)
+        assert np.array_equal(rows, np.flatnonzero(expected))
+
+
+def test_unindexed_constraints(tables):
+    index = range_index(tables["Kopenhagen"])
+    assert index.rows(Constraint("cancelable", int, 1)) is None
+    assert index.rows(Constraint("does_not_exist", float, 1.0, "<")) is None
+    assert index.intersect([]) is None
+
+
+def test_missing_values_and_nan_threshold():
+    column = SortedColumn(np.array([3.0, np.nan, 1.0, 2.0]))
+    assert column.select("<=", 2.0).tolist() == [2, 3]
+    assert column.select(">", 0.0).tolist() == [2, 3, 0]
+    assert len(column.select("==", float("nan"))) == 0
+    with pytest.raises(ValueError):
+        column.select("!=", 1.0)
+
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from constraint_engine import score_table, scores_to_dict
+from hotel_store import HotelTable
+from hotel_utils import sort_hotels_by_score, top_hotels_by_score
+from models import Constraint
+from ranking import top_k_by_ltr, top_k_by_score, top_k_by_value
+
+CONSTRAINTS = [
+    Constraint("pricepernight", float, 150.0, "<="),
+    Constraint("rating", float, 8.5, ">"),
+    Constraint("cancelable", int, 1),
+    Constraint("Parken vor Ort", int, 1),
+    Constraint("Pool", int, 1),
+]
+
+
+@pytest.mark.parametrize("k", [1, 10, 100, None])
+def test_top_k_equals_full_sort(tables, k):
+    for table in tables.values():
+        hotels = table.to_hotels()
+        scores = score_table(CONSTRAINTS, table)
+        expected = sort_hotels_by_score(scores_to_dict(scores, table), hotels)[:k]
+        assert top_k_by_score(scores, table, k) == expected
+
+
+def test_top_hotels_by_score_binary(tables):
+    for table in tables.values():
+        hotels = table.to_hotels()
+        scores = scores_to_dict(score_table(CONSTRAINTS, table), table)
+        expected = sort_hotels_by_score(scores, hotels)[:10]
+        assert top_hotels_by_score(CONSTRAINTS, hotels, mode="binary") == expected
+
+
+def test_ltr_order_equals_stable_sort(tables):
+    for table in tables.values():
+        hotels = table.to_hotels()
+        expected = sorted(
+            hotels, key=lambda name: hotels[name].get("ltr_score", 0), reverse=True
+        )
+        assert top_k_by_ltr(table, None) == expected
+
+
+def _tied_table():
+    # b und c gleichauf bei Score und ltr_score: Reihenfolge wie in der Tabelle
+    return HotelTable(
+        np.array(["a", "b", "c", "d", "e"], dtype=object),
+        {"ltr_score": np.array([0.1, 0.5, 0.5, 0.9, np.nan])},
+    )
+
+
+def test_ties_keep_row_order():
+    table = _tied_table()
+    scores = np.array([2, 2, 2, 1, 2])
+    assert top_k_by_score(scores, table, 3) == ["b", "c", "a"]
+    assert top_k_by_score(scores, table, None) == ["b", "c", "a", "e", "d"]
+
+
+def test_top_k_by_value_skips_unmatched_rows():
+    table = _tied_table()
+    values = np.array([0.0, 0.7, 0.7, 0.2, 0.9])
+    assert top_k_by_value(values, table, 3) == ["e", "b", "c"]
+    assert top_k_by_value(values, table, None) == ["e", "b", "c", "d"]
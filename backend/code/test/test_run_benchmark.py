@@ -0,0 +1,52 @@
+import math
+import os
+
+import numpy as np
+import pytest
+
+from hotel_store import HotelTable
+
+RULES = [
+    {"column": "Sauna", "value": 1},
+    {"column": "rating", "comparison": ">=", "value": 8},
+]
+
+
+@pytest.fixture
+def ndcg_at_k(monkeypatch):
+    # run_benchmark setzt beim Import Umgebungsvariablen: nicht in andere Tests durchsickern lassen
+    monkeypatch.setattr(os, "environ", os.environ.copy())
+    from run_benchmark import ndcg_at_k
+
+    return ndcg_at_k
+
+
+@pytest.fixture
+def table():
+    # Relevanz (erfüllte Regeln): h0 = 2, h1 = 1, h2 = 1, h3 = 0
+    return HotelTable(
+        np.array(["h0", "h1", "h2", "h3"], dtype=object),
+        {
+            "Sauna": np.array([1, 1, 0, 0]),
+            "rating": np.array([9.0, 7.0, 8.5, 5.0]),
+        },
+    )
+
+
+def test_ndcg_of_the_ideal_order_is_one_for_any_tie_order(ndcg_at_k, table):
+    assert ndcg_at_k(["h0", "h1", "h2", "h3"], RULES, table) == pytest.approx(1.0)
+    assert ndcg_at_k(["h0", "h2", "h1"], RULES, table) == pytest.approx(1.0)
+
+
+def test_ndcg_with_fewer_results_than_k(ndcg_at_k, table):
+    # K = 10 > 2 Ergebnisse: DCG = 0/log2(2) + 1/log2(3),
+    # IDCG = 3/log2(2) + 1/log2(3) + 1/log2(4) + 0/log2(5)
+    dcg = 1 / math.log2(3)
+    idcg = 3 + 1 / math.log2(3) + 1 / 2
+    assert ndcg_at_k(["h3", "h1"], RULES, table) == pytest.approx(dcg / idcg)
+
+
+def test_ndcg_is_none_without_relevant_hotels(ndcg_at_k, table):
+    rules = [{"column": "Sauna", "value": 1}]
+    empty = HotelTable(table.names, {"Sauna": np.zeros(4, dtype=int)})
+    assert ndcg_at_k(["h0"], rules, empty) is None
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from llm_backends import StubBackend
+from models import Constraint
+from semantic_cache import CachedUnderstanding, SemanticQueryCache, normalize, similarity
+
+PRICE_OVER = "hotel with pool, sauna, gym, parking, breakfast and wifi over 40 EUR"
+PRICE_UNDER = "hotel with pool, sauna, gym, parking, breakfast and wifi under 40 EUR"
+
+
+@pytest.fixture
+def table(tables):
+    return tables["Mallorca"]
+
+
+def _entry(*columns):
+    return CachedUnderstanding("", list(columns), [Constraint(c, int, 1) for c in columns])
+
+
+def test_normalize_ignores_order_fillers_and_plurals():
+    assert normalize("I need a hotel with pools and a sauna") == normalize(
+        "sauna and pool please"
+    )
+
+
+def test_numbers_negations_and_comparators_must_match():
+    assert similarity(normalize("pool under 40 EUR"), normalize("pool under 50 EUR")) == 0
+    assert similarity(normalize("with pool"), normalize("without pool")) == 0
+    assert similarity(normalize(PRICE_UNDER), normalize(PRICE_OVER)) == 0
+
+
+def test_paraphrase_hits(table):
+    cache = SemanticQueryCache(threshold=0.8)
+    entry = _entry("Pool", "Sauna")
+    cache.store("I need a hotel with a pool and a sauna", table, "per_column", entry)
+    assert cache.lookup("Looking for hotels with pools and sauna, please", table, "per_column") is entry
+
+
+def test_reversed_comparator_misses(table):
+    cache = SemanticQueryCache(threshold=0.8)
+    cache.store(PRICE_OVER, table, "per_column", _entry("Pool"))
+    assert cache.lookup(PRICE_UNDER, table, "per_column") is None
+
+
+def test_additional_requirement_misses(table):
+    cache = SemanticQueryCache(threshold=0.8)
+    cache.store("pool, sauna, gym and parking", table, "per_column", _entry("Pool"))
+    assert cache.lookup("pool, sauna, gym, parking and breakfast", table, "per_column") is None
+
+
+def test_missing_requirement_misses(table):
+    cache = SemanticQueryCache(threshold=0.8)
+    cache.store("pool, sauna, gym, parking and breakfast", table, "per_column", _entry("Pool"))
+    assert cache.lookup("pool, sauna, gym and parking", table, "per_column") is None
+
+
+def test_extraction_mode_is_part_of_the_key(table):
+    cache = SemanticQueryCache(threshold=0.8)
+    cache.store("hotel with a pool", table, "per_column", _entry("Pool"))
+    assert cache.lookup("hotel with a pool", table, "batched") is None
+    assert cache.lookup("hotel with a pool", table, "per_column") is not None
+
+
+def test_entries_expire(table, monkeypatch):
+    cache = SemanticQueryCache(threshold=0.8, ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr("semantic_cache.time.monotonic", lambda: now[0])
+    cache.store("hotel with a pool", table, "per_column", _entry("Pool"))
+    now[0] += 59
+    assert cache.lookup("hotel with a pool", table, "per_column") is not None
+    now[0] += 2
+    assert cache.lookup("hotel with a pool", table, "per_column") is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_size_limit_covers_all_tables(tables):
+    cache = SemanticQueryCache(threshold=0.8, max_entries=2)
+    cache.store("hotel with a pool", tables["Mallorca"], "per_column", _entry("Pool"))
+    cache.store("hotel with a sauna", tables["Mallorca"], "per_column", _entry("Sauna"))
+    cache.store("hotel with a pool", tables["Kopenhagen"], "per_column", _entry("Pool"))
+    assert cache.get_stats()["entries"] == 2
+    # der älteste Eintrag der vollsten Stadt ist verdrängt
+    assert cache.lookup("hotel with a pool", tables["Mallorca"], "per_column") is None
+    assert cache.lookup("hotel with a sauna", tables["Mallorca"], "per_column") is not None
+
+
+def _run_pipeline(monkeypatch, table, backend):
+    import main
+    import llm_utils
+
+    async def pre_checks(report, query, hotels=None):
+        return query, True, False
+
+    monkeypatch.setattr(main, "_pre_checks", pre_checks)
+    monkeypatch.setattr(main, "get_openai_client", lambda: backend)
+    monkeypatch.setattr(llm_utils, "LLM_BACKOFF_BASE", 0)
+    report = {}
+    asyncio.run(
+        main.find_matching_hotels(
+            "hotel with sauna and pool",
+            table.to_hotels(),
+            extraction="per_column",
+            report=report,
+            understanding="multi_call",
+            speculative=False,
+        )
+    )
+    return report
+
+
+def test_failed_extraction_is_not_cached(table, monkeypatch):
+    import main
+
+    cache = SemanticQueryCache(threshold=0.8)
+    monkeypatch.setattr(main, "semantic_cache", cache)
+    failing = StubBackend(latency=0, failure_rate=1.0, seed=0)
+    report = _run_pipeline(monkeypatch, table, failing)
+    assert report["column_path"] == "local"
+    assert report["constraints_complete"] is False
+    assert cache.get_stats()["entries"] == 0
+
+    working = StubBackend(latency=0, script=[{"match": ".", "response": "1"}])
+    report = _run_pipeline(monkeypatch, table, working)
+    assert report["constraints_complete"] is True
+    assert cache.get_stats()["entries"] == 1
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import main
+from speculation import SpeculationStats
+
+
+def _fake_extract(delay, columns, path):
+    async def extract(query, extraction_query, hotels, table, report, extraction):
+        report["column_path"] = path
+        await asyncio.sleep(delay)
+        report["finished_at"] = time.perf_counter()
+        return columns, [extraction_query]
+
+    return extract
+
+
+def _finish(monkeypatch, tables, speculation_delay, columns, regular_delay=0):
+    monkeypatch.setattr(main, "speculation_stats", SpeculationStats())
+    monkeypatch.setattr(main, "_extract", _fake_extract(regular_delay, ["Pool"], "llm"))
+    hotels = tables["Kopenhagen"].to_hotels()
+
+    async def run():
+        spec_report = {"started_at": time.perf_counter()}
+        speculation = asyncio.create_task(
+            _fake_extract(speculation_delay, columns, "local")(
+                "raw", "raw", hotels, None, spec_report, None
+            )
+        )
+        await asyncio.sleep(0.01)  # Vorprüfungen
+        report = {}
+        result = await main._finish_speculation(
+            speculation, spec_report, "raw", "improved", hotels, report, None
+        )
+        return result, report
+
+    return asyncio.run(run())
+
+
+def test_finished_speculation_is_used(monkeypatch, tables):
+    result, report = _finish(monkeypatch, tables, 0, ["Sauna"])
+    assert result == (["Sauna"], ["raw"])
+    assert report["speculation"] == "used" and report["column_path"] == "local"
+    stats = main.speculation_stats.get_stats()
+    assert stats["used"] == 1 and stats["saved_seconds_total"] > 0
+
+
+def test_faster_regular_extraction_wins_the_race(monkeypatch, tables):
+    result, report = _finish(monkeypatch, tables, 1, ["Sauna"], regular_delay=0)
+    assert result == (["Pool"], ["improved"])
+    assert report["speculation"] == "lost_race" and report["column_path"] == "llm"
+
+
+def test_speculation_without_columns_is_discarded(monkeypatch, tables):
+    result, report = _finish(monkeypatch, tables, 0, [])
+    assert result == (["Pool"], ["improved"])
+    assert report["speculation"] == "discarded"
+    assert main.speculation_stats.get_stats()["wasted_rate"] == 1.0
@@ -0,0 +1,39 @@
+import pytest
+
+from tracing import Histogram, Tracer
+
+
+def test_percentiles_are_within_a_bucket():
+    histogram = Histogram()
+    for ms in range(1, 101):
+        histogram.observe(ms / 1000)
+    assert histogram.count == 100
+    assert histogram.percentile(50) == pytest.approx(0.050, rel=0.1)
+    assert histogram.percentile(99) == pytest.approx(0.099, rel=0.1)
+    assert histogram.percentile(100) == pytest.approx(0.1)
+    assert Histogram().percentile(50) == 0.0
+
+
+def test_spans_feed_histograms_counters_and_the_trace():
+    tracer = Tracer(enabled=True)
+    with tracer.trace() as trace:
+        for tokens in (10, 5):
+            with tracer.span("llm", prompt_tokens=tokens, cache_hit=True, model="gpt"):
+                pass
+    with tracer.span("llm", prompt_tokens=1):
+        pass  # außerhalb des Traces
+
+    assert [span.name for span in trace.spans] == ["llm", "llm"]
+    assert set(trace.durations()) == {"llm"}
+    assert trace.server_timing().startswith("llm;dur=")
+    stats = tracer.get_stats()
+    assert stats["histograms"]["llm"]["count"] == 3
+    assert stats["counters"] == {"llm.prompt_tokens": 16, "llm.cache_hit=True": 2}
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+    with tracer.trace() as trace, tracer.span("llm") as span:
+        pass
+    assert span.duration >= 0
+    assert not trace.spans and not tracer.histograms
@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+import pytest
+
+import llm_utils
+import main
+from llm_backends import StubBackend
+from llm_pool import client_pool
+from llm_utils import understand_query
+
+QUERY = "hotel with sauna"
+# Nur der understand_query-Aufruf schickt genau "User query: ..." ohne weitere Zeilen
+UNDERSTAND = r"^User query: [^\n]*$"
+
+
+def _backend(response, **kwargs):
+    return StubBackend(script=[{"match": UNDERSTAND, "response": response}], **kwargs)
+
+
+def _understand(table, response, **kwargs):
+    with client_pool.use(_backend(response, **kwargs)):
+        return asyncio.run(understand_query(QUERY, table))
+
+
+@pytest.fixture
+def table(tables):
+    return tables["Mallorca"]
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_utils, "LLM_BACKOFF_BASE", 0)
+
+
+def test_invalid_query(table):
+    understood = _understand(
+        table, json.dumps({"valid": False, "restricted": True, "columns": []})
+    )
+    assert understood.is_valid is False
+
+
+def test_unrestricted_query(table):
+    understood = _understand(
+        table, json.dumps({"valid": True, "restricted": False, "columns": []})
+    )
+    assert (understood.is_valid, understood.is_unrestricted) == (True, True)
+
+
+def test_columns_and_improved_query(table):
+    understood = _understand(
+        table,
+        json.dumps(
+            {
+                "valid": True,
+                "restricted": True,
+                "columns": ["Sauna", "Skipiste", 3],
+                "improved_query": " Hotel with a sauna ",
+            }
+        ),
+    )
+    assert understood.is_unrestricted is False
+    # Erfundene Spalten und Nicht-Strings fallen weg
+    assert understood.columns == ["Sauna"]
+    assert understood.improved_query == "Hotel with a sauna"
+
+
+def test_missing_fields_fall_back_to_the_query(table):
+    understood = _understand(table, json.dumps({"valid": True, "columns": "Sauna"}))
+    assert understood.columns == []
+    assert understood.improved_query == QUERY
+    # Ohne "restricted": false gilt die Anfrage als eingeschränkt
+    assert understood.is_unrestricted is False
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        "Sauna",
+        json.dumps(["Sauna"]),
+        json.dumps({"restricted": True, "columns": ["Sauna"]}),
+        json.dumps({"valid": "yes", "columns": ["Sauna"]}),
+    ],
+)
+def test_malformed_response_returns_none(table, response):
+    assert _understand(table, response) is None
+
+
+def test_failed_call_returns_none(table):
+    assert _understand(table, "{}", failure_rate=1.0, seed=0) is None
+
+
+def _find(table, monkeypatch, response, understanding="merged"):
+    monkeypatch.setattr(main, "semantic_cache", None)
+    report = {}
+    with client_pool.use(_backend(response)):
+        results = asyncio.run(
+            main.find_matching_hotels(
+                QUERY,
+                table.to_hotels(),
+                extraction="per_column",
+                report=report,
+                understanding=understanding,
+                speculative=False,
+            )
+        )
+    return results, report
+
+
+def test_merged_response_drives_the_extraction(table, monkeypatch):
+    response = json.dumps(
+        {"valid": True, "restricted": True, "columns": ["Sauna"], "improved_query": QUERY}
+    )
+    results, report = _find(table, monkeypatch, response)
+    assert report["column_path"] == "merged"
+    assert report["columns"] == ["Sauna"]
+    assert [c.column for c in report["constraints"]] == ["Sauna"]
+    # Die getrennten Vorabprüfungen laufen nicht
+    assert "validate" not in report["timings"]
+    assert results
+
+
+def test_malformed_merged_response_falls_back_to_multi_call(table, monkeypatch):
+    results, report = _find(table, monkeypatch, "not json")
+    assert report["column_path"] in ("local", "llm")
+    assert "validate" in report["timings"]
+    assert "Sauna" in report["columns"]
+    # Gleiches Ergebnis wie ohne den zusammengefassten Aufruf
+    expected, _ = _find(table, monkeypatch, "not json", understanding="multi_call")
+    assert results == expected
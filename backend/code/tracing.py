@@ -0,0 +1,175 @@
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# Spans und Latenz-Histogramme für die Pipeline, abrufbar über /metrics
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+# Server-Timing-Header mit den Stage-Dauern pro Anfrage
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "0") == "1"
+# Bucket-Grenzen: geometrisch von 10 µs bis ~100 s, je 10 % breiter
+_BUCKET_FACTOR = 1.1
+_BUCKET_BOUNDS = [
+    1e-5 * _BUCKET_FACTOR**i
+    for i in range(math.ceil(math.log(1e7) / math.log(_BUCKET_FACTOR)) + 1)
+]
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """
+    Latency histogram with fixed, geometrically growing buckets. Percentiles
+    are read from the bucket boundaries, so they are exact to about 10 %
+    while memory stays constant no matter how many samples come in.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                upper = _BUCKET_BOUNDS[bucket] if bucket < len(_BUCKET_BOUNDS) else self.max
+                return min(upper, self.max)
+        return self.max
+
+    def to_dict(self) -> dict[str, float]:
+        stats = {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+        for q in PERCENTILES:
+            stats[f"p{q}_ms"] = round(self.percentile(q) * 1000, 3)
+        return stats
+
+
+class Span:
+    """One timed stage; attributes carry details like token counts or cache hits."""
+
+    __slots__ = ("name", "start", "duration", "attributes")
+
+    def __init__(self, name: str, attributes: dict[str, object]):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.attributes = attributes
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "name": self.name,
+            "duration_ms": round(self.duration * 1000, 3),
+            **self.attributes,
+        }
+
+
+class Trace:
+    """All spans finished while this trace was current (one per request)."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def durations(self) -> dict[str, float]:
+        """Seconds per span name; repeated spans (e.g. several LLM calls) add up."""
+        totals: dict[str, float] = {}
+        for span in self.spans:
+            totals[span.name] = totals.get(span.name, 0.0) + span.duration
+        return totals
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.durations().items()
+        )
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+class Tracer:
+    """
+    Process-wide collector: every span feeds the histogram of its name and,
+    inside a trace() block, the current request's Trace. Counters sum up
+    numeric span attributes such as prompt and completion tokens.
+    """
+
+    def __init__(self, enabled: bool = TRACING_ENABLED):
+        self.enabled = enabled
+        self.histograms: dict[str, Histogram] = {}
+        self.counters: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self):
+        trace = Trace()
+        token = _trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _trace.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = Span(name, attributes)
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - span.start
+            if self.enabled:
+                self._record(span)
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            histogram = self.histograms.get(span.name)
+            if histogram is None:
+                histogram = self.histograms[span.name] = Histogram()
+            histogram.observe(span.duration)
+            for key, value in span.attributes.items():
+                if isinstance(value, bool):
+                    key, value = f"{key}={value}", 1
+                elif not isinstance(value, (int, float)):
+                    continue
+                counter = f"{span.name}.{key}"
+                self.counters[counter] = self.counters.get(counter, 0) + value
+        trace = _trace.get()
+        if trace is not None:
+            trace.spans.append(span)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def get_stats(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "histograms": {
+                    name: histogram.to_dict()
+                    for name, histogram in sorted(self.histograms.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+
+tracer = Tracer()